@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from archive import archive_enabled, load_history
+
+# Days of archived history behind the top 10's Sentiment_7d column
+RECENT_DAYS = 7
+
+
+def top_tickers(sentiment_df, price_df, count=10):
+    """Tickers with a positive price change, best average sentiment first (the dashboard's top 10)."""
+    # Filter for tickers with a positive price change
+    positive_change_df = price_df[price_df['Change'] > 0]
+
+    # Merge the filtered dataframe with sentiment data based on 'Ticker'
+    merged_df = pd.merge(sentiment_df, positive_change_df[['Ticker', 'Change']], on='Ticker')
+
+    # Sort by Combined_Sentiment (descending) and keep the best `count`
+    return merged_df.sort_values(by='Combined_Sentiment', ascending=False).head(count)
+
+
+def top_tickers_with_history(sentiment_df, price_df, count=10):
+    """top_tickers() plus each ticker's average sentiment over the last RECENT_DAYS days from the archive.
+
+    The archive is read only for these tickers' recent rows. Without an archive
+    the Sentiment_7d column is left out.
+    """
+    top = top_tickers(sentiment_df, price_df, count)
+    if archive_enabled() and not top.empty:
+        top_ticker_names = top['Ticker'].astype(str)
+        recent_df = load_history(columns=['Ticker', 'Combined_Sentiment'], tickers=top_ticker_names.tolist(),
+                                 start=pd.Timestamp.now() - pd.Timedelta(days=RECENT_DAYS))
+        recent_sentiment = recent_df.groupby('Ticker', observed=True)['Combined_Sentiment'].mean()
+        recent_sentiment.index = recent_sentiment.index.astype(str)
+        top = top.assign(Sentiment_7d=top_ticker_names.map(recent_sentiment))
+    return top
+
+
+def sentiment_vs_price(sentiment_df, price_df, y_variable):
+    """Average sentiment next to one export.csv column per ticker (plotone.py's plot 1)."""
+    # Change is parsed to a number by the loader; drop tickers without one
+    price_df = price_df.dropna(subset=['Change'])
+
+    # Merge sentiment and price data without filtering by selected ticker
+    return pd.merge(sentiment_df, price_df[['Ticker', y_variable]], on='Ticker', how='inner')
+
+
+# Sentiment and price features over time, for all tickers at once.
+#
+# The history is turned into panels: one row per period (FEATURE_FREQ) and one
+# column per ticker. Every feature is then a handful of NumPy operations over
+# the whole panel, never a loop over tickers.
+
+# Length of a period; a fixed pandas frequency ("D", "h", "15min")
+FEATURE_FREQ = "D"
+# Periods in the rolling mean, and the periods after which an article's weight halves
+ROLLING_WINDOW = 7
+DECAY_HALFLIFE = 3.0
+# Short and long windows of sentiment momentum (short mean minus long mean)
+MOMENTUM_WINDOWS = (3, 20)
+# Sentiment in period t against the return in period t + lag; negative lags test returns leading sentiment
+CORRELATION_LAGS = range(-2, 6)
+# Fewest (sentiment, return) pairs a ticker needs for a correlation
+MIN_CORRELATION_PAIRS = 10
+
+
+def sentiment_panel(history, freq=FEATURE_FREQ, value='Combined_Sentiment'):
+    """(sums, counts): per-period sentiment sums and article counts, one column per ticker.
+
+    The rows cover every period from the first to the last article; periods
+    without articles have a count of 0.
+    """
+    frame = history[['Date', 'Ticker', value]].dropna()
+    grouped = frame[value].astype('float64').groupby([frame['Date'].dt.floor(freq), frame['Ticker']], observed=True)
+    sums = grouped.sum().unstack(fill_value=0.0)
+    counts = grouped.count().unstack(fill_value=0)
+    index = pd.date_range(sums.index.min(), sums.index.max(), freq=freq, name='Date')
+    sums, counts = sums.reindex(index, fill_value=0.0), counts.reindex(index, fill_value=0)
+    sums.columns = counts.columns = sums.columns.astype(str).rename('Ticker')
+    return sums, counts
+
+
+def return_panel(prices, index, columns, freq=FEATURE_FREQ, value='Price'):
+    """Per-period price returns on the sentiment panel's rows and columns, from (Ticker, Date, Price) rows.
+
+    The last price of a period counts, and a period without one keeps the
+    previous price, so its return is 0 until the next observation.
+    """
+    frame = prices[['Date', 'Ticker', value]].dropna().sort_values('Date', kind='stable')
+    closes = frame.groupby([frame['Date'].dt.floor(freq), frame['Ticker'].astype(str)])[value].last().unstack()
+    closes = closes.reindex(index=closes.index.union(index), columns=columns).ffill()
+    # A ticker's first price has no return
+    return closes.pct_change(fill_method=None).reindex(index)
+
+
+def rolling_sums(values, window):
+    """Sum of the last `window` rows of a 2-D array, for every row (fewer at the start)."""
+    totals = np.cumsum(values, axis=0)
+    totals[window:] -= totals[:-window].copy()
+    return totals
+
+
+def decayed_sums(values, halflife):
+    """Sum of all earlier rows weighted by 0.5 ** (age / halflife), for every row."""
+    decay = 0.5 ** (1.0 / halflife)
+    totals = np.empty_like(values, dtype='float64')
+    running = np.zeros(values.shape[1])
+    # One step per period; each step covers all tickers
+    for row in range(len(values)):
+        running = running * decay + values[row]
+        totals[row] = running
+    return totals
+
+
+def weighted_mean(sums, counts):
+    """Sentiment per article; NaN where no article counts."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def rolling_sentiment(sums, counts, window=ROLLING_WINDOW):
+    """Mean sentiment of the articles in the last `window` periods, as a panel."""
+    means = weighted_mean(rolling_sums(sums.to_numpy('float64'), window), rolling_sums(counts.to_numpy('float64'), window))
+    return pd.DataFrame(means, index=sums.index, columns=sums.columns)
+
+
+def decayed_sentiment(sums, counts, halflife=DECAY_HALFLIFE):
+    """Mean sentiment of all articles so far, each weighted by 0.5 ** (age in periods / halflife)."""
+    means = weighted_mean(decayed_sums(sums.to_numpy('float64'), halflife), decayed_sums(counts.to_numpy('float64'), halflife))
+    return pd.DataFrame(means, index=sums.index, columns=sums.columns)
+
+
+def sentiment_momentum(sums, counts, windows=MOMENTUM_WINDOWS):
+    """Short rolling mean minus long rolling mean: positive when sentiment is improving."""
+    short, long = windows
+    return rolling_sentiment(sums, counts, short) - rolling_sentiment(sums, counts, long)
+
+
+def lagged_correlation(sentiment, returns, lags=CORRELATION_LAGS, min_pairs=MIN_CORRELATION_PAIRS):
+    """Per ticker, the correlation of sentiment in period t with the return in period t + lag, one column per lag.
+
+    Periods where either value is missing are left out; tickers with fewer
+    than min_pairs pairs get NaN.
+    """
+    x = sentiment.to_numpy('float64')
+    y = returns.reindex(index=sentiment.index, columns=sentiment.columns).to_numpy('float64')
+    correlations = {}
+    for lag in lags:
+        if lag >= 0:
+            xs, ys = x[:len(x) - lag], y[lag:]
+        else:
+            xs, ys = x[-lag:], y[:len(y) + lag]
+        valid = np.isfinite(xs) & np.isfinite(ys)
+        pairs = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            xs = np.where(valid, xs - np.where(valid, xs, 0).sum(axis=0) / pairs, 0)
+            ys = np.where(valid, ys - np.where(valid, ys, 0).sum(axis=0) / pairs, 0)
+            correlation = (xs * ys).sum(axis=0) / np.sqrt((xs * xs).sum(axis=0) * (ys * ys).sum(axis=0))
+        correlations[lag] = np.where(pairs >= min_pairs, correlation, np.nan)
+    return pd.DataFrame(correlations, index=sentiment.columns).rename_axis(columns='Lag')
+
+
+def sentiment_features(history, prices=None, freq=FEATURE_FREQ, window=ROLLING_WINDOW,
+                       halflife=DECAY_HALFLIFE, momentum=MOMENTUM_WINDOWS):
+    """One row per (Date, Ticker) from a ticker's first article on, with its sentiment features.
+
+    Columns: Articles, Sentiment (mean of the period's articles), Sentiment_Rolling,
+    Sentiment_Decayed, Sentiment_Momentum and, with prices (Ticker, Date, Price
+    rows), Return.
+    """
+    sums, counts = sentiment_panel(history, freq)
+    panels = {
+        'Articles': counts,
+        'Sentiment': pd.DataFrame(weighted_mean(sums.to_numpy('float64'), counts.to_numpy('float64')),
+                                  index=sums.index, columns=sums.columns),
+        'Sentiment_Rolling': rolling_sentiment(sums, counts, window),
+        'Sentiment_Decayed': decayed_sentiment(sums, counts, halflife),
+        'Sentiment_Momentum': sentiment_momentum(sums, counts, momentum),
+    }
+    if prices is not None:
+        panels['Return'] = return_panel(prices, sums.index, sums.columns, freq)
+
+    # Flatten the panels row by row; periods before a ticker's first article are left out
+    started = (np.cumsum(counts.to_numpy(), axis=0) > 0).ravel()
+    features = pd.DataFrame({
+        'Date': np.repeat(sums.index.to_numpy(), len(sums.columns))[started],
+        'Ticker': pd.Categorical.from_codes(np.tile(np.arange(len(sums.columns)), len(sums.index))[started],
+                                            categories=sums.columns),
+    })
+    for name, panel in panels.items():
+        features[name] = panel.to_numpy().ravel()[started]
+    return features
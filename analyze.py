@@ -1,115 +1,171 @@
-import pandas as pd
-import os
-import requests
-from bs4 import BeautifulSoup
-from finvader import finvader
-import time
-import sys
-
-# Ensure we have a ticker symbol from the command line
-if len(sys.argv) < 2:
-    print("Usage: python this_script.py <ticker>")
-    sys.exit(1)
-
-# Get the ticker from the command-line argument
-ticker = sys.argv[1]
-
-current_dir = os.getcwd()
-input_dir = current_dir
-output_dir = current_dir
-os.makedirs(output_dir, exist_ok=True)
-
-def analyze_sentiment(text: str) -> float:
-    sentiment_result = finvader(text, use_sentibignomics=True, use_henry=True, indicator='compound')
-    if isinstance(sentiment_result, dict) and 'compound' in sentiment_result:
-        return sentiment_result['compound']
-    return sentiment_result if isinstance(sentiment_result, float) else 0.0
-
-def fetch_article_content(url: str, retries: int = 3) -> str:
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    for attempt in range(retries):
-        try:
-            print(f"Fetching {url}, Attempt: {attempt + 1}")
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                paragraphs = soup.find_all('p')
-                return ' '.join([para.get_text() for para in paragraphs])
-            else:
-                print(f"Failed to fetch article from {url}: {response.status_code}")
-                time.sleep(1)
-        except requests.RequestException as e:
-            print(f"Attempt {attempt + 1}: Error fetching article from {url}: {e}")
-            time.sleep(1)
-    return ""
-
-input_file_name = f"{ticker}_today_news.csv"
-input_file_path = os.path.join(input_dir, input_file_name)
-output_file_path = os.path.join(output_dir, f"{ticker}_with_sentiment.csv")
-
-# Verify input file exists
-if not os.path.isfile(input_file_path):
-    print(f"News file for ticker '{ticker}' does not exist: {input_file_path}")
-    sys.exit(1)
-
-print(f"Processing file for ticker '{ticker}': {input_file_path}")
-
-try:
-    news_df = pd.read_csv(input_file_path)
-except pd.errors.EmptyDataError:
-    print(f"Skipping empty file: {input_file_path}")
-    sys.exit(1)
-
-required_columns = ['Link', 'Title']
-missing_columns = [col for col in required_columns if col not in news_df.columns]
-
-if missing_columns:
-    print(f"Missing columns {missing_columns} in {input_file_name}")
-    sys.exit(1)
-
-title_sentiments = []
-content_sentiments = []
-combined_sentiments = []
-
-for index, row in news_df.iterrows():
-    try:
-        url = row['Link']
-        title = row['Title']
-        print(f"Processing URL: {url}")
-
-        content = fetch_article_content(url)
-
-        if content and title:
-            title_sentiment = analyze_sentiment(title)
-            content_sentiment = analyze_sentiment(content)
-            combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
-
-            title_sentiments.append(title_sentiment)
-            content_sentiments.append(content_sentiment)
-            combined_sentiments.append(combined_sentiment)
-        else:
-            title_sentiments.append(0.0)
-            content_sentiments.append(0.0)
-            combined_sentiments.append(0.0)
-
-        time.sleep(1)
-    except KeyError as e:
-        print(f"Error processing row {index}: {e}")
-        continue
-
-news_df['Title_Sentiment'] = title_sentiments
-news_df['Content_Sentiment'] = content_sentiments
-news_df['Combined_Sentiment'] = combined_sentiments
-
-# Clear output file if it exists
-if os.path.isfile(output_file_path):
-    print(f"Clearing existing file: {output_file_path}")
-    with open(output_file_path, 'w'):
-        pass
-
-print(f"Creating new file: {output_file_path}")
-news_df.to_csv(output_file_path, index=False)
-
-print(f"Sentiment analysis completed and saved for ticker '{ticker}'.")
+import argparse
+import pandas as pd
+import os
+import requests
+import time
+import sys
+import profiler
+from fetcher import download_article, stats_summary
+from pipeline import RateLimiter, ordered_map
+from priority import read_watchlist
+from scoring import analyze_sentiment, score_contents, score_texts, start_chunk_workers
+
+start_chunk_workers()
+profiler.enable_profiling("analyze")
+
+current_dir = os.getcwd()
+input_dir = current_dir
+output_dir = current_dir
+os.makedirs(output_dir, exist_ok=True)
+
+# Article pages downloaded at the same time, and downloads started per second across all of them
+fetch_workers = int(os.environ.get("ANALYZE_FETCH_WORKERS", 4))
+fetch_rate = float(os.environ.get("ANALYZE_FETCH_RATE", 1.0))
+
+def fetch_article_content(url: str, retries: int = 3) -> str:
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    for attempt in range(retries):
+        try:
+            print(f"Fetching {url}, Attempt: {attempt + 1}")
+            status_code, article_text = download_article(url, headers, timeout=None)
+            if status_code == 200:
+                return article_text
+            else:
+                print(f"Failed to fetch article from {url}: {status_code}")
+                time.sleep(1)
+        except requests.RequestException as e:
+            print(f"Attempt {attempt + 1}: Error fetching article from {url}: {e}")
+            time.sleep(1)
+    return ""
+
+def read_ticker_news(ticker):
+    """The ticker's <ticker>_today_news.csv written by tickernews.py, or None if it cannot be used."""
+    input_file_name = f"{ticker}_today_news.csv"
+    input_file_path = os.path.join(input_dir, input_file_name)
+
+    # Verify input file exists
+    if not os.path.isfile(input_file_path):
+        print(f"News file for ticker '{ticker}' does not exist: {input_file_path}")
+        return None
+
+    print(f"Processing file for ticker '{ticker}': {input_file_path}")
+
+    try:
+        news_df = pd.read_csv(input_file_path)
+    except pd.errors.EmptyDataError:
+        print(f"Skipping empty file: {input_file_path}")
+        return None
+
+    required_columns = ['Link', 'Title']
+    missing_columns = [col for col in required_columns if col not in news_df.columns]
+
+    if missing_columns:
+        print(f"Missing columns {missing_columns} in {input_file_name}")
+        return None
+    return news_df
+
+def article_keys(news_df):
+    """(link, title) of each row; rows of the same article in different tickers' files share it."""
+    return list(zip(news_df['Link'].fillna('').astype(str), news_df['Title'].fillna('').astype(str)))
+
+def score_articles(articles):
+    """Scores of each (link, title): (title, content, combined), each article fetched and scored once."""
+    # Shared by the workers, so more workers overlap slow downloads without starting them any faster
+    limiter = RateLimiter(fetch_rate)
+
+    def fetch(article):
+        url = article[0]
+        if not url:
+            return ""
+        limiter.wait()
+        print(f"Processing URL: {url}")
+        return fetch_article_content(url)
+
+    # Fetch every article body first so the bodies can be scored as one batch
+    contents = list(ordered_map(fetch, articles, fetch_workers, 2 * fetch_workers))
+
+    # Analyze sentiment of all titles and bodies (SENTIMENT_ENGINE selects the scorer)
+    title_results = score_texts([title for _, title in articles], analyze_sentiment)
+    content_results = score_contents(contents, analyze_sentiment)
+
+    scores = {}
+    for article, title_sentiment, content_sentiment in zip(articles, title_results, content_results):
+        if title_sentiment is not None and content_sentiment is not None:
+            combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
+            scores[article] = (title_sentiment, content_sentiment, combined_sentiment)
+        else:
+            scores[article] = (0.0, 0.0, 0.0)
+    return scores
+
+def write_ticker_sentiment(ticker, news_df, scores):
+    output_file_path = os.path.join(output_dir, f"{ticker}_with_sentiment.csv")
+    row_scores = [scores[article] for article in article_keys(news_df)]
+    news_df['Title_Sentiment'] = [score[0] for score in row_scores]
+    news_df['Content_Sentiment'] = [score[1] for score in row_scores]
+    news_df['Combined_Sentiment'] = [score[2] for score in row_scores]
+
+    # Clear output file if it exists
+    if os.path.isfile(output_file_path):
+        print(f"Clearing existing file: {output_file_path}")
+        with open(output_file_path, 'w'):
+            pass
+
+    print(f"Creating new file: {output_file_path}")
+    news_df.to_csv(output_file_path, index=False)
+    print(f"Sentiment analysis completed and saved for ticker '{ticker}'.")
+
+def analyze_tickers(tickers):
+    """Score the news files of several tickers together and write each ticker's <ticker>_with_sentiment.csv.
+
+    An article in several tickers' news is downloaded and scored once. Returns
+    the tickers that were written.
+    """
+    news = {}
+    for ticker in tickers:
+        news_df = read_ticker_news(ticker)
+        if news_df is not None:
+            news[ticker] = news_df
+
+    # The union of all tickers' articles, in order of first appearance
+    articles = list(dict.fromkeys(article for news_df in news.values() for article in article_keys(news_df)))
+    if len(news) > 1:
+        rows = sum(len(news_df) for news_df in news.values())
+        print(f"{rows} news rows of {len(news)} tickers hold {len(articles)} distinct articles")
+    scores = score_articles(articles)
+
+    for ticker, news_df in news.items():
+        write_ticker_sentiment(ticker, news_df, scores)
+    return list(news)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score today's news of one or more tickers (from tickernews.py).")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--watchlist", action="store_true", help="Also score the tickers in WATCHLIST / watchlist.txt")
+    parser.add_argument("--fetch", action="store_true", help="Fetch the tickers' news with tickernews.py first")
+    args = parser.parse_args()
+
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += sorted(read_watchlist())
+    tickers = list(dict.fromkeys(tickers))
+    # Ensure we have a ticker symbol from the command line
+    if not tickers:
+        print("Usage: python analyze.py <ticker> [<ticker> ...] [--watchlist] [--fetch]")
+        sys.exit(1)
+
+    failed = []
+    if args.fetch:
+        # tickernews imports finvizfinance, which only --fetch needs
+        from tickernews import fetch_news_for_tickers
+        fetched = fetch_news_for_tickers(tickers)
+        # A failed ticker keeps an older news file; scoring it would pass yesterday's news off as today's
+        failed = [ticker for ticker in tickers if ticker not in fetched]
+        if failed:
+            print(f"Not scoring tickers whose news could not be fetched: {', '.join(failed)}")
+        tickers = [ticker for ticker in tickers if ticker in fetched]
+    written = analyze_tickers(tickers)
+    print(stats_summary())
+    if not written or failed:
+        sys.exit(1)
@@ -0,0 +1,357 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import profiler
+from articles import article_hashes, explode, normalize
+from schema import NEWS_DTYPES, NEWS_PATH, load_news, parse_dates
+
+# Folder of the partitioned Parquet archive; readers use it instead of the CSV once it exists
+ARCHIVE_ENV = "SENTIMENT_ARCHIVE"
+DEFAULT_ARCHIVE = "sentiment_archive"
+# Layout description written next to the partitions
+LAYOUT_FILE = "_layout.json"
+
+# Date partition granularity and the format of its partition value
+PERIOD_FORMATS = {"month": "%Y-%m", "day": "%Y-%m-%d"}
+# Rows per Parquet row group; rows are sorted by Ticker, so small groups let ticker filters skip most of a file
+ROW_GROUP_SIZE = 64 * 1024
+
+# Articles are the same article if these match (the key update.py uses)
+ARTICLE_KEY = ['Date', 'Title', 'Ticker']
+SCORE_COLUMNS = ['Title_Sentiment', 'Content_Sentiment', 'Combined_Sentiment']
+
+# Normalized archives keep each article once in articles/ and its tickers in tickers/ (see articles.py)
+ARTICLES_TABLE = "articles"
+TICKERS_TABLE = "tickers"
+
+
+def archive_path():
+    return os.environ.get(ARCHIVE_ENV, DEFAULT_ARCHIVE)
+
+
+def archive_enabled(path=None):
+    return os.path.exists(os.path.join(path or archive_path(), LAYOUT_FILE))
+
+
+def read_layout(path):
+    with open(os.path.join(path, LAYOUT_FILE), 'r', encoding='utf-8') as layout_file:
+        return json.load(layout_file)
+
+
+def write_layout(path, layout):
+    temp_path = os.path.join(path, f"{LAYOUT_FILE}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as layout_file:
+        json.dump(layout, layout_file)
+    os.replace(temp_path, os.path.join(path, LAYOUT_FILE))
+
+
+def partition_fields(layout, table=None):
+    """Names of the partition levels, e.g. ['month'] or ['month', 'Ticker'].
+
+    The articles table of a normalized archive has no Ticker column, so it is only
+    partitioned by date.
+    """
+    if table == ARTICLES_TABLE:
+        return [layout["period"]]
+    return [layout["period"]] + (["Ticker"] if layout["by_ticker"] else [])
+
+
+def partitioning(layout, table=None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([(field, pa.string()) for field in partition_fields(layout, table)]), flavor="hive")
+
+
+def open_dataset(path, layout, table=None):
+    import pyarrow.dataset as ds
+    folder = os.path.join(path, table) if table else path
+    return ds.dataset(folder, format="parquet", partitioning=partitioning(layout, table))
+
+
+def prepare(frame, layout):
+    """Give a news frame the archive's column types and add its partition column.
+
+    Every file of the archive must have the same schema, so labels are stored as
+    plain strings (Parquet dictionary-encodes them anyway) whatever dtype they came in.
+    """
+    frame = frame.copy()
+    for column in frame.columns:
+        if column == 'Date':
+            frame[column] = parse_dates(frame[column])
+        elif column in SCORE_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').astype('float32')
+        elif column == 'article_id':
+            frame[column] = frame[column].astype('int64')
+        else:
+            values = frame[column].astype(object)
+            frame[column] = values.where(values.notna(), None).map(lambda value: value if value is None else str(value))
+    frame[layout["period"]] = frame['Date'].dt.strftime(PERIOD_FORMATS[layout["period"]])
+    order = ['Ticker', 'Date'] if 'Ticker' in frame.columns else ['Date']
+    return frame.sort_values(order, kind='stable').reset_index(drop=True)
+
+
+def normalized_tables(frame, layout, first_id=0, known_ids=None):
+    """Prepared (articles, tickers) frames of a normalized archive for a news frame.
+
+    The tickers table holds only article_id and Ticker; it is partitioned by the
+    period of its article so that date filters prune both tables alike.
+    """
+    period = layout["period"]
+    articles, links = normalize(prepare(frame, layout), first_id, known_ids)
+    links[period] = links['article_id'].map(articles.set_index('article_id')[period])
+    # Ids grow with the date, so sorted by Ticker each ticker's ids are ascending and delta-encode to a few bits
+    return articles, links.sort_values(['Ticker', 'article_id'], kind='stable').reset_index(drop=True)
+
+
+def arrow_schema(columns):
+    import pyarrow as pa
+    types = {'Date': pa.timestamp('us'), 'article_id': pa.int64(), **{column: pa.float32() for column in SCORE_COLUMNS}}
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+def write_partitions(frame, path, layout, existing_data_behavior, table=None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    arrow_table = pa.Table.from_pandas(frame, schema=arrow_schema(frame.columns), preserve_index=False)
+    # Years of day partitions (times tickers) go well past pyarrow's default limit of 1024
+    partitions = max(len(frame[partition_fields(layout, table)].drop_duplicates()), 1)
+    file_options = None
+    if 'article_id' in frame.columns:
+        # Sorted ids take a few bits each as deltas; a dictionary of unique ids would only add to them
+        file_options = ds.ParquetFileFormat().make_write_options(
+            use_dictionary=[column for column in frame.columns if column != 'article_id'],
+            column_encoding={'article_id': 'DELTA_BINARY_PACKED'})
+    ds.write_dataset(arrow_table, os.path.join(path, table) if table else path, format="parquet",
+                     file_options=file_options, partitioning=partitioning(layout, table), max_partitions=partitions,
+                     existing_data_behavior=existing_data_behavior, basename_template="part-{i}.parquet",
+                     max_rows_per_group=ROW_GROUP_SIZE, min_rows_per_group=min(ROW_GROUP_SIZE, max(len(frame), 1)))
+
+
+def write_archive(frame, path=None, period="month", by_ticker=False, normalized=True):
+    """Replace the archive with `frame`. The new archive is built next to the old one and swapped in.
+
+    A normalized archive stores each article once, however many tickers it is tagged with.
+    """
+    path = path or archive_path()
+    layout = {"period": period, "by_ticker": by_ticker, "normalized": normalized}
+    if normalized:
+        layout["next_id"] = 0
+    building = f"{path}.building"
+    shutil.rmtree(building, ignore_errors=True)
+    if normalized:
+        for table in (ARTICLES_TABLE, TICKERS_TABLE):
+            os.makedirs(os.path.join(building, table))
+        if len(frame):
+            articles, links = normalized_tables(frame, layout)
+            write_partitions(articles, building, layout, "error", ARTICLES_TABLE)
+            write_partitions(links, building, layout, "error", TICKERS_TABLE)
+            layout["next_id"] = len(articles)
+    elif len(frame):
+        write_partitions(prepare(frame, layout), building, layout, "error")
+    os.makedirs(building, exist_ok=True)
+    write_layout(building, layout)
+
+    retired = f"{path}.old"
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, retired)
+    os.rename(building, path)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def append_to_archive(frame, path=None):
+    """Add new articles, rewriting only the partitions they fall into.
+
+    Rows already archived under the same Date, Title and Ticker are replaced.
+    In a normalized archive, articles already stored keep their article_id.
+    """
+    import pyarrow.dataset as ds
+    path = path or archive_path()
+    if frame.empty:
+        return
+    layout = read_layout(path)
+    if not layout.get("normalized"):
+        merge_partitions(prepare(frame, layout), path, layout, ARTICLE_KEY)
+        return
+    # An article's Date fixes its period, so the ids of re-sent articles are in the periods being rewritten
+    period = layout["period"]
+    periods = parse_dates(frame['Date']).dt.strftime(PERIOD_FORMATS[period]).dropna().unique().tolist()
+    stored = open_dataset(path, layout, ARTICLES_TABLE).to_table(
+        columns=['article_id', 'Date', 'Title', 'Url'], filter=ds.field(period).isin(periods)).to_pandas()
+    known_ids = dict(zip(article_hashes(stored), stored['article_id'])) if len(stored) else None
+    next_id = layout.get("next_id", 0)
+    articles, links = normalized_tables(frame, layout, next_id, known_ids)
+    merge_partitions(articles, path, layout, ['article_id'], ARTICLES_TABLE)
+    merge_partitions(links, path, layout, ['article_id', 'Ticker'], TICKERS_TABLE)
+    layout["next_id"] = max(next_id, int(articles['article_id'].max()) + 1)
+    write_layout(path, layout)
+
+
+def merge_partitions(new_rows, path, layout, key, table=None):
+    """Rewrite the partitions new_rows fall into, with new_rows replacing archived rows with the same key."""
+    import pyarrow.dataset as ds
+    # Read back every partition the new rows touch
+    fields = partition_fields(layout, table)
+    touched = new_rows[fields].drop_duplicates()
+    dataset = open_dataset(path, layout, table)
+    existing = []
+    for values in touched.itertuples(index=False):
+        condition = None
+        for field, value in zip(fields, values):
+            term = ds.field(field) == value
+            condition = term if condition is None else condition & term
+        existing.append(dataset.to_table(filter=condition).to_pandas())
+
+    combined = pd.concat(existing + [new_rows], ignore_index=True)
+    combined = combined.drop_duplicates(subset=key, keep='last')
+    if table == TICKERS_TABLE:
+        # Nothing to convert, and no Date to take the period from
+        combined = combined.sort_values(['Ticker', 'article_id'], kind='stable').reset_index(drop=True)
+    else:
+        combined = prepare(combined.drop(columns=[layout["period"]]), layout)
+    write_partitions(combined, path, layout, "delete_matching", table)
+
+
+def combine(terms):
+    """The conjunction of dataset filter terms, or None for no filter."""
+    condition = None
+    for term in terms:
+        condition = term if condition is None else condition & term
+    return condition
+
+
+def read_archive(path=None, columns=None, tickers=None, start=None, end=None):
+    """Read articles from the archive, reading only the requested columns, tickers and dates.
+
+    Partitions outside [start, end] are never opened, and row groups whose Ticker or
+    Date statistics cannot match are skipped. A date-only `end` covers that whole day.
+    A normalized archive is returned in the same one-row-per-ticker layout.
+    """
+    import pyarrow.dataset as ds
+    path = path or archive_path()
+    layout = read_layout(path)
+    period = layout["period"]
+
+    period_terms, date_terms = [], []
+    if start is not None:
+        start = pd.Timestamp(start)
+        period_terms.append(ds.field(period) >= start.strftime(PERIOD_FORMATS[period]))
+        date_terms.append(ds.field('Date') >= start.to_pydatetime())
+    if end is not None:
+        end_text = str(end)
+        end = pd.Timestamp(end)
+        period_terms.append(ds.field(period) <= end.strftime(PERIOD_FORMATS[period]))
+        if len(end_text) <= 10:
+            date_terms.append(ds.field('Date') < (end + pd.Timedelta(days=1)).to_pydatetime())
+        else:
+            date_terms.append(ds.field('Date') <= end.to_pydatetime())
+    ticker_terms = [ds.field('Ticker').isin(list(tickers))] if tickers is not None else []
+
+    if layout.get("normalized"):
+        frame = read_normalized(path, layout, columns, combine(period_terms + ticker_terms),
+                                combine(period_terms + date_terms), tickers is not None)
+    else:
+        dataset = open_dataset(path, layout)
+        names = [name for name in dataset.schema.names if name != period]
+        selected = names if columns is None else [name for name in names if name in columns]
+        frame = dataset.to_table(columns=selected, filter=combine(period_terms + date_terms + ticker_terms)).to_pandas()
+    # Same dtypes as schema.load_news
+    for column, dtype in NEWS_DTYPES.items():
+        if dtype == 'category' and column in frame.columns:
+            frame[column] = frame[column].astype('category')
+    return frame
+
+
+def read_normalized(path, layout, columns, link_condition, article_condition, by_ticker):
+    """Join the tickers and articles tables of a normalized archive back into news rows.
+
+    Date filters are in article_condition only, as the tickers table has no Date column.
+    """
+    import pyarrow.dataset as ds
+    period = layout["period"]
+    links_dataset = open_dataset(path, layout, TICKERS_TABLE)
+    articles_dataset = open_dataset(path, layout, ARTICLES_TABLE)
+    article_names = [name for name in articles_dataset.schema.names if name not in (period, 'article_id')]
+    wanted = [name for name in article_names if columns is None or name in columns]
+
+    links = links_dataset.to_table(columns=['article_id', 'Ticker'], filter=link_condition).to_pandas()
+    if not wanted and article_condition is None:
+        return links[['Ticker']] if columns is None or 'Ticker' in columns else links[[]]
+    if by_ticker:
+        # Only the articles of the requested tickers are read
+        ids = ds.field('article_id').isin(links['article_id'].unique())
+        article_condition = ids if article_condition is None else article_condition & ids
+    articles = articles_dataset.to_table(columns=['article_id'] + wanted, filter=article_condition).to_pandas()
+    return explode(articles, links, columns=None if columns is None else list(columns))
+
+
+def load_history(columns=None, tickers=None, start=None, end=None, csv_path=NEWS_PATH):
+    """Load scored articles from the archive if there is one, otherwise from news_with_sentiment.csv."""
+    if archive_enabled():
+        return read_archive(columns=columns, tickers=tickers, start=start, end=end)
+
+    needed = None if columns is None else list(columns) + [column for column in ('Ticker', 'Date') if column not in columns]
+    frame = load_news(csv_path, columns=needed)
+    if tickers is not None:
+        frame = frame[frame['Ticker'].isin(list(tickers))]
+    if start is not None:
+        frame = frame[frame['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        limit = pd.Timestamp(end)
+        frame = frame[frame['Date'] < limit + pd.Timedelta(days=1)] if len(str(end)) <= 10 else frame[frame['Date'] <= limit]
+    if columns is not None:
+        frame = frame[[column for column in frame.columns if column in columns]]
+    return frame.reset_index(drop=True)
+
+
+def refresh_archive(csv_path=NEWS_PATH):
+    """Rebuild an existing archive from news_with_sentiment.csv after the CSV was rewritten."""
+    if not archive_enabled():
+        return
+    layout = read_layout(archive_path())
+    write_archive(load_news(csv_path), period=layout["period"], by_ticker=layout["by_ticker"],
+                  normalized=layout.get("normalized", False))
+    logging.info(f"Rebuilt the archive in {archive_path()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned Parquet archive of news_with_sentiment.csv.")
+    parser.add_argument("command", choices=["migrate", "info"],
+                        help="migrate: build the archive from the CSV; info: show its partitions")
+    parser.add_argument("--input", default=NEWS_PATH)
+    parser.add_argument("--archive", default=archive_path())
+    parser.add_argument("--period", choices=sorted(PERIOD_FORMATS), default="month", help="date partition size")
+    parser.add_argument("--by-ticker", action="store_true", help="also partition by ticker")
+    parser.add_argument("--exploded", action="store_true",
+                        help="store one full row per ticker, as in the CSV, instead of each article once")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        started = time.perf_counter()
+        frame = load_news(args.input)
+        write_archive(frame, args.archive, args.period, args.by_ticker, normalized=not args.exploded)
+        print(f"Archived {len(frame):,} rows from {args.input} into {args.archive} in {time.perf_counter() - started:.1f}s")
+        return
+
+    if not archive_enabled(args.archive):
+        print(f"No archive in {args.archive}; create it with: python archive.py migrate")
+        return
+    layout = read_layout(args.archive)
+    files = [os.path.join(folder, name) for folder, _, names in os.walk(args.archive) for name in names if name.endswith('.parquet')]
+    size = sum(os.path.getsize(file) for file in files)
+    print(f"{args.archive}: partitioned by {', '.join(partition_fields(layout))}, {len(files)} files, {size / 2 ** 20:.1f} MiB")
+    if layout.get("normalized"):
+        articles = open_dataset(args.archive, layout, ARTICLES_TABLE).count_rows()
+        links = open_dataset(args.archive, layout, TICKERS_TABLE).count_rows()
+        print(f"Normalized: {articles:,} articles with {links:,} ticker links ({links / max(articles, 1):.2f} per article)")
+
+
+if __name__ == "__main__":
+    profiler.enable_profiling("archive")
+    main()
@@ -0,0 +1,108 @@
+"""Normalized article layout: one row per article and one link row per (article, ticker).
+
+Finviz tags an article with every ticker it mentions. export.py and update.py
+write a full copy of the article for each of them, and news_with_sentiment.csv
+repeats its scores once per ticker. Here the article text and scores are kept
+once in an articles table, and an article_tickers table links articles to
+tickers. explode() rebuilds the familiar one-row-per-ticker layout for
+existing readers.
+
+The sentiment scripts group the rows of an article to fetch and score it once,
+and the Parquet archive stores the two tables (see archive.py).
+
+    python articles.py [news_with_sentiment.csv]
+
+shows how much of a file is duplication.
+"""
+import argparse
+import itertools
+import os
+
+import pandas as pd
+
+from schema import DATE_FORMAT, NEWS_PATH, load_news
+
+# The same article, whatever tickers it is tagged with
+ARTICLE_COLUMNS = ['Date', 'Title', 'Url']
+# Column order of news_with_sentiment.csv, which explode() reproduces
+NEWS_COLUMNS = ['Title', 'Source', 'Date', 'Url', 'Category', 'Ticker',
+                'Title_Sentiment', 'Content_Sentiment', 'Combined_Sentiment']
+
+
+def article_key(record):
+    return tuple(record.get(column) or '' for column in ARTICLE_COLUMNS)
+
+
+def consecutive_groups(rows):
+    """Group (row number, record) pairs of rows that follow each other, as export.py writes an article's tickers."""
+    for _, group in itertools.groupby(rows, key=lambda row: article_key(row[1])):
+        yield list(group)
+
+
+def group_rows(rows):
+    """Group (row number, record) pairs into one list per article, in order of first appearance."""
+    groups = {}
+    for index, record in rows:
+        groups.setdefault(article_key(record), []).append((index, record))
+    return list(groups.values())
+
+
+def article_hashes(frame):
+    """A 64-bit hash of each row's Date, Title and Url, equal for rows of the same article."""
+    keys = {}
+    for column in ARTICLE_COLUMNS:
+        values = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime(DATE_FORMAT)
+        values = values.astype(object)
+        keys[column] = values.where(values.notna(), '').astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(keys), index=False).to_numpy()
+
+
+def normalize(frame, first_id=0, known_ids=None):
+    """Split an exploded news frame into (articles, article_tickers).
+
+    Articles are numbered in date order from first_id, which keeps the ids small and
+    sorted so they compress well. known_ids maps article_hashes() of articles that
+    already have an id to that id. Each article keeps the scores of its first row.
+    """
+    if 'Date' in frame.columns:
+        frame = frame.sort_values('Date', kind='stable')
+    hashes = pd.Series(article_hashes(frame), index=frame.index)
+    ids = hashes.map(known_ids) if known_ids is not None and len(known_ids) else pd.Series(float('nan'), index=frame.index)
+    new = ids.isna()
+    codes, _ = pd.factorize(hashes[new])
+    ids[new] = codes + first_id
+    frame = frame.assign(article_id=ids.astype('int64'))
+    links = frame[['article_id', 'Ticker']].drop_duplicates()
+    articles = frame.drop(columns=['Ticker']).drop_duplicates(subset=['article_id'])
+    return articles.reset_index(drop=True), links.reset_index(drop=True)
+
+
+def explode(articles, links, columns=None):
+    """One row per (article, ticker) with the columns in news_with_sentiment.csv order."""
+    frame = links.merge(articles, on='article_id', how='inner', sort=False)
+    order = [column for column in NEWS_COLUMNS if column in frame.columns]
+    order += [column for column in frame.columns if column not in order and column != 'article_id']
+    if columns is not None:
+        order = [column for column in order if column in columns]
+    return frame[order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how much of a news file repeats articles tagged with several tickers.")
+    parser.add_argument("path", nargs="?", default=NEWS_PATH)
+    args = parser.parse_args()
+
+    frame = load_news(args.path)
+    articles, links = normalize(frame)
+    text_columns = [column for column in ('Title', 'Source', 'Url', 'Category') if column in frame.columns]
+    repeated_text = frame[text_columns].astype(str).apply(lambda column: column.str.len()).to_numpy().sum()
+    unique_text = articles[text_columns].astype(str).apply(lambda column: column.str.len()).to_numpy().sum()
+    print(f"{args.path}: {len(frame):,} rows, {len(articles):,} articles, "
+          f"{len(links) / max(len(articles), 1):.2f} tickers per article ({os.path.getsize(args.path) / 2 ** 20:.1f} MiB)")
+    print(f"Article text: {repeated_text / 2 ** 20:.1f} MiB as stored, {unique_text / 2 ** 20:.1f} MiB once per article")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Time and peak memory of each analytics step on synthetic histories of growing size.
+
+Run from the repository root:
+
+    python -m benchmarks.analytics [--rows 100000,1000000,5000000] [--tickers 5000]
+    python -m benchmarks.analytics --data FOLDER
+
+For every --rows value a data folder is generated with benchmarks/synthetic.py
+(or --data is used as is), then each step runs in its own process in that
+folder, so its peak resident memory can be measured on its own. Generated
+folders also get a Parquet archive of the history, as the dashboard reads it:
+
+    load_history   schema.load_news over the whole history
+    compilesent    compilesent.py, including the dashboard snapshot it publishes
+    topten         Dashboard.topten's data step (snapshot read + analytics.top_tickers_with_history)
+    create_plot    plotone.create_plot's data step (+ the Plotly figure if plotly is installed)
+    update_dedupe  update.py's dedupe of the latest export against the history
+
+The summary flags steps whose time grows much faster than the row count.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import add_arguments, generate, generation_options
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ["load_history", "compilesent", "topten", "create_plot", "update_dedupe"]
+# A step whose time grows this much faster than its input is reported as a scaling cliff
+CLIFF_RATIO = 1.5
+
+
+def step_load_history():
+    from schema import load_news
+    frame = load_news()
+    return f"{len(frame):,} rows"
+
+
+def step_compilesent():
+    import runpy
+    runpy.run_path(os.path.join(REPO_DIR, "compilesent.py"), run_name="__main__")
+    return ""
+
+
+def step_topten():
+    from analytics import top_tickers_with_history
+    from snapshot import SnapshotReader
+    snapshot = SnapshotReader()
+    top = top_tickers_with_history(snapshot.frame('summary'), snapshot.frame('prices', columns=['Ticker', 'Change']))
+    if not len(top):
+        return "no tickers"
+    recent = "with 7-day archive sentiment" if 'Sentiment_7d' in top.columns else "no archive"
+    return f"top ticker {top['Ticker'].iloc[0]}, {recent}"
+
+
+def step_create_plot():
+    from analytics import sentiment_vs_price
+    from snapshot import SnapshotReader
+    snapshot = SnapshotReader()
+    combined = sentiment_vs_price(snapshot.frame('summary'),
+                                  snapshot.frame('prices', columns=['Ticker', 'Change', 'Price']), 'Price')
+    try:
+        import plotly.express as px
+    except ImportError:
+        return f"{len(combined):,} points (plotly not installed, figure skipped)"
+    px.scatter(combined, x='Combined_Sentiment', y='Price', text='Ticker')
+    return f"{len(combined):,} points"
+
+
+def step_update_dedupe():
+    import csv
+    import update
+    with open("news_feed.csv", 'r', encoding='utf-8') as feed_file:
+        all_news = list(csv.DictReader(feed_file))
+    existing_news = update.read_existing_news("news_with_sentiment.csv")
+    new_entries = update.filter_new_entries(update.split_articles_by_ticker(all_news), existing_news)
+    return f"{len(new_entries):,} new of {len(all_news):,} articles"
+
+
+def peak_memory():
+    """Peak resident memory of this process in MiB, or None where it cannot be read."""
+    # VmHWM starts fresh at exec; ru_maxrss on Linux also counts the parent's memory at fork
+    try:
+        with open("/proc/self/status", 'r') as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def run_step(name):
+    """Child process: run one step in the current folder and print its time and peak memory as JSON."""
+    started = time.perf_counter()
+    detail = globals()[f"step_{name}"]()
+    print(json.dumps({"seconds": time.perf_counter() - started, "peak": peak_memory(), "detail": detail}))
+
+
+def measure_step(name, folder):
+    """Run a step in a new process; returns (seconds, peak RSS in MiB or None, detail)."""
+    command = [sys.executable, "-m", "benchmarks.analytics", "--step", name]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")]))}
+    # Keep the archive and snapshot settings of the real data folder out of the benchmark
+    env.update({"SENTIMENT_ARCHIVE": os.path.join(folder, "sentiment_archive"),
+                "DASHBOARD_SNAPSHOT": os.path.join(folder, "snapshot")})
+    result = subprocess.run(command, cwd=folder, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Step {name} failed: {result.stderr.strip().splitlines()[-1:]}")
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return measured["seconds"], measured["peak"], measured["detail"]
+
+
+def benchmark_folder(folder, label):
+    print(f"\n{label}")
+    print(f"{'step':14} {'time':>9} {'peak RSS':>10}  detail")
+    results = {}
+    for name in STEPS:
+        seconds, peak, detail = measure_step(name, folder)
+        results[name] = (seconds, peak)
+        peak_text = f"{peak:6.0f} MiB" if peak is not None else "       -"
+        print(f"{name:14} {seconds:8.2f}s {peak_text:>10}  {detail}")
+    return results
+
+
+def report_scaling(scales):
+    """Compare each scale with the previous one and flag superlinear growth."""
+    print("\nScaling (time and memory growth relative to row growth):")
+    for (rows_before, before), (rows_after, after) in zip(scales, scales[1:]):
+        growth = rows_after / rows_before
+        for name in STEPS:
+            time_growth = after[name][0] / max(before[name][0], 1e-9)
+            line = f"  {rows_before:>11,} -> {rows_after:<11,} {name:14} time x{time_growth:6.1f} (rows x{growth:.1f})"
+            if after[name][1] and before[name][1]:
+                line += f", memory x{after[name][1] / before[name][1]:.1f}"
+            if time_growth > growth * CLIFF_RATIO:
+                line += "  <- grows faster than the data"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="100000,1000000", help="comma-separated history sizes to generate")
+    parser.add_argument("--data", help="existing data folder to benchmark instead of generating one")
+    parser.add_argument("--keep", help="keep the generated folders under this folder")
+    parser.add_argument("--step", choices=STEPS, help=argparse.SUPPRESS)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.step:
+        run_step(args.step)
+        return
+    if args.data:
+        benchmark_folder(args.data, f"Data folder {args.data}")
+        return
+
+    # Imported here, so the step processes' peak memory does not include the archive's modules
+    from archive import write_archive
+    from schema import load_news
+    scales = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        base = args.keep or temp_dir
+        for rows in sorted(int(value) for value in args.rows.split(',')):
+            folder = os.path.join(base, f"rows_{rows}")
+            started = time.perf_counter()
+            summary = generate(folder, rows, **generation_options(args))
+            write_archive(load_news(os.path.join(folder, "news_with_sentiment.csv")), os.path.join(folder, "sentiment_archive"))
+            label = (f"{summary['history_rows']:,} history rows, {summary['tickers']:,} tickers "
+                     f"(generated in {time.perf_counter() - started:.1f}s)")
+            scales.append((summary['history_rows'], benchmark_folder(folder, label)))
+    if len(scales) > 1:
+        report_scaling(scales)
+
+
+if __name__ == "__main__":
+    main()
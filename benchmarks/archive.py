@@ -0,0 +1,86 @@
+"""Scan times of typical history queries on the CSV and on the partitioned Parquet archive.
+
+Run from the repository root:
+
+    python -m benchmarks.archive [--rows 2000000] [--period month] [--by-ticker]
+
+A synthetic news_with_sentiment.csv (see benchmarks/schema.py) is migrated into an
+archive in a temporary folder, then each query is timed on both.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from archive import read_archive, write_archive
+from benchmarks.schema import write_synthetic
+from schema import load_news
+
+
+def timed(load):
+    started = time.perf_counter()
+    frame = load()
+    return time.perf_counter() - started, len(frame)
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Rows of synthetic history to generate")
+    parser.add_argument("--period", choices=["month", "day"], default="month", help="Date partition size")
+    parser.add_argument("--by-ticker", action="store_true", help="Also partition by ticker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "news_with_sentiment.csv")
+        archive_path = os.path.join(folder, "sentiment_archive")
+        write_synthetic(csv_path, args.rows)
+
+        started = time.perf_counter()
+        write_archive(load_news(csv_path), archive_path, args.period, args.by_ticker)
+        print(f"Migrated {args.rows:,} rows in {time.perf_counter() - started:.1f}s: "
+              f"CSV {os.path.getsize(csv_path) / 2 ** 20:.1f} MiB, archive {folder_size(archive_path) / 2 ** 20:.1f} MiB\n")
+
+        history = load_news(csv_path, columns=['Ticker', 'Date'])
+        ticker = str(history['Ticker'].value_counts().index[0])
+        last = history['Date'].max()
+        week = (last - pd.Timedelta(days=7)).strftime('%Y-%m-%d')
+        day = last.strftime('%Y-%m-%d')
+
+        def csv_query(columns, tickers=None, start=None, end=None):
+            frame = load_news(csv_path, columns=columns + ['Ticker', 'Date'])
+            if tickers:
+                frame = frame[frame['Ticker'].isin(tickers)]
+            if start:
+                frame = frame[frame['Date'] >= pd.Timestamp(start)]
+            if end:
+                frame = frame[frame['Date'] < pd.Timestamp(end) + pd.Timedelta(days=1)]
+            return frame[columns]
+
+        queries = [
+            (f"{ticker} over the last week", ['Date', 'Combined_Sentiment'], dict(tickers=[ticker], start=week)),
+            (f"all tickers on {day}", ['Ticker', 'Combined_Sentiment'], dict(start=day, end=day)),
+            ("averages per ticker (compilesent.py)", ['Ticker', 'Combined_Sentiment'], {}),
+            ("every column", None, {}),
+        ]
+
+        print(f"{'query':40} {'rows':>9} {'CSV':>8} {'archive':>8} {'speedup':>8}")
+        for label, columns, filters in queries:
+            if columns is None:
+                csv_time, rows = timed(lambda: load_news(csv_path))
+                archive_time, archive_rows = timed(lambda: read_archive(archive_path))
+            else:
+                csv_time, rows = timed(lambda: csv_query(columns, **filters))
+                archive_time, archive_rows = timed(lambda: read_archive(archive_path, columns=columns, **filters))
+            if rows != archive_rows:
+                print(f"  row count mismatch: CSV {rows}, archive {archive_rows}")
+            print(f"{label:40} {rows:9,} {csv_time:7.2f}s {archive_time:7.2f}s {csv_time / archive_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
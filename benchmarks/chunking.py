@@ -0,0 +1,82 @@
+"""Accuracy vs. speed of chunked content scoring compared with whole-text scoring.
+
+Run from the repository root:
+
+    python -m benchmarks.chunking [--padding 1000]
+
+Each fixture article is padded with a repeated legal footer and comment section
+to mimic the oversized pages seen in production. Scores are compared against
+whole-text scoring of the padded body and against the clean article body.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from scoring import analyze_sentiment, score_chunked
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "articles.csv")
+
+FOOTER = (
+    "This material is provided for informational purposes only and is not investment advice. "
+    "Past performance does not guarantee future results. All rights reserved.\n"
+)
+COMMENTS = (
+    "Great company, buying more on every dip!\n"
+    "Terrible management, this stock will crash.\n"
+    "Does anyone know when the next earnings call is?\n"
+)
+
+
+def load_corpus(padding):
+    corpus = pd.read_csv(FIXTURE_PATH)
+    corpus['Padded'] = corpus['Content'] + '\n' + (FOOTER + COMMENTS) * padding
+    return corpus
+
+
+def time_scores(texts, score):
+    scores = []
+    durations = []
+    for text in texts:
+        started = time.perf_counter()
+        scores.append(score(text))
+        durations.append(time.perf_counter() - started)
+    return scores, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--padding", type=int, default=1000, help="Footer/comment repetitions appended to each body")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for chunk scoring")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.padding)
+    clean_scores, _ = time_scores(corpus['Content'], analyze_sentiment)
+    whole_scores, whole_times = time_scores(corpus['Padded'], analyze_sentiment)
+
+    configurations = [("whole text", None)]
+    for mode in ("sentence", "paragraph"):
+        for max_chars, budget in ((2000, 10000), (5000, 25000), (5000, 100000)):
+            configurations.append((f"{mode} {max_chars}/{budget}", (mode, max_chars, budget)))
+
+    print(f"{len(corpus)} articles, mean padded length {corpus['Padded'].str.len().mean():,.0f} chars")
+    print(f"{'configuration':<26} {'mean ms':>8} {'max ms':>8} {'MAE whole':>10} {'MAE clean':>10} {'sign agree':>10}")
+    for name, settings in configurations:
+        if settings is None:
+            scores, durations = whole_scores, whole_times
+        else:
+            mode, max_chars, budget = settings
+            scores, durations = time_scores(
+                corpus['Padded'],
+                lambda text: score_chunked(text, mode, max_chars, budget, args.workers),
+            )
+        mae_whole = sum(abs(a - b) for a, b in zip(scores, whole_scores)) / len(scores)
+        mae_clean = sum(abs(a - b) for a, b in zip(scores, clean_scores)) / len(scores)
+        agree = sum((a > 0) == (b > 0) for a, b in zip(scores, clean_scores)) / len(scores)
+        print(f"{name:<26} {1000 * sum(durations) / len(durations):>8.1f} {1000 * max(durations):>8.1f} "
+              f"{mae_whole:>10.3f} {mae_clean:>10.3f} {agree:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
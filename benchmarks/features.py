@@ -0,0 +1,174 @@
+"""Time of the sentiment and return features in analytics.py at thousands of tickers and months of history.
+
+Run from the repository root:
+
+    python -m benchmarks.features [--tickers 1000,5000] [--days 90,180] [--rate 2]
+
+For every (tickers, days) pair an in-memory history is generated: about --rate
+articles per ticker and day, spread over the tickers by a Zipf law like
+benchmarks/synthetic.py, and one close price per ticker and trading day. Each
+ticker's price drifts with its previous day's sentiment, so the lag 1
+correlation comes out positive.
+
+Every step runs on all tickers at once. For comparison the same features are
+computed with a loop over --loop-tickers tickers (resample, rolling, ewm and
+corr per ticker); that time is scaled up to all tickers, and the largest
+difference between the two results is reported.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    CORRELATION_LAGS,
+    DECAY_HALFLIFE,
+    MOMENTUM_WINDOWS,
+    ROLLING_WINDOW,
+    decayed_sentiment,
+    lagged_correlation,
+    return_panel,
+    rolling_sentiment,
+    sentiment_features,
+    sentiment_momentum,
+    sentiment_panel,
+    weighted_mean,
+)
+from benchmarks.synthetic import ticker_symbols, zipf_weights
+
+START = pd.Timestamp('2024-01-01')
+
+
+def generate(tickers, days, rate, seed=0):
+    """(history, prices) with the columns analytics.sentiment_features reads."""
+    rng = np.random.default_rng(seed)
+    symbols = ticker_symbols(tickers)
+    count = int(tickers * days * rate)
+    ticker_ids = rng.choice(tickers, count, p=zipf_weights(tickers, 1.1))
+    bias = rng.normal(0, 0.15, tickers)
+    history = pd.DataFrame({
+        'Date': START + pd.to_timedelta(rng.integers(0, days * 86400, count), unit='s'),
+        'Ticker': pd.Categorical.from_codes(ticker_ids, categories=symbols),
+        'Combined_Sentiment': np.clip(bias[ticker_ids] + rng.normal(0, 0.3, count), -1, 1).astype('float32'),
+    })
+
+    # Daily mean sentiment per ticker (0 without news) drives the next day's return
+    day = (history['Date'] - START).dt.days.to_numpy()
+    sums = np.zeros((days, tickers))
+    articles = np.zeros((days, tickers))
+    np.add.at(sums, (day, ticker_ids), history['Combined_Sentiment'].to_numpy('float64'))
+    np.add.at(articles, (day, ticker_ids), 1)
+    daily = np.divide(sums, articles, out=np.zeros_like(sums), where=articles > 0)
+    returns = rng.normal(0, 0.02, (days, tickers))
+    returns[1:] += 0.02 * daily[:-1]
+    closes = rng.lognormal(3.5, 1.0, tickers) * np.cumprod(1 + returns, axis=0)
+
+    dates = pd.date_range(START, periods=days, freq='D') + pd.Timedelta(hours=16)
+    trading = dates.dayofweek < 5
+    prices = pd.DataFrame({
+        'Date': np.repeat(dates[trading], tickers),
+        'Ticker': np.tile(symbols, trading.sum()),
+        'Price': closes[trading].ravel(),
+    })
+    return history, prices
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def vectorized(history, prices):
+    """Every feature for all tickers at once; returns the feature panels and the step times."""
+    times = {}
+    (sums, counts), times['panel'] = timed(sentiment_panel, history)
+    returns, times['returns'] = timed(return_panel, prices, sums.index, sums.columns)
+    started = time.perf_counter()
+    panels = {
+        'rolling': rolling_sentiment(sums, counts),
+        'decayed': decayed_sentiment(sums, counts),
+        'momentum': sentiment_momentum(sums, counts),
+    }
+    times['rolling/decay/momentum'] = time.perf_counter() - started
+    sentiment = pd.DataFrame(weighted_mean(sums.to_numpy('float64'), counts.to_numpy('float64')),
+                             index=sums.index, columns=sums.columns)
+    panels['correlation'], times['correlation'] = timed(lagged_correlation, sentiment, returns)
+    return panels, times
+
+
+def per_ticker(history, prices, tickers):
+    """The same features with a loop over tickers, the way one ticker's drill-down computes them."""
+    index = pd.date_range(history['Date'].min().floor('D'), history['Date'].max().floor('D'), freq='D')
+    by_ticker = {ticker: frame for ticker, frame in history.groupby('Ticker', observed=True)}
+    prices_by_ticker = {ticker: frame for ticker, frame in prices.groupby('Ticker')}
+    features = {'rolling': {}, 'decayed': {}, 'momentum': {}, 'correlation': {}}
+    short, long = MOMENTUM_WINDOWS
+    for ticker in tickers:
+        scores = by_ticker[ticker].set_index('Date')['Combined_Sentiment'].astype('float64')
+        sums = scores.resample('D').sum().reindex(index, fill_value=0.0)
+        counts = scores.resample('D').count().reindex(index, fill_value=0)
+
+        def rolling(window):
+            return sums.rolling(window, min_periods=1).sum() / counts.rolling(window, min_periods=1).sum().replace(0, np.nan)
+
+        features['rolling'][ticker] = rolling(ROLLING_WINDOW)
+        features['decayed'][ticker] = (sums.ewm(halflife=DECAY_HALFLIFE).mean()
+                                       / counts.ewm(halflife=DECAY_HALFLIFE).mean().replace(0, np.nan))
+        features['momentum'][ticker] = rolling(short) - rolling(long)
+        closes = prices_by_ticker[ticker].set_index('Date')['Price'].resample('D').last()
+        returns = closes.reindex(closes.index.union(index)).ffill().pct_change(fill_method=None).reindex(index)
+        sentiment = sums / counts.replace(0, np.nan)
+        features['correlation'][ticker] = pd.Series({lag: sentiment.corr(returns.shift(-lag)) for lag in CORRELATION_LAGS})
+    return {name: pd.DataFrame(columns) for name, columns in features.items()}
+
+
+def largest_difference(panels, reference):
+    differences = []
+    for name, expected in reference.items():
+        actual = panels[name]
+        if name == 'correlation':
+            actual = actual.T
+        actual = actual[expected.columns].to_numpy()
+        expected = expected.to_numpy()
+        both = np.isfinite(actual) & np.isfinite(expected)
+        if (np.isfinite(actual) != np.isfinite(expected)).any():
+            # Only the minimum pair count may blank out a correlation the loop computes
+            if name != 'correlation' or (np.isfinite(actual) & ~np.isfinite(expected)).any():
+                return float('inf')
+        differences.append(np.abs(actual[both] - expected[both]).max(initial=0.0))
+    return max(differences)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", default="1000,5000", help="comma-separated ticker counts")
+    parser.add_argument("--days", default="90,180", help="comma-separated days of history")
+    parser.add_argument("--rate", type=float, default=2.0, help="articles per ticker and day on average")
+    parser.add_argument("--loop-tickers", type=int, default=200, help="tickers computed one by one for comparison")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'days':>5} {'articles':>10}  {'panel':>7} {'returns':>8} {'features':>9} "
+          f"{'corr':>7} {'all':>7} {'loop (est.)':>12} {'speedup':>8} {'max diff':>9}  lag 1 corr")
+    for tickers in (int(value) for value in args.tickers.split(',')):
+        for days in (int(value) for value in args.days.split(',')):
+            history, prices = generate(tickers, days, args.rate, args.seed)
+            panels, times = vectorized(history, prices)
+            _, total = timed(sentiment_features, history, prices)
+            total += times['correlation']
+
+            # Loop over the tickers with the most articles; its time is scaled up to every ticker
+            sample = history['Ticker'].value_counts().index[:args.loop_tickers].astype(str)
+            reference, loop_time = timed(per_ticker, history, prices, sample)
+            loop_estimate = loop_time * panels['rolling'].shape[1] / len(sample)
+            difference = largest_difference(panels, reference)
+            lag_one = panels['correlation'][1].median()
+            print(f"{tickers:8,} {days:5} {len(history):10,}  {times['panel']:6.2f}s {times['returns']:7.2f}s "
+                  f"{times['rolling/decay/momentum']:8.2f}s {times['correlation']:6.2f}s {total:6.2f}s "
+                  f"{loop_estimate:11.1f}s {loop_estimate / total:7.0f}x {difference:9.1e}  {lag_one:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time to first score of a fresh worker process, finvader vs the precompiled lexicon.
+
+Run from the repository root:
+
+    python -m benchmarks.lexicon [--runs 5] [--texts 200]
+
+Each run starts a new Python process that imports the scorer and scores one
+headline, the way sentiment.py, updatesent.py and analyze.py start. The
+precompiled lexicon is built once before the precompiled runs. Scores per
+headline in a warm process are compared as well.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from lexicon import build_lexicon, lexicon_path, source_signature, write_lexicon
+
+HEADLINE = "Shares surge after the company beats earnings estimates and raises guidance"
+
+# Each snippet prints the seconds from its first line to its first score
+STARTUPS = {
+    "finvader": (
+        "import time; started = time.perf_counter()\n"
+        "from finvader import finvader\n"
+        "finvader({headline!r}, use_sentibignomics=True, use_henry=True, indicator='compound')\n"
+        "print(time.perf_counter() - started)\n"
+    ),
+    "precompiled": (
+        "import time; started = time.perf_counter()\n"
+        "from scoring import analyze_sentiment\n"
+        "analyze_sentiment({headline!r})\n"
+        "print(time.perf_counter() - started)\n"
+    ),
+}
+
+
+def time_startup(snippet, runs):
+    """Median in-process time to first score and median wall time of the whole process."""
+    inner, wall = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", snippet.format(headline=HEADLINE)],
+                                capture_output=True, text=True, check=True)
+        wall.append(time.perf_counter() - started)
+        inner.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(inner), statistics.median(wall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Processes started per scorer")
+    parser.add_argument("--texts", type=int, default=200, help="Headlines scored in the warm comparison")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    lexicon = build_lexicon()
+    write_lexicon(lexicon, source_signature(), lexicon_path())
+    print(f"Built {lexicon_path()} ({len(lexicon):,} words, {os.path.getsize(lexicon_path()) / 2 ** 10:.0f} KiB) "
+          f"in {time.perf_counter() - started:.2f}s\n")
+
+    print(f"{'startup':12} {'first score':>12} {'process':>10}")
+    results = {}
+    for name, snippet in STARTUPS.items():
+        results[name] = time_startup(snippet, args.runs)
+        print(f"{name:12} {1000 * results[name][0]:10.0f}ms {1000 * results[name][1]:8.0f}ms")
+    print(f"{'speedup':12} {results['finvader'][0] / results['precompiled'][0]:11.1f}x "
+          f"{results['finvader'][1] / results['precompiled'][1]:9.1f}x\n")
+
+    from finvader import finvader
+    from scoring import analyze_sentiment
+    texts = [f"{HEADLINE} ({index})" for index in range(args.texts)]
+    started = time.perf_counter()
+    expected = [finvader(text, use_sentibignomics=True, use_henry=True, indicator='compound') for text in texts]
+    finvader_time = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = [analyze_sentiment(text) for text in texts]
+    precompiled_time = time.perf_counter() - started
+    print(f"warm scoring: finvader {1000 * finvader_time / len(texts):.2f} ms/text, "
+          f"precompiled {1000 * precompiled_time / len(texts):.2f} ms/text, "
+          f"max difference {max(abs(a - b) for a, b in zip(expected, actual)):.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Memory and load time of the typed schema loaders compared with plain pd.read_csv.
+
+Run from the repository root:
+
+    python -m benchmarks.schema [--rows 2000000] [--path news_with_sentiment.csv]
+
+Without --path a synthetic news_with_sentiment.csv with --rows rows is written to a
+temporary folder first, with the same columns, ticker/source mix and score range as
+the real file.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from schema import load_news
+
+TICKERS = 2000
+SOURCES = ["Reuters", "Bloomberg", "MarketWatch", "Yahoo Finance", "Zacks", "Motley Fool", "Benzinga", "Barrons"]
+
+# Columns a typical reader needs, e.g. a per-ticker sentiment time series
+PROJECTION = ['Ticker', 'Date', 'Combined_Sentiment']
+
+
+def write_synthetic(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    tickers = np.array([f"T{index:04d}" for index in range(TICKERS)])
+    start = np.datetime64('2020-01-01T00:00:00')
+    seconds = np.sort(rng.integers(0, 4 * 365 * 24 * 3600, rows))
+    title_sentiment = rng.uniform(-1, 1, rows).round(4)
+    content_sentiment = rng.uniform(-1, 1, rows).round(4)
+    frame = pd.DataFrame({
+        'Title': [f"Company {index % 997} reports quarter {index % 4 + 1} results, item {index}" for index in range(rows)],
+        'Source': rng.choice(SOURCES, rows),
+        'Date': pd.to_datetime(start + seconds.astype('timedelta64[s]')).strftime('%Y-%m-%d %H:%M:%S'),
+        'Url': [f"https://news.example.com/articles/{index:09d}.html" for index in range(rows)],
+        'Category': 'news',
+        'Ticker': rng.choice(tickers, rows),
+        'Title_Sentiment': title_sentiment,
+        'Content_Sentiment': content_sentiment,
+        'Combined_Sentiment': 0.3 * title_sentiment + 0.7 * content_sentiment,
+    })
+    frame.to_csv(path, index=False)
+
+
+def measure(label, load):
+    started = time.perf_counter()
+    frame = load()
+    elapsed = time.perf_counter() - started
+    memory = frame.memory_usage(deep=True).sum()
+    print(f"{label:38} {elapsed:7.2f}s {memory / 2 ** 20:9.1f} MiB")
+    return elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Rows of synthetic history to generate")
+    parser.add_argument("--path", help="Existing news_with_sentiment.csv to load instead of synthetic data")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = args.path
+        if path is None:
+            path = os.path.join(folder, "news_with_sentiment.csv")
+            started = time.perf_counter()
+            write_synthetic(path, args.rows)
+            print(f"Wrote {args.rows:,} synthetic rows in {time.perf_counter() - started:.1f}s")
+        print(f"{os.path.getsize(path) / 2 ** 20:.1f} MiB on disk\n")
+
+        print(f"{'':38} {'time':>8} {'memory':>13}")
+        base_time, base_memory = measure("pd.read_csv (all columns)", lambda: pd.read_csv(path))
+        results = [
+            measure("schema.load_news (all columns)", lambda: load_news(path)),
+            measure("pd.read_csv (projected)", lambda: pd.read_csv(path, usecols=PROJECTION)),
+            measure("schema.load_news (projected)", lambda: load_news(path, columns=PROJECTION)),
+        ]
+        print()
+        for label, (elapsed, memory) in zip(["typed", "read_csv projected", "typed projected"], results):
+            print(f"{label:20} {base_time / elapsed:5.1f}x faster, {base_memory / memory:5.1f}x less memory than pd.read_csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Generate a synthetic data folder at production scale.
+
+Run from the repository root:
+
+    python -m benchmarks.synthetic OUTPUT_DIR [--rows 10000000] [--tickers 5000]
+
+Writes the files the pipeline reads, with the same columns and formats as the
+real ones:
+
+    news_with_sentiment.csv  scored history, one row per article and ticker
+    news.csv                 the latest news export, split per ticker (export.py's output)
+    news_feed.csv            the same export as Finviz sends it, tickers comma-joined (update.py's input)
+    export.csv               one Finviz price row per ticker
+
+Distributions are skewed like the real feed: ticker coverage follows a Zipf law
+(--skew), a few sources publish most articles, article volume grows over time
+and clusters in market hours, and --multi-ticker of the articles mention two to
+four tickers. Each ticker has its own sentiment bias, which its price change
+loosely follows. The history is written in chunks, so memory stays flat at any
+--rows.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+NEWS_COLUMNS = ['Title', 'Source', 'Date', 'Url', 'Category', 'Ticker']
+SCORE_COLUMNS = ['Title_Sentiment', 'Content_Sentiment', 'Combined_Sentiment']
+
+SOURCES = ["Reuters", "Bloomberg", "MarketWatch", "Yahoo Finance", "Zacks", "Motley Fool", "Benzinga",
+           "Barrons", "Seeking Alpha", "Investopedia", "TheStreet", "Business Insider"]
+CATEGORIES = ["news", "blogs"]
+SECTORS = {
+    "Technology": ["Software - Application", "Semiconductors", "Consumer Electronics"],
+    "Healthcare": ["Biotechnology", "Drug Manufacturers", "Medical Devices"],
+    "Financial": ["Banks - Regional", "Asset Management", "Insurance"],
+    "Consumer Cyclical": ["Auto Manufacturers", "Internet Retail", "Restaurants"],
+    "Energy": ["Oil & Gas E&P", "Oil & Gas Midstream"],
+    "Industrials": ["Aerospace & Defense", "Railroads", "Specialty Industrial Machinery"],
+}
+COUNTRIES = ["USA", "China", "Canada", "United Kingdom", "Israel"]
+
+# Headline wording by sign of the title score, so titles and scores agree
+HEADLINES = {
+    -1: ["shares slump after", "misses estimates on", "cuts guidance amid", "faces probe over", "warns of weak"],
+    0: ["to report results on", "announces update to", "schedules call about", "files report on", "comments on"],
+    1: ["shares jump after", "beats estimates on", "raises guidance on", "wins contract for", "posts record"],
+}
+TOPICS = ["quarterly earnings", "revenue", "demand", "margins", "new product", "buyback", "outlook", "deliveries"]
+
+# Articles generated per chunk; bounds memory regardless of --rows
+CHUNK_ARTICLES = 500_000
+# Share of market-hours articles; the rest spread over the whole day
+MARKET_HOURS_SHARE = 0.7
+
+
+def ticker_symbols(count):
+    """Distinct 1-5 letter symbols: A..Z, AA..ZZ, ..."""
+    symbols, length = [], 1
+    while len(symbols) < count:
+        for index in range(min(26 ** length, count - len(symbols))):
+            letters = []
+            for _ in range(length):
+                index, remainder = divmod(index, 26)
+                letters.append(chr(65 + remainder))
+            symbols.append(''.join(reversed(letters)))
+        length += 1
+    return np.array(symbols)
+
+
+def zipf_weights(count, skew):
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+class Universe:
+    """Tickers, their popularity and sentiment bias, and the source mix."""
+
+    def __init__(self, rng, tickers, skew):
+        self.symbols = ticker_symbols(tickers)
+        self.weights = zipf_weights(tickers, skew)
+        self.bias = rng.normal(0, 0.15, tickers)
+        self.source_weights = zipf_weights(len(SOURCES), 1.0)
+
+
+def article_times(rng, count, start, days, low, high):
+    """Sorted article times between fractions low..high of the history, with volume growing over time."""
+    # Article volume grows linearly, so the cumulative share of articles grows with the square of time
+    share = np.sort(rng.uniform(low, high, count))
+    day = np.floor(days * np.sqrt(share)).astype('int64')
+    in_market = rng.random(count) < MARKET_HOURS_SHARE
+    seconds = np.where(in_market, rng.integers(int(13.5 * 3600), 20 * 3600, count), rng.integers(0, 24 * 3600, count))
+    return start + pd.to_timedelta(day * 86400 + seconds, unit='s')
+
+
+def article_tickers(rng, universe, count, multi_ticker):
+    """(count, 4) ticker ids per article, -1 for unused slots; slot 0 is always set."""
+    slots = np.full((count, 4), -1, dtype='int64')
+    slots[:, 0] = rng.choice(len(universe.symbols), count, p=universe.weights)
+    extra = np.where(rng.random(count) < multi_ticker, rng.integers(1, 4, count), 0)
+    for slot in range(1, 4):
+        chosen = rng.choice(len(universe.symbols), count, p=universe.weights)
+        keep = extra >= slot
+        # Drop repeats of a ticker already in the article
+        for earlier in range(slot):
+            keep &= chosen != slots[:, earlier]
+        slots[keep, slot] = chosen[keep]
+    return slots
+
+
+def generate_articles(rng, universe, first_id, count, start, days, low, high, multi_ticker):
+    """One chunk of articles (one row per article, without tickers) and their ticker slots."""
+    slots = article_tickers(rng, universe, count, multi_ticker)
+    bias = universe.bias[slots[:, 0]]
+    title = np.clip(bias + rng.normal(0, 0.35, count), -1, 1)
+    # VADER scores many headlines exactly 0
+    title[rng.random(count) < 0.3] = 0.0
+    content = np.clip(bias + 0.5 * title + rng.normal(0, 0.3, count), -1, 1)
+    title, content = title.round(4), content.round(4)
+
+    ids = np.arange(first_id, first_id + count)
+    sign = np.sign(title).astype('int64')
+    wording = np.empty(count, dtype=object)
+    for value, phrases in HEADLINES.items():
+        mask = sign == value
+        wording[mask] = rng.choice(phrases, mask.sum())
+    titles = (pd.Series(universe.symbols[slots[:, 0]]) + " " + pd.Series(wording) + " "
+              + pd.Series(rng.choice(TOPICS, count)) + " #" + pd.Series(ids).astype(str))
+
+    articles = pd.DataFrame({
+        'Title': titles,
+        'Source': np.array(SOURCES)[rng.choice(len(SOURCES), count, p=universe.source_weights)],
+        'Date': article_times(rng, count, start, days, low, high).strftime('%Y-%m-%d %H:%M:%S'),
+        'Url': "https://news.example.com/articles/" + pd.Series(ids).astype(str) + ".html",
+        'Category': np.array(CATEGORIES)[(rng.random(count) < 0.15).astype('int64')],
+        'Title_Sentiment': title,
+        'Content_Sentiment': content,
+    })
+    return articles, slots
+
+
+def split_rows(articles, slots, universe):
+    """One row per article and ticker, like export.py writes them."""
+    article_index, slot_index = np.nonzero(slots >= 0)
+    rows = articles.iloc[article_index].reset_index(drop=True)
+    rows.insert(5, 'Ticker', universe.symbols[slots[article_index, slot_index]])
+    return rows
+
+
+def joined_rows(articles, slots, universe):
+    """One row per article with its tickers comma-joined, like the Finviz news export."""
+    tickers = [','.join(universe.symbols[slot[slot >= 0]]) for slot in slots]
+    rows = articles.copy()
+    rows.insert(5, 'Ticker', tickers)
+    return rows
+
+
+def write_history(path, rng, universe, rows, days, multi_ticker, end):
+    """Append chunks to news_with_sentiment.csv until it has about `rows` rows; returns the last chunk."""
+    mean_tickers = 1 + multi_ticker * 2
+    articles_total = max(1, int(rows / mean_tickers))
+    start = end - pd.Timedelta(days=days)
+    chunks = -(-articles_total // CHUNK_ARTICLES)
+    written, first_id, last = 0, 0, None
+    for chunk in range(chunks):
+        count = min(CHUNK_ARTICLES, articles_total - first_id)
+        last = generate_articles(rng, universe, first_id, count, start, days, chunk / chunks, (chunk + 1) / chunks, multi_ticker)
+        scored = split_rows(*last, universe)
+        scored['Combined_Sentiment'] = (0.3 * scored['Title_Sentiment'] + 0.7 * scored['Content_Sentiment']).round(6)
+        scored.to_csv(path, mode='w' if chunk == 0 else 'a', header=chunk == 0, index=False)
+        written += len(scored)
+        first_id += count
+    return written, first_id, last
+
+
+def write_feed(folder, rng, universe, last_chunk, next_id, feed, new_share, multi_ticker, end):
+    """news_feed.csv and news.csv: the newest history articles plus new_share new ones."""
+    new_count = int(feed * new_share)
+    known_articles, known_slots = last_chunk
+    known_count = min(feed - new_count, len(known_articles))
+    fresh_articles, fresh_slots = generate_articles(rng, universe, next_id, new_count, end, 1, 0.0, 1.0, multi_ticker)
+    articles = pd.concat([known_articles.tail(known_count), fresh_articles], ignore_index=True)
+    slots = np.concatenate([known_slots[len(known_slots) - known_count:], fresh_slots])
+    joined_rows(articles, slots, universe)[NEWS_COLUMNS].to_csv(os.path.join(folder, "news_feed.csv"), index=False)
+    split = split_rows(articles, slots, universe)[NEWS_COLUMNS]
+    split.to_csv(os.path.join(folder, "news.csv"), index=False)
+    return len(articles), len(split)
+
+
+def write_prices(path, rng, universe):
+    """export.csv in Finviz's formats: percent strings for Change and '-' for missing values."""
+    count = len(universe.symbols)
+    sectors = list(SECTORS)
+    sector = rng.integers(0, len(sectors), count)
+    industries = [SECTORS[sectors[index]][rng.integers(0, len(SECTORS[sectors[index]]))] for index in sector]
+    change = rng.normal(0, 2.5, count) + 4 * universe.bias
+    pe = rng.lognormal(3.0, 0.6, count).round(2)
+    frame = pd.DataFrame({
+        'No.': np.arange(1, count + 1),
+        'Ticker': universe.symbols,
+        'Company': pd.Series(universe.symbols) + " Holdings Inc.",
+        'Sector': np.array(sectors)[sector],
+        'Industry': industries,
+        'Country': np.array(COUNTRIES)[rng.choice(len(COUNTRIES), count, p=[0.85, 0.05, 0.04, 0.03, 0.03])],
+        # Larger, better covered companies come first, like the Zipf ticker weights
+        'Market Cap': (rng.lognormal(8, 1.5, count) * (1 + 50 * universe.weights / universe.weights.max())).round(2),
+        'P/E': np.where(rng.random(count) < 0.15, '-', pe.astype(str)),
+        'Price': rng.lognormal(3.5, 1.0, count).round(2),
+        'Change': [f"{value:.2f}%" for value in change],
+        'Volume': rng.lognormal(13, 1.5, count).astype('int64'),
+    })
+    frame.to_csv(path, index=False)
+
+
+def generate(folder, rows, tickers=5000, skew=1.1, multi_ticker=0.15, days=3 * 365, feed=5000, new_share=0.2, seed=0):
+    """Write all synthetic files into `folder`; returns a summary of what was written."""
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    universe = Universe(rng, tickers, skew)
+    end = pd.Timestamp('2024-06-28')
+    history_rows, articles, last_chunk = write_history(os.path.join(folder, "news_with_sentiment.csv"),
+                                                       rng, universe, rows, days, multi_ticker, end)
+    feed_articles, feed_rows = write_feed(folder, rng, universe, last_chunk, articles, feed, new_share, multi_ticker, end)
+    write_prices(os.path.join(folder, "export.csv"), rng, universe)
+    return {"history_rows": history_rows, "articles": articles, "feed_articles": feed_articles,
+            "feed_rows": feed_rows, "tickers": tickers}
+
+
+def add_arguments(parser):
+    """Generator options shared with benchmarks/analytics.py (everything but --rows)."""
+    parser.add_argument("--tickers", type=int, default=5000, help="distinct tickers")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of ticker coverage")
+    parser.add_argument("--multi-ticker", type=float, default=0.15, help="share of articles with 2-4 tickers")
+    parser.add_argument("--days", type=int, default=3 * 365, help="days of history")
+    parser.add_argument("--feed", type=int, default=5000, help="articles in the latest news export")
+    parser.add_argument("--new-share", type=float, default=0.2, help="share of the export not in the history yet")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def generation_options(args):
+    return dict(tickers=args.tickers, skew=args.skew, multi_ticker=args.multi_ticker, days=args.days,
+                feed=args.feed, new_share=args.new_share, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", help="folder to write the files to")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="rows of scored history")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    summary = generate(args.output, args.rows, **generation_options(args))
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(f"Wrote {summary['history_rows']:,} history rows ({summary['articles']:,} articles, "
+          f"{summary['tickers']:,} tickers), a {summary['feed_articles']:,} article export and export.csv "
+          f"to {args.output} ({size / 2 ** 20:.0f} MiB) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare the vectorized batch scorer with finvader on a reference corpus.
+
+Run from the repository root:
+
+    python -m benchmarks.vecsent [--corpus news_with_sentiment.csv]
+
+The default corpus is built from the fixture articles: every title, every body,
+every sentence of every body and a set of hand-written edge cases (negation,
+boosters, ALL CAPS, "but", punctuation emphasis). Pass --corpus to use the Title
+column of a real export instead.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from scoring import analyze_sentiment, split_units
+from vecsent import TOLERANCE, BatchScorer
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "articles.csv")
+
+EDGE_CASES = [
+    "Profit did not improve this quarter.",
+    "Revenue was never so strong.",
+    "Revenue was NEVER SO strong, and the results are SORT OF good.",
+    "Margins are VERY weak while sales are flat.",
+    "The outlook is good, but costs are rising sharply.",
+    "Shares SOARED after the announcement!!!",
+    "Is the rally over?? Analysts are not sure???",
+    "The company is kind of profitable.",
+    "Growth, growth and more growth: strong results strong guidance.",
+    "Earnings were hardly disappointing.",
+    "Without doubt the best quarter in company history.",
+    "",
+]
+
+
+def reference_corpus(path=None):
+    if path:
+        return pd.read_csv(path)['Title'].dropna().astype(str).tolist()
+    articles = pd.read_csv(FIXTURE_PATH)
+    corpus = articles['Title'].tolist() + articles['Content'].tolist()
+    for content in articles['Content']:
+        corpus.extend(split_units(content, "sentence"))
+    return corpus + EDGE_CASES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="CSV file with a Title column to use as the corpus")
+    args = parser.parse_args()
+
+    corpus = reference_corpus(args.corpus)
+
+    started = time.perf_counter()
+    expected = [analyze_sentiment(text) if text else 0.0 for text in corpus]
+    finvader_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scorer = BatchScorer()
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = scorer.score_batch(corpus)
+    batch_time = time.perf_counter() - started
+
+    differences = [abs(a - b) for a, b in zip(actual, expected)]
+    exact = sum(diff < 1e-4 for diff in differences)
+
+    print(f"{len(corpus)} documents")
+    print(f"finvader:     {finvader_time:8.3f}s ({1000 * finvader_time / len(corpus):.2f} ms/doc)")
+    print(f"batch scorer: {batch_time:8.3f}s ({1000 * batch_time / len(corpus):.3f} ms/doc) + {build_time:.3f}s lexicon build")
+    print(f"exact matches: {exact}/{len(corpus)}, max difference {max(differences):.4f} (tolerance {TOLERANCE})")
+
+    worst = sorted(zip(differences, corpus, expected, actual), reverse=True)[:5]
+    for diff, text, want, got in worst:
+        if diff >= 1e-4:
+            print(f"  {diff:.4f}  finvader {want:+.4f} batch {got:+.4f}  {text[:70]!r}")
+
+    if max(differences) > TOLERANCE:
+        print("FAILED: difference above tolerance")
+
+
+if __name__ == "__main__":
+    main()
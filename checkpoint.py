@@ -0,0 +1,191 @@
+import csv
+import itertools
+import logging
+import os
+import sys
+
+# Number of written rows between fsyncs of the checkpoint file
+CHECKPOINT_EVERY_ENV = "SENTIMENT_CHECKPOINT_EVERY"
+DEFAULT_CHECKPOINT_EVERY = 25
+
+# Resume from an existing checkpoint with --resume or SENTIMENT_RESUME=1
+RESUME_FLAG = "--resume"
+RESUME_ENV = "SENTIMENT_RESUME"
+
+SENTIMENT_COLUMNS = ['Title_Sentiment', 'Content_Sentiment', 'Combined_Sentiment']
+# Position of the row in news.csv, kept in the checkpoint only
+ROW_COLUMN = 'Row'
+# Columns a side file adds to each row: which article it belongs to and the article's title score
+SIDE_ARTICLE_COLUMN = 'Side_Article'
+SIDE_TITLE_COLUMN = 'Side_Title_Sentiment'
+
+
+def checkpoint_every():
+    return max(1, int(os.environ.get(CHECKPOINT_EVERY_ENV, DEFAULT_CHECKPOINT_EVERY)))
+
+
+def resume_requested():
+    if RESUME_FLAG in sys.argv:
+        return True
+    return os.environ.get(RESUME_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def checkpoint_path(output_file_path):
+    return output_file_path + ".checkpoint"
+
+
+def retry_path(output_file_path):
+    return output_file_path + ".retry"
+
+
+def skipped_path(output_file_path):
+    return output_file_path + ".skipped"
+
+
+def load_completed_rows(path, fieldnames):
+    """Return the (row, url) keys already written to a checkpoint.
+
+    Returns None if the checkpoint was written with different columns and cannot be
+    continued. A partially written last line from a crash is ignored.
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', newline='', encoding='utf-8') as checkpoint_file:
+        reader = csv.DictReader(checkpoint_file)
+        if reader.fieldnames != [ROW_COLUMN] + fieldnames:
+            return None
+        for record in reader:
+            if None in record.values():
+                logging.warning(f"Ignoring incomplete checkpoint record for row {record.get(ROW_COLUMN)}")
+                continue
+            completed.add((int(record[ROW_COLUMN]), record['Url']))
+    return completed
+
+
+def drop_incomplete_tail(path):
+    """Cut a half-written last line (from a crash) off the checkpoint before appending to it."""
+    with open(path, 'rb+') as checkpoint_file:
+        checkpoint_file.seek(0, os.SEEK_END)
+        size = checkpoint_file.tell()
+        if size == 0:
+            return
+        checkpoint_file.seek(size - 1)
+        if checkpoint_file.read(1) == b'\n':
+            return
+        # Walk back to the last complete line
+        position = size - 1
+        while position > 0:
+            step = min(4096, position)
+            position -= step
+            checkpoint_file.seek(position)
+            block = checkpoint_file.read(step)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                checkpoint_file.truncate(position + newline + 1)
+                return
+        checkpoint_file.truncate(0)
+
+
+class CheckpointWriter:
+    """Appends finished output rows to the checkpoint file as soon as they are ready.
+
+    Every row is flushed to the operating system immediately and the file is fsynced
+    every SENTIMENT_CHECKPOINT_EVERY rows.
+    """
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        if os.path.exists(path):
+            drop_incomplete_tail(path)
+        new_file = not os.path.exists(path) or os.stat(path).st_size == 0
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=[ROW_COLUMN] + fieldnames, lineterminator=os.linesep)
+        self.sync_every = checkpoint_every()
+        self.unsynced = 0
+        if new_file:
+            self.writer.writeheader()
+            self.sync()
+
+    def write(self, row, record):
+        self.writer.writerow({ROW_COLUMN: row, **record})
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+class SideFile:
+    """Articles set aside for the end of the run (empty bodies to retry, rows over the budget),
+    kept on disk instead of in memory.
+
+    Each article is added as its (row number, record) pairs and its title score;
+    groups() reads them back in the same form once all of them were added.
+    """
+
+    def __init__(self, path, fieldnames):
+        self.path = path
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        columns = [ROW_COLUMN, SIDE_ARTICLE_COLUMN, SIDE_TITLE_COLUMN] + fieldnames
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction='ignore', lineterminator=os.linesep)
+        self.writer.writeheader()
+        # Articles and rows added
+        self.count = 0
+        self.rows = 0
+
+    def add(self, group, title_sentiment=None):
+        for row, record in group:
+            self.writer.writerow({**record, ROW_COLUMN: row, SIDE_ARTICLE_COLUMN: self.count,
+                                  SIDE_TITLE_COLUMN: '' if title_sentiment is None else title_sentiment})
+        self.count += 1
+        self.rows += len(group)
+
+    def groups(self):
+        """Yield (group, title score) for every added article, then remove the file."""
+        self.file.close()
+        with open(self.path, 'r', newline='', encoding='utf-8') as side_file:
+            rows = csv.DictReader(side_file)
+            for _, records in itertools.groupby(rows, key=lambda record: record[SIDE_ARTICLE_COLUMN]):
+                group = []
+                for record in records:
+                    row = int(record.pop(ROW_COLUMN))
+                    record.pop(SIDE_ARTICLE_COLUMN)
+                    title_sentiment = record.pop(SIDE_TITLE_COLUMN)
+                    group.append((row, record))
+                yield group, float(title_sentiment) if title_sentiment else None
+        os.remove(self.path)
+
+    def remove(self):
+        """Drop the file without reading it back."""
+        self.file.close()
+        os.remove(self.path)
+
+
+def finalize_checkpoint(path, output_path, sort_rows=False):
+    """Copy the checkpoint without its Row column to output_path and swap it in with one rename.
+
+    With sort_rows, rows written out of order (priority runs) are put back in news.csv order.
+    """
+    temp_path = f"{output_path}.tmp"
+    with open(path, 'r', newline='', encoding='utf-8') as checkpoint_file, \
+            open(temp_path, 'w', newline='', encoding='utf-8') as temp_file:
+        reader = csv.reader(checkpoint_file)
+        writer = csv.writer(temp_file, lineterminator=os.linesep)
+        if sort_rows:
+            writer.writerow(next(reader)[1:])
+            reader = sorted(reader, key=lambda record: int(record[0]))
+        for record in reader:
+            writer.writerow(record[1:])
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, output_path)
+    os.remove(path)
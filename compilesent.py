@@ -1,45 +1,82 @@
-import pandas as pd
-import os
-
-# Path to the news_with_sentiment.csv file
-input_csv_path = "news_with_sentiment.csv"
-
-# Path to the output CSV file
-output_csv_path = "average_sentiment_per_ticker.csv"
-
-# Check and clear the output file if it exists
-if os.path.exists(output_csv_path):
-    try:
-        os.remove(output_csv_path)
-        print(f"Cleared existing file: {output_csv_path}")
-    except PermissionError:
-        print(f"Error: Permission denied while trying to delete {output_csv_path}.")
-    except Exception as e:
-        print(f"Error: An unexpected error occurred while deleting the file: {e}")
-else:
-    print(f"No existing file found to clear: {output_csv_path}")
-
-# Read the CSV file containing news and sentiment data
-try:
-    news_df = pd.read_csv(input_csv_path)
-except pd.errors.EmptyDataError:
-    print(f"Error: The file {input_csv_path} is empty or cannot be read.")
-    exit(1)
-except FileNotFoundError:
-    print(f"Error: The file {input_csv_path} does not exist.")
-    exit(1)
-
-# Ensure the necessary columns exist
-if 'Ticker' not in news_df.columns or 'Combined_Sentiment' not in news_df.columns:
-    print(f"Error: The 'Ticker' or 'Combined_Sentiment' column is missing in {input_csv_path}.")
-    exit(1)
-
-# Group by 'Ticker' and calculate the average of the 'Combined_Sentiment' for each ticker
-average_sentiments = news_df.groupby('Ticker')['Combined_Sentiment'].mean().reset_index()
-
-# Save the result to a new CSV file
-try:
-    average_sentiments.to_csv(output_csv_path, index=False)
-    print(f"Average sentiment for each ticker has been calculated and saved to {output_csv_path}.")
-except Exception as e:
-    print(f"Error: An unexpected error occurred while saving the CSV file: {e}")
+import pandas as pd
+import os
+import profiler
+from archive import load_history
+from provisional import load_provisional
+from snapshot import publish_snapshot
+
+profiler.enable_profiling("compilesent")
+
+# Path to the news_with_sentiment.csv file
+input_csv_path = "news_with_sentiment.csv"
+
+# Path to the output CSV file
+output_csv_path = "average_sentiment_per_ticker.csv"
+
+# Check and clear the output file if it exists
+if os.path.exists(output_csv_path):
+    try:
+        os.remove(output_csv_path)
+        print(f"Cleared existing file: {output_csv_path}")
+    except PermissionError:
+        print(f"Error: Permission denied while trying to delete {output_csv_path}.")
+    except Exception as e:
+        print(f"Error: An unexpected error occurred while deleting the file: {e}")
+else:
+    print(f"No existing file found to clear: {output_csv_path}")
+
+# Articles from the latest export whose bodies are still being scored count with their title score
+provisional_df = load_provisional(input_csv_path, columns=['Ticker', 'Combined_Sentiment'])
+
+# Read the CSV file containing news and sentiment data
+try:
+    # Only the two columns needed for the averages are read (from the Parquet archive if there is one)
+    news_df = load_history(columns=['Ticker', 'Combined_Sentiment'], csv_path=input_csv_path)
+except pd.errors.EmptyDataError:
+    print(f"Error: The file {input_csv_path} is empty or cannot be read.")
+    exit(1)
+except FileNotFoundError:
+    if provisional_df is None:
+        print(f"Error: The file {input_csv_path} does not exist.")
+        exit(1)
+    # First run: only the provisional title scores exist so far
+    news_df = pd.DataFrame({'Ticker': pd.Series(dtype='str'), 'Combined_Sentiment': pd.Series(dtype='float32')})
+
+# Ensure the necessary columns exist
+if 'Ticker' not in news_df.columns or 'Combined_Sentiment' not in news_df.columns:
+    print(f"Error: The 'Ticker' or 'Combined_Sentiment' column is missing in {input_csv_path}.")
+    exit(1)
+
+if provisional_df is None:
+    # Group by 'Ticker' and calculate the average of the 'Combined_Sentiment' for each ticker
+    average_sentiments = news_df.groupby('Ticker', observed=True)['Combined_Sentiment'].mean().reset_index()
+else:
+    # Sum and count both parts separately, so the history's categories never need to be merged
+    totals = [frame.groupby('Ticker', observed=True)['Combined_Sentiment'].agg(['sum', 'count']).astype('float64')
+              for frame in (news_df, provisional_df)]
+    for part in totals:
+        part.index = part.index.astype(str)
+    combined = totals[0].add(totals[1], fill_value=0)
+    average_sentiments = pd.DataFrame({
+        'Ticker': combined.index,
+        'Combined_Sentiment': (combined['sum'] / combined['count']).astype('float32'),
+        # Number of articles in the average scored from their title only
+        'Provisional': totals[1]['count'].reindex(combined.index, fill_value=0).astype(int),
+    }).reset_index(drop=True)
+    print(f"Included {len(provisional_df)} provisional title-only articles.")
+
+# Save the result to a new CSV file
+try:
+    average_sentiments.to_csv(output_csv_path, index=False)
+    print(f"Average sentiment for each ticker has been calculated and saved to {output_csv_path}.")
+except Exception as e:
+    print(f"Error: An unexpected error occurred while saving the CSV file: {e}")
+else:
+    # Share the summary and export.csv with the dashboard and plot windows as one Arrow snapshot;
+    # without it they read the saved CSV files, so a failure here is reported on its own
+    try:
+        version = publish_snapshot()
+        if version:
+            print(f"Published dashboard snapshot {version}.")
+    except Exception as e:
+        print(f"Error: Could not publish the dashboard snapshot: {e}")
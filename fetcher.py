@@ -0,0 +1,243 @@
+import codecs
+import logging
+import os
+import random
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+import requests
+
+# Byte cap per article download; the rest of the page is never read
+MAX_BYTES_ENV = "FETCH_MAX_BYTES"
+DEFAULT_MAX_BYTES = 2_000_000
+# Stop downloading once this many characters of paragraph text were collected (0 disables)
+ENOUGH_TEXT_ENV = "FETCH_ENOUGH_TEXT"
+DEFAULT_ENOUGH_TEXT = 30000
+CHUNK_SIZE = 16384
+
+# Content types worth parsing for paragraphs; PDFs, video, images etc. are skipped
+ARTICLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+# Without a charset in the Content-Type header, <meta charset> is looked for in this many bytes (as browsers do)
+SNIFF_BYTES = 1024
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9._:-]+)""", re.IGNORECASE)
+BOMS = [(codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16')]
+
+# List of user agents for rotation
+user_agents = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+]
+
+# Shared session so connections to the same publisher (and to Finviz) are reused
+session = requests.Session()
+
+# URLs that will never yield article text (wrong type or too large), so retries skip them
+skipped_urls = set()
+
+# Per-run download statistics, reported by stats_summary() / log_stats(); downloads run in
+# several threads, so they are only changed through count() or reset_stats()
+stats_lock = threading.Lock()
+stats = {
+    "downloads": 0,
+    "bytes_downloaded": 0,
+    "bytes_avoided": 0,
+    "skipped_type": 0,
+    "skipped_length": 0,
+    "truncated": 0,
+    "stopped_early": 0,
+}
+
+
+class ParagraphParser(HTMLParser):
+    """Incremental HTML parser that collects the text of <p> elements."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self.current = []
+        self.in_paragraph = False
+        self.text_length = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            # A <p> cannot contain another <p>; an unclosed one ends here
+            if self.in_paragraph:
+                self.finish_paragraph()
+            self.in_paragraph = True
+
+    def handle_endtag(self, tag):
+        if tag == 'p' and self.in_paragraph:
+            self.finish_paragraph()
+            self.in_paragraph = False
+
+    def handle_data(self, data):
+        if self.in_paragraph:
+            self.current.append(data)
+            self.text_length += len(data)
+
+    def finish_paragraph(self):
+        self.paragraphs.append(''.join(self.current))
+        self.current = []
+
+    def text(self):
+        if self.current:
+            self.finish_paragraph()
+        # Paragraphs are newline separated so the chunked scorer can split on them
+        return '\n'.join(self.paragraphs)
+
+
+def fetch_settings():
+    max_bytes = int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+    enough_text = int(os.environ.get(ENOUGH_TEXT_ENV, DEFAULT_ENOUGH_TEXT))
+    return max_bytes, enough_text
+
+
+def is_article_type(content_type):
+    """Return True if a Content-Type header looks like a page with readable paragraphs."""
+    if not content_type:
+        return True  # Many sites omit the header; let the parser decide
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in ARTICLE_CONTENT_TYPES
+
+
+def count(**amounts):
+    """Add to the download statistics."""
+    with stats_lock:
+        for key, amount in amounts.items():
+            stats[key] += amount
+
+
+def known_encoding(name):
+    try:
+        return codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+
+
+def response_encoding(content_type, head=b''):
+    """Return the page's charset: from the Content-Type header, a byte order mark or a
+    <meta charset> in the first bytes of the page (`head`), defaulting to UTF-8."""
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            encoding = known_encoding(value)
+            if encoding:
+                return encoding
+            break
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    match = META_CHARSET.search(head[:SNIFF_BYTES])
+    if match:
+        encoding = known_encoding(match.group(1).decode('ascii'))
+        # A page that could be read as ASCII to find the tag is not UTF-16, whatever it says
+        if encoding and not encoding.startswith('utf-16'):
+            return encoding
+    return 'utf-8'
+
+
+def download_article(url: str, headers: dict, timeout=30):
+    """Stream an article and return (status code, paragraph text).
+
+    The download is abandoned before reading the body when the Content-Type is not
+    HTML or the Content-Length is above FETCH_MAX_BYTES, and stops early after
+    FETCH_MAX_BYTES bytes or once FETCH_ENOUGH_TEXT characters of paragraphs were read.
+    """
+    max_bytes, enough_text = fetch_settings()
+
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, ""
+
+        content_type = response.headers.get('Content-Type', '')
+        content_length = response.headers.get('Content-Length')
+        content_length = int(content_length) if content_length and content_length.isdigit() else None
+
+        if not is_article_type(content_type):
+            logging.info(f"Skipping {url}: content type {content_type}")
+            count(skipped_type=1, bytes_avoided=content_length or 0)
+            skipped_urls.add(url)
+            return response.status_code, ""
+
+        if content_length is not None and content_length > max_bytes:
+            logging.info(f"Skipping {url}: {content_length} bytes is above the {max_bytes} byte cap")
+            count(skipped_length=1, bytes_avoided=content_length)
+            skipped_urls.add(url)
+            return response.status_code, ""
+
+        count(downloads=1)
+        decoder = None
+        parser = ParagraphParser()
+        received = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if decoder is None:
+                # The first chunk holds the <head>, where a page without a header charset declares it
+                decoder = codecs.getincrementaldecoder(response_encoding(content_type, chunk))(errors='replace')
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if received >= max_bytes:
+                count(truncated=1)
+                break
+            if enough_text and parser.text_length >= enough_text:
+                count(stopped_early=1)
+                break
+        if decoder is not None:
+            parser.feed(decoder.decode(b'', final=True))
+
+        avoided = content_length - received if content_length is not None and content_length > received else 0
+        count(bytes_downloaded=received, bytes_avoided=avoided)
+        return response.status_code, parser.text()
+
+
+# Function to fetch article content from a URL with error handling and retry logic
+def fetch_article_content(url: str, retries: int = 3) -> str:
+    if url in skipped_urls:
+        return ""
+
+    headers = {
+        'User-Agent': random.choice(user_agents),
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Connection': 'keep-alive'
+    }
+
+    for attempt in range(retries):
+        try:
+            status_code, article_text = download_article(url, headers, timeout=30)  # Increased timeout to 30 seconds
+            if status_code == 200:
+                return article_text
+            else:
+                logging.warning(f"Failed to fetch article from {url}: {status_code}")
+                return ""
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching article from {url}, attempt {attempt + 1}: {e}")
+            time.sleep(2 ** attempt)  # Exponential backoff before retrying
+    logging.error(f"All retries exhausted for URL: {url}")
+    return ""  # Return empty string if all retries fail
+
+
+def reset_stats():
+    """Zero the download statistics, e.g. between jobs of a long-running scheduler."""
+    with stats_lock:
+        for key in stats:
+            stats[key] = 0
+
+
+def stats_summary():
+    """Return a one-line summary of the download statistics for this run."""
+    with stats_lock:
+        totals = dict(stats)
+    return (
+        f"Article downloads: {totals['downloads']} fetched, {totals['bytes_downloaded']:,} bytes read, "
+        f"{totals['bytes_avoided']:,} bytes avoided ({totals['skipped_type']} skipped by type, "
+        f"{totals['skipped_length']} by size, {totals['truncated']} truncated at the cap, "
+        f"{totals['stopped_early']} stopped after enough text)"
+    )
+
+
+def log_stats():
+    """Log the download statistics for this run."""
+    logging.info(stats_summary())
@@ -0,0 +1,157 @@
+"""Dashboard jobs: what each button runs, the data it writes, and how conflicting jobs wait.
+
+main.py runs every job (Gather Data, Update Data, Plot Data, streaming) in its
+own thread. The dashboard stays responsive while a job runs. Each job names
+the data it writes. A job that writes the same data as a running or earlier
+queued job waits in JobQueue until that job is done, so two buttons, or a
+button and a scheduled task of the dashboard, never rewrite the same files
+at the same time.
+Plotting reads the published snapshot and runs alongside anything.
+
+This only orders the jobs of one dashboard. main.py also holds scheduler.py's
+lock file while Gather Data or Update Data runs, so scheduler.py and
+stream.py wait for them, and they wait for those.
+
+Streaming runs until it is stopped, so it names no data here; holding it
+would keep Gather Data and Update Data waiting for as long as the stream is
+on. Each poll holds the lock file instead. A poll that comes due while
+Gather Data or Update Data runs is skipped, and those wait for a poll that
+is already running.
+
+Scripts run as child processes through ChildProcesses, so cancelling a job
+stops its scripts, and the scripts those start, right away.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+from progress import PROGRESS_ENV
+from stages import SCRIPT_DIR
+
+# What the jobs write: news.csv and the scored history, and export.csv with the snapshot
+NEWS = "news"
+PRICES = "prices"
+
+GATHER_RESOURCES = (NEWS, PRICES)
+UPDATE_RESOURCES = (NEWS, PRICES)
+# Each poll holds the lock file instead
+STREAM_RESOURCES = ()
+PLOT_RESOURCES = ()
+
+
+class Job:
+    """A dashboard action; work(runner) does it on a background thread."""
+
+    def __init__(self, name, work, resources=()):
+        self.name = name
+        self.work = work
+        self.resources = tuple(resources)
+
+    def conflicts_with(self, other):
+        return bool(set(self.resources) & set(other.resources))
+
+
+class JobQueue:
+    """Running and waiting jobs. A job starts once no running or earlier waiting job writes the same data."""
+
+    def __init__(self):
+        self.running = []
+        self.waiting = []
+
+    def submit(self, job):
+        """Add a job; returns "start", "waiting", or "duplicate" if a job of that name is already in."""
+        if any(other.name == job.name for other in self.running + self.waiting):
+            return "duplicate"
+        if any(job.conflicts_with(other) for other in self.running + self.waiting):
+            self.waiting.append(job)
+            return "waiting"
+        self.running.append(job)
+        return "start"
+
+    def finish(self, job):
+        """Remove a finished job and return the waiting jobs that can start now, in submission order."""
+        self.running.remove(job)
+        started, still_waiting = [], []
+        for waiting in self.waiting:
+            if any(waiting.conflicts_with(other) for other in self.running + still_waiting):
+                still_waiting.append(waiting)
+            else:
+                self.running.append(waiting)
+                started.append(waiting)
+        self.waiting = still_waiting
+        return started
+
+    def blockers(self, job):
+        """Names of the jobs `job` waits for."""
+        ahead = self.running + self.waiting[:self.waiting.index(job)]
+        return [other.name for other in ahead if job.conflicts_with(other)]
+
+    def drop_waiting(self):
+        dropped, self.waiting = self.waiting, []
+        return dropped
+
+
+def new_process_group():
+    """Popen arguments that give a child its own process group, so its own children can be stopped with it."""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def stop_process_tree(process):
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ChildProcesses:
+    """The scripts one job is running. cancel() stops them and makes later run_script() calls fail.
+
+    With progress_folder, the scripts report their progress there instead of in PIPELINE_PROGRESS,
+    so each job shows only its own scripts.
+    """
+
+    def __init__(self, progress_folder=None):
+        self.progress_folder = progress_folder
+        self.processes = []
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def run_script(self, script, *args):
+        """Run a pipeline script like stages.run_script: returns its output, raises if it fails or is cancelled."""
+        with self.lock:
+            if self.cancelled:
+                raise JobCancelled(f"{script} was not started")
+            env = {**os.environ, PROGRESS_ENV: self.progress_folder} if self.progress_folder else None
+            process = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, script), *args],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env,
+                                       **new_process_group())
+            self.processes.append(process)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self.lock:
+                self.processes.remove(process)
+        if self.cancelled:
+            raise JobCancelled(f"{script} was cancelled")
+        if process.returncode != 0:
+            raise RuntimeError(f"{script} exited with status {process.returncode}: {stderr.strip()}")
+        return stdout
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            for process in self.processes:
+                stop_process_tree(process)
@@ -0,0 +1,156 @@
+"""Precompiled finvader lexicon.
+
+Every finvader() call rebuilds the SentiBignomics lexicon, parses NLTK's
+vader_lexicon.zip and merges in the Henry word list, and importing finvader
+runs nltk.download(). The combined lexicon is built once and saved as a pickle
+next to this file. Later processes load it with a single pickle.load and score
+with one VADER analyzer, which gives the same compound scores as finvader.
+
+The file is rebuilt automatically when the finvader or NLTK lexicon sources
+change. Worker processes forked from a scoring script share the loaded
+lexicon copy-on-write.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import pickle
+import time
+
+# Location of the precompiled lexicon
+LEXICON_ENV = "SENTIMENT_LEXICON"
+DEFAULT_LEXICON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "finvader_lexicon.pickle")
+# Bumped when the file layout or the way the lexicon is merged changes
+FORMAT_VERSION = 1
+
+# finvader scales the SentiBignomics lexicon by this constant before merging it
+SENTIBIGNOMICS_SCALE = 0.1
+
+VADER_LEXICON = "sentiment/vader_lexicon.zip"
+
+_lexicon = None
+_analyzer = None
+
+
+def lexicon_path():
+    return os.environ.get(LEXICON_ENV, DEFAULT_LEXICON)
+
+
+def find_vader_lexicon():
+    """NLTK's vader_lexicon.zip, downloading it first on a fresh install (importing finvader used to do that)."""
+    import nltk
+    try:
+        return nltk.data.find(VADER_LEXICON)
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+        return nltk.data.find(VADER_LEXICON)
+
+
+def source_signature():
+    """Format version plus the size and mtime of every file the lexicon is built from.
+
+    finvader is located without importing it, since its import downloads the NLTK data.
+    """
+    folder = importlib.util.find_spec("finvader").submodule_search_locations[0]
+    vader = find_vader_lexicon()
+    # find() returns a pointer into the zip file when NLTK opened it as one
+    vader = vader.zipfile.filename if hasattr(vader, "zipfile") else vader.path
+    sources = [os.path.join(folder, "SentiBignomics.py"), os.path.join(folder, "Henry.py"), vader]
+    signature = [FORMAT_VERSION]
+    for path in sources:
+        stat = os.stat(path)
+        signature.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def build_lexicon():
+    """Return the combined VADER + SentiBignomics + Henry lexicon used by finvader."""
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from finvader.SentiBignomics import lexicon1
+    from finvader.Henry import lexicon2
+
+    # SentimentIntensityAnalyzer() reads vader_lexicon.zip, which may still have to be downloaded
+    find_vader_lexicon()
+    lexicon = dict(SentimentIntensityAnalyzer().lexicon)
+    lexicon.update((word, value * SENTIBIGNOMICS_SCALE) for word, value in lexicon1().items())
+    lexicon.update(lexicon2())
+    return lexicon
+
+
+def write_lexicon(lexicon, signature, path):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as lexicon_file:
+        pickle.dump({"signature": signature, "lexicon": lexicon}, lexicon_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+def read_lexicon(path, signature):
+    """The saved lexicon, or None if there is none or it was built from other sources."""
+    try:
+        with open(path, 'rb') as lexicon_file:
+            saved = pickle.load(lexicon_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError) as error:
+        logging.warning(f"Ignoring unreadable lexicon {path}: {error}")
+        return None
+    if not isinstance(saved, dict) or saved.get("signature") != signature:
+        return None
+    return saved.get("lexicon")
+
+
+def load_lexicon(path=None):
+    """Return the combined lexicon, building and saving it first if needed (once per process)."""
+    global _lexicon
+    if _lexicon is None:
+        path = path or lexicon_path()
+        signature = source_signature()
+        lexicon = read_lexicon(path, signature)
+        if lexicon is None:
+            lexicon = build_lexicon()
+            try:
+                write_lexicon(lexicon, signature, path)
+            except OSError as error:
+                logging.warning(f"Could not save the precompiled lexicon to {path}: {error}")
+        _lexicon = lexicon
+    return _lexicon
+
+
+def analyzer():
+    """A VADER analyzer with finvader's combined lexicon, created once per process."""
+    global _analyzer
+    if _analyzer is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+        # __init__ would parse vader_lexicon.zip again; the precompiled lexicon already contains it
+        vader = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+        vader.lexicon = load_lexicon()
+        vader.constants = VaderConstants()
+        _analyzer = vader
+    return _analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the precompiled finvader lexicon.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--path", default=lexicon_path())
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        lexicon = build_lexicon()
+        write_lexicon(lexicon, source_signature(), args.path)
+        print(f"Wrote {len(lexicon):,} words to {args.path} in {time.perf_counter() - started:.2f}s")
+        return
+
+    signature = source_signature()
+    started = time.perf_counter()
+    lexicon = read_lexicon(args.path, signature)
+    if lexicon is None:
+        state = "missing" if not os.path.exists(args.path) else "out of date"
+        print(f"{args.path} is {state}; it is rebuilt on the next score or with: python lexicon.py build")
+        return
+    print(f"{args.path}: {len(lexicon):,} words, loaded in {1000 * (time.perf_counter() - started):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
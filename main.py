@@ -1,309 +1,455 @@
-from PyQt5.QtWidgets import (
-    QApplication,
-    QWidget,
-    QVBoxLayout,
-    QHBoxLayout,
-    QPushButton,
-    QTextEdit,
-    QLabel,
-    QMessageBox,
-)
-from PyQt5.QtCore import QTimer, QThread, pyqtSignal
-from datetime import datetime, time
-import pandas as pd
-import subprocess
-import os
-import sys
-import csv
-
-class ScriptRunner(QThread):
-    output_signal = pyqtSignal(str)
-
-    def __init__(self, scripts):
-        super().__init__()
-        self.scripts = scripts
-
-    def run(self):
-        for script in self.scripts:
-            self.output_signal.emit(f"Running {script}...")
-            output = self.run_script(script)
-            self.output_signal.emit(output)
-            self.output_signal.emit("-" * 80)  # Separator for clarity
-
-        self.output_signal.emit("Data ready. You can now run plotone.py.")
-
-    def run_script(self, script_name):
-        """Run a Python script and return the output."""
-        try:
-            result = subprocess.run(['python', script_name], check=True, capture_output=True, text=True)
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            return f"Error running {script_name}: {e.stderr}"
-
-class PlotOneDialog(QWidget):
-    def __init__(self):
-        super().__init__()
-
-        self.setWindowTitle("Plotone Output")
-        self.setGeometry(150, 150, 600, 400)
-
-        self.layout = QVBoxLayout()
-
-        # Output Area for plotone.py
-        self.output_area = QTextEdit(self)
-        self.output_area.setReadOnly(True)
-        self.layout.addWidget(self.output_area)
-
-        # Button to Return to Main Menu
-        self.return_button = QPushButton("Return to Main Menu", self)
-        self.return_button.clicked.connect(self.close)
-        self.layout.addWidget(self.return_button)
-
-        self.setLayout(self.layout)
-
-    def display_output(self, output):
-        """Display the output of plotone.py."""
-        self.output_area.clear()
-        self.output_area.append(output)
-
-class Dashboard(QWidget):
-    def __init__(self):
-        super().__init__()
-
-        self.setWindowTitle("Welcome to the Stock Sentiment Tool")
-        self.setGeometry(500, 300, 800, 400)
-
-        self.layout = QVBoxLayout()
-
-        # Welcome Message
-        self.welcome_label = QLabel("Welcome to the Stock Sentiment Tool Dashboard", self)
-        self.welcome_label.setStyleSheet("font-size: 18px; font-weight: bold;")
-        self.layout.addWidget(self.welcome_label)
-
-        # Application Description
-        self.description_label = QLabel("Use the buttons below to run different scripts.", self)
-        self.layout.addWidget(self.description_label)
-
-        # Horizontal layout for output areas
-        self.output_layout = QHBoxLayout()
-
-        # Left Output Area (for messages)
-        self.left_output_area = QTextEdit(self)
-        self.left_output_area.setReadOnly(True)
-        self.output_layout.addWidget(self.left_output_area)
-
-        # Right Output Area (for top 10 tickers)
-        self.right_output_area = QTextEdit(self)
-        self.right_output_area.setReadOnly(True)
-        self.output_layout.addWidget(self.right_output_area)
-
-        self.layout.addLayout(self.output_layout)
-
-        # Button to Gather Data
-        self.run_all_button = QPushButton("Gather Data", self)
-        self.run_all_button.clicked.connect(self.show_loading_and_run_scripts)
-        self.layout.addWidget(self.run_all_button)
-
-        # Button to Run plotone.py
-        self.run_plotone_button = QPushButton("Plot Data", self)
-        self.run_plotone_button.clicked.connect(self.run_plotone)
-        self.layout.addWidget(self.run_plotone_button)
-
-        # New Button to Update Data
-        self.update_data_button = QPushButton("Update Data", self)
-        self.update_data_button.clicked.connect(self.run_update_script)
-        self.layout.addWidget(self.update_data_button)
-
-        self.setLayout(self.layout)
-
-        # Check for CSV files on startup
-        self.check_csv_files()
-
-        #Schedule tasks at specific times
-        self.schedule_tasks()
-
-        self.topten()
-
-    def schedule_tasks(self):
-        """Schedule 'Gather Data' and 'Update Data' at specific times."""
-        self.schedule_task(self.show_loading_and_run_scripts, time(4, 0))  # 4 AM
-        self.schedule_task(self.run_update_script, time(7, 0))  # 7 AM
-        self.schedule_task(self.run_update_script, time(9, 0))  # 9 AM
-
-    def schedule_task(self, task, target_time):
-        """Schedule a task to run at a specific time."""
-        now = datetime.now()
-        target_datetime = datetime.combine(now.date(), target_time)
-
-        # If the target time has already passed today, schedule it for tomorrow
-        if now > target_datetime:
-            target_datetime = datetime.combine(now.date() + pd.Timedelta(days=1), target_time)
-
-        delay = int((target_datetime - now).total_seconds() * 1000)  # Convert to milliseconds
-        QTimer.singleShot(delay, task)
-
-    def check_csv_files(self):
-        """Check if necessary CSV files exist and run scripts if not.""" 
-        if not (os.path.exists("news_with_sentiment.csv") and os.path.exists("export.csv")):
-            self.left_output_area.append("Welcome! Please wait while we prepare your data. This may take a moment.")
-            QTimer.singleShot(1000, self.run_initial_scripts)  # Delay for 1 second
-
-    def run_initial_scripts(self):
-        """Run initial scripts to prepare data.""" 
-        scripts = [
-            "export.py",
-            "price.py",
-            "sentiment.py",
-            "compilesent.py",
-        ]
-        
-        self.thread = ScriptRunner(scripts)
-        self.thread.output_signal.connect(self.update_output)
-        self.thread.finished.connect(self.on_scripts_finished)
-
-        self.thread.start()  # Start the thread
-        self.topten()
-
-    def show_loading_and_run_scripts(self):
-        """Show loading message and then run all scripts.""" 
-        self.left_output_area.clear()  # Clear previous output
-        self.left_output_area.append("Loading data, please wait...")
-
-        # Disable the button while running scripts
-        self.disable_buttons()
-
-        # Use QTimer to delay the execution of scripts
-        QTimer.singleShot(1000, self.run_all_scripts)  # Delay for 1 second
-
-    def run_all_scripts(self):
-        """Run all specified scripts except plotone.py and update the output area.""" 
-        scripts = [
-            "export.py",
-            "price.py",
-            "sentiment.py",
-            "compilesent.py",
-        ]
-        
-        self.thread = ScriptRunner(scripts)
-        self.thread.output_signal.connect(self.update_output)
-        self.thread.finished.connect(self.on_scripts_finished)
-
-        self.thread.start() 
-        self.topten()
-
-    def run_update_script(self):
-        """Run update.py and display the output in the output area.""" 
-        self.left_output_area.clear()
-        self.left_output_area.append("Updating data, please wait...")
-
-        self.disable_buttons()
-
-        QTimer.singleShot(1000, self.run_update)
-
-    def topten(self):
-        # Clear the right output area before displaying new data
-        self.right_output_area.clear()
-
-        try:
-            # Check if 'average_sentiment_per_ticker.csv' exists and is not empty
-            try:
-                sentiment_df = pd.read_csv('average_sentiment_per_ticker.csv')
-                if sentiment_df.empty:
-                    raise ValueError("Sentiment data is empty.")
-            except (FileNotFoundError, ValueError) as e:
-                self.right_output_area.append("No sentiment data available.")
-                return
-
-            # Check if 'export.csv' exists and is not empty
-            try:
-                price_change_df = pd.read_csv('export.csv')
-                if price_change_df.empty:
-                    raise ValueError("Price change data is empty.")
-            except (FileNotFoundError, ValueError) as e:
-                self.right_output_area.append("No price change data available.")
-                return
-
-            # Clean the 'Change' column by removing the '%' sign and converting to numeric values
-            price_change_df['Change'] = price_change_df['Change'].str.replace('%', '').astype(float)
-
-            # Filter for tickers with a positive price change
-            positive_change_df = price_change_df[price_change_df['Change'] > 0]
-
-            # Merge the filtered dataframe with sentiment data based on 'Ticker'
-            merged_df = pd.merge(sentiment_df, positive_change_df[['Ticker', 'Change']], on='Ticker')
-
-            # Sort by Combined_Sentiment (descending)
-            sorted_tickers = merged_df.sort_values(by='Combined_Sentiment', ascending=False)
-
-            # Get the top 10 tickers with the best sentiment and positive price change
-            top_10_tickers = sorted_tickers.head(10)
-
-            if top_10_tickers.empty:
-                self.right_output_area.append("No tickers match the criteria.")
-            else:
-                self.right_output_area.append("Top 10 Tickers with Best Sentiment and Positive Price Change:")
-                self.right_output_area.append(top_10_tickers.to_string(index=False))
-
-        except Exception as e:
-            # In case any other error occurs
-            self.right_output_area.append(f"Error: {e}")
-
-    def run_update(self):
-        """Helper to run the update script and re-enable buttons.""" 
-        output = self.run_script("update.py")
-        self.left_output_area.append(output)
-        self.enable_buttons()
-
-    def update_output(self, message):
-        """Update the output area with the script message.""" 
-        self.left_output_area.append(message)
-
-    def on_scripts_finished(self):
-        """Handle actions after scripts have finished running.""" 
-        QMessageBox.information(self, "Done", "All scripts have been executed.")
-        self.enable_buttons()
-
-        self.topten()
-
-    def run_plotone(self):
-        """Run plotone.py and display the output in a dialog."""
-        self.left_output_area.append("Plotting Ended.")
-
-        # Run plotone.py directly
-        self.run_script("plotone.py")
-
-    def run_scripts(self, scripts):
-        """Run a list of scripts sequentially."""
-        for script in scripts:
-            self.run_script(script)
-
-    def run_script(self, script):
-        """Run a single script and capture its output."""
-        try:
-            result = subprocess.run([sys.executable, script], capture_output=True, text=True)
-            if result.returncode == 0:
-                output = result.stdout
-                self.update_output(output)
-            else:
-                output = result.stderr
-                self.update_output(f"Error in {script}: {output}")
-        except Exception as e:
-            self.update_output(f"Exception while running {script}: {str(e)}")
-
-    def disable_buttons(self):
-        """Disable the buttons during script execution."""
-        self.run_all_button.setDisabled(True)
-        self.run_plotone_button.setDisabled(True)
-        self.update_data_button.setDisabled(True)
-
-    def enable_buttons(self):
-        """Enable the buttons after script execution."""
-        self.run_all_button.setDisabled(False)
-        self.run_plotone_button.setDisabled(False)
-        self.update_data_button.setDisabled(False)
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    dashboard = Dashboard()
-    dashboard.show()
-    sys.exit(app.exec_())
+from PyQt5.QtWidgets import (
+    QApplication,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QPushButton,
+    QTextEdit,
+    QLabel,
+    QMessageBox,
+)
+from PyQt5.QtCore import QTimer, QThread, pyqtSignal
+from datetime import datetime, time
+import threading
+import pandas as pd
+import os
+import sys
+import csv
+import html
+import shutil
+import tempfile
+import profiler
+import scheduler
+from analytics import top_tickers_with_history
+from jobs import (
+    GATHER_RESOURCES,
+    PLOT_RESOURCES,
+    STREAM_RESOURCES,
+    UPDATE_RESOURCES,
+    ChildProcesses,
+    Job,
+    JobCancelled,
+    JobQueue,
+)
+from progress import PROGRESS_ENV, format_duration, format_progress, progress_folder, read_progress
+from snapshot import SnapshotReader
+from stages import GATHER_STAGES, format_timeline, run_stages
+from stream import NewsStream, format_change, stream_interval
+
+GATHER_JOB = "Gather Data"
+UPDATE_JOB = "Update Data"
+PLOT_JOB = "Plot Data"
+STREAM_JOB = "Streaming"
+
+# The progress folder main.py made for this session; a PIPELINE_PROGRESS set by the user is never deleted
+own_progress_folder = None
+# Seconds between two tries to take scheduler.py's lock file
+LOCK_RETRY = 5
+
+class JobRunner(QThread):
+    """Runs one dashboard job off the UI thread; cancel() stops its scripts."""
+    output_signal = pyqtSignal(str)
+    timeline_signal = pyqtSignal(str)
+    stage_signal = pyqtSignal(str)  # script of each Gather Data stage that finished successfully
+    change_signal = pyqtSignal(str, object)  # streaming: phase ("provisional" or "scored"), list of changes
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        # Each job's scripts report into their own subfolder, so the status line shows them under this job
+        self.progress_folder = None
+        if progress_folder():
+            self.progress_folder = os.path.join(progress_folder(), job.name.replace(" ", "_"))
+        self.processes = ChildProcesses(self.progress_folder)
+        self.stop_event = threading.Event()
+        self.started_at = datetime.now().timestamp()
+        self.waiting_for_lock = False
+
+    def run(self):
+        try:
+            self.job.work(self)
+        except JobCancelled:
+            self.output_signal.emit(f"{self.job.name} cancelled.")
+        except Exception as e:
+            self.output_signal.emit(f"Error in {self.job.name}: {e}")
+
+    def cancel(self):
+        self.stop_event.set()
+        self.processes.cancel()
+
+    @property
+    def cancelled(self):
+        return self.stop_event.is_set()
+
+def hold_scheduler_lock(runner, work):
+    """Run work() holding scheduler.py's lock file, waiting while scheduler.py or a stream poll holds it."""
+    while True:
+        with scheduler.job_lock(runner.job.name) as acquired:
+            if acquired:
+                runner.waiting_for_lock = False
+                return work()
+        if not runner.waiting_for_lock:
+            runner.waiting_for_lock = True
+            runner.output_signal.emit(f"{runner.job.name} is waiting for scheduler (scheduler.py or a stream poll is running a job)...")
+        if runner.stop_event.wait(LOCK_RETRY):
+            raise JobCancelled()
+
+def gather_data(runner):
+    """Run the Gather Data stages; independent stages (price.py and sentiment.py) run at the same time."""
+    hold_scheduler_lock(runner, lambda: gather_stages(runner))
+
+def gather_stages(runner):
+    def stage_finished(result):
+        if result.status == "ok":
+            runner.stage_signal.emit(result.script)
+
+    results = run_stages(GATHER_STAGES, run=runner.processes.run_script,
+                         on_event=runner.output_signal.emit, on_result=stage_finished)
+    runner.timeline_signal.emit(format_timeline(results))
+    if runner.cancelled:
+        raise JobCancelled()
+    runner.output_signal.emit("Data ready. You can now run plotone.py.")
+
+def update_data(runner):
+    hold_scheduler_lock(runner, lambda: runner.output_signal.emit(runner.processes.run_script("update.py")))
+
+def plot_data(runner):
+    output = runner.processes.run_script("plotone.py")
+    if output.strip():
+        runner.output_signal.emit(output)
+    runner.output_signal.emit("Plotting Ended.")
+
+def stream_news(runner):
+    """Poll the news export every STREAM_INTERVAL seconds until the job is cancelled.
+
+    The poll's scripts run as the job's child processes, so Cancel Jobs stops a poll in the middle.
+    """
+    NewsStream(on_change=runner.change_signal.emit, runner=runner.processes.run_script).run(
+        stream_interval(), runner.stop_event)
+
+class PlotOneDialog(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("Plotone Output")
+        self.setGeometry(150, 150, 600, 400)
+
+        self.layout = QVBoxLayout()
+
+        # Output Area for plotone.py
+        self.output_area = QTextEdit(self)
+        self.output_area.setReadOnly(True)
+        self.layout.addWidget(self.output_area)
+
+        # Button to Return to Main Menu
+        self.return_button = QPushButton("Return to Main Menu", self)
+        self.return_button.clicked.connect(self.close)
+        self.layout.addWidget(self.return_button)
+
+        self.setLayout(self.layout)
+
+    def display_output(self, output):
+        """Display the output of plotone.py."""
+        self.output_area.clear()
+        self.output_area.append(output)
+
+class Dashboard(QWidget):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("Welcome to the Stock Sentiment Tool")
+        self.setGeometry(500, 300, 800, 400)
+
+        self.layout = QVBoxLayout()
+
+        # Welcome Message
+        self.welcome_label = QLabel("Welcome to the Stock Sentiment Tool Dashboard", self)
+        self.welcome_label.setStyleSheet("font-size: 18px; font-weight: bold;")
+        self.layout.addWidget(self.welcome_label)
+
+        # Application Description
+        self.description_label = QLabel("Use the buttons below to run different scripts.", self)
+        self.layout.addWidget(self.description_label)
+
+        # Horizontal layout for output areas
+        self.output_layout = QHBoxLayout()
+
+        # Left Output Area (for messages)
+        self.left_output_area = QTextEdit(self)
+        self.left_output_area.setReadOnly(True)
+        self.output_layout.addWidget(self.left_output_area)
+
+        # Right Output Area (for top 10 tickers)
+        self.right_output_area = QTextEdit(self)
+        self.right_output_area.setReadOnly(True)
+        self.output_layout.addWidget(self.right_output_area)
+
+        self.layout.addLayout(self.output_layout)
+
+        # Button to Gather Data
+        self.run_all_button = QPushButton("Gather Data", self)
+        self.run_all_button.clicked.connect(self.show_loading_and_run_scripts)
+        self.layout.addWidget(self.run_all_button)
+
+        # Button to Run plotone.py
+        self.run_plotone_button = QPushButton("Plot Data", self)
+        self.run_plotone_button.clicked.connect(self.run_plotone)
+        self.layout.addWidget(self.run_plotone_button)
+
+        # New Button to Update Data
+        self.update_data_button = QPushButton("Update Data", self)
+        self.update_data_button.clicked.connect(self.run_update_script)
+        self.layout.addWidget(self.update_data_button)
+
+        # Button to start or stop streaming updates
+        self.stream_button = QPushButton("Start Streaming", self)
+        self.stream_button.clicked.connect(self.toggle_stream)
+        self.layout.addWidget(self.stream_button)
+
+        # Running and waiting jobs with the progress of their scripts, refreshed every second
+        self.job_status_label = QLabel("No jobs running.", self)
+        self.job_status_label.setStyleSheet("font-family: monospace;")
+        self.layout.addWidget(self.job_status_label)
+
+        # Button to cancel the running jobs and drop the waiting ones
+        self.cancel_button = QPushButton("Cancel Jobs", self)
+        self.cancel_button.clicked.connect(self.cancel_jobs)
+        self.cancel_button.setDisabled(True)
+        self.layout.addWidget(self.cancel_button)
+
+        self.setLayout(self.layout)
+
+        # Every action runs as a job on its own thread; jobs writing the same data wait for each other
+        self.jobs = JobQueue()
+        self.runners = {}
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.refresh_job_status)
+        self.status_timer.start(1000)
+
+        # Summary and price tables mapped from the snapshot compilesent.py publishes
+        self.snapshot = SnapshotReader()
+
+        # Check for CSV files on startup
+        self.check_csv_files()
+
+        #Schedule tasks at specific times
+        self.schedule_tasks()
+
+        self.topten()
+
+    def schedule_tasks(self):
+        """Schedule 'Gather Data' and 'Update Data' at specific times."""
+        self.schedule_task(self.show_loading_and_run_scripts, time(4, 0))  # 4 AM
+        self.schedule_task(self.run_update_script, time(7, 0))  # 7 AM
+        self.schedule_task(self.run_update_script, time(9, 0))  # 9 AM
+
+    def schedule_task(self, task, target_time):
+        """Schedule a task to run at a specific time."""
+        now = datetime.now()
+        target_datetime = datetime.combine(now.date(), target_time)
+
+        # If the target time has already passed today, schedule it for tomorrow
+        if now > target_datetime:
+            target_datetime = datetime.combine(now.date() + pd.Timedelta(days=1), target_time)
+
+        delay = int((target_datetime - now).total_seconds() * 1000)  # Convert to milliseconds
+        QTimer.singleShot(delay, task)
+
+    def check_csv_files(self):
+        """Check if necessary CSV files exist and run scripts if not.""" 
+        if not (os.path.exists("news_with_sentiment.csv") and os.path.exists("export.csv")):
+            self.left_output_area.append("Welcome! Please wait while we prepare your data. This may take a moment.")
+            QTimer.singleShot(1000, self.run_initial_scripts)  # Delay for 1 second
+
+    def run_initial_scripts(self):
+        """Run initial scripts to prepare data.""" 
+        self.submit_job(Job(GATHER_JOB, gather_data, GATHER_RESOURCES))
+
+    def show_loading_and_run_scripts(self):
+        """Gather all news, prices and sentiment (waits for a running Update Data or stream)."""
+        self.left_output_area.append("Loading data, please wait...")
+        self.submit_job(Job(GATHER_JOB, gather_data, GATHER_RESOURCES))
+
+    def run_update_script(self):
+        """Run update.py (waits for a running Gather Data or stream)."""
+        self.left_output_area.append("Updating data, please wait...")
+        self.submit_job(Job(UPDATE_JOB, update_data, UPDATE_RESOURCES))
+
+    def submit_job(self, job):
+        """Start a job now, or queue it behind the jobs that write the same data."""
+        outcome = self.jobs.submit(job)
+        if outcome == "duplicate":
+            self.left_output_area.append(f"{job.name} is already running or waiting.")
+        elif outcome == "waiting":
+            self.left_output_area.append(f"{job.name} will start after {', '.join(self.jobs.blockers(job))}.")
+        else:
+            self.start_job(job)
+        self.refresh_job_status()
+
+    def start_job(self, job):
+        runner = JobRunner(job)
+        runner.output_signal.connect(self.update_output)
+        runner.timeline_signal.connect(self.show_timeline)
+        runner.stage_signal.connect(self.on_stage_finished)
+        runner.change_signal.connect(self.on_stream_change)
+        runner.finished.connect(lambda job=job: self.on_job_finished(job))
+        self.runners[job.name] = runner
+        if job.name == STREAM_JOB:
+            self.stream_button.setText("Stop Streaming")
+            self.left_output_area.append(f"Streaming: checking for new articles every {stream_interval()}s.")
+        runner.start()
+
+    def on_job_finished(self, job):
+        runner = self.runners.pop(job.name)
+        for waiting in self.jobs.finish(job):
+            self.start_job(waiting)
+        if job.name == GATHER_JOB:
+            self.on_scripts_finished(runner.cancelled)
+        elif job.name == UPDATE_JOB:
+            self.topten()
+        elif job.name == STREAM_JOB:
+            self.on_stream_stopped()
+        self.refresh_job_status()
+
+    def cancel_jobs(self):
+        """Stop the running jobs' scripts and drop the waiting jobs."""
+        for job in self.jobs.drop_waiting():
+            self.left_output_area.append(f"{job.name} will not run.")
+        for runner in self.runners.values():
+            runner.cancel()
+        if self.runners:
+            self.left_output_area.append(f"Cancelling {', '.join(self.runners)}...")
+
+    def refresh_job_status(self):
+        """Show each running job, the progress its scripts report, and the waiting jobs."""
+        now = datetime.now().timestamp()
+        lines = []
+        for name, runner in self.runners.items():
+            if runner.waiting_for_lock:
+                lines.append(f"{name}: waiting for scheduler")
+                continue
+            lines.append(f"{name}: running for {format_duration(now - runner.started_at)}")
+            for state in read_progress(runner.progress_folder, since=runner.started_at):
+                if not state.get("finished"):
+                    lines.append(f"  {format_progress(state, now)}")
+        for job in self.jobs.waiting:
+            lines.append(f"{job.name}: waiting for {', '.join(self.jobs.blockers(job))}")
+        self.job_status_label.setText("\n".join(lines) or "No jobs running.")
+        self.cancel_button.setDisabled(not (self.runners or self.jobs.waiting))
+
+    def topten(self):
+        # Clear the right output area before displaying new data
+        self.right_output_area.clear()
+
+        try:
+            # Check if 'average_sentiment_per_ticker.csv' exists and is not empty
+            try:
+                sentiment_df = self.snapshot.frame('summary')
+                if sentiment_df.empty:
+                    raise ValueError("Sentiment data is empty.")
+            except (FileNotFoundError, ValueError) as e:
+                self.right_output_area.append("No sentiment data available.")
+                return
+
+            # Check if 'export.csv' exists and is not empty
+            try:
+                price_change_df = self.snapshot.frame('prices', columns=['Ticker', 'Change'])
+                if price_change_df.empty:
+                    raise ValueError("Price change data is empty.")
+            except (FileNotFoundError, ValueError) as e:
+                self.right_output_area.append("No price change data available.")
+                return
+
+            # Get the top 10 tickers with the best sentiment and positive price change,
+            # with last week's average sentiment from the archive
+            top_10_tickers = top_tickers_with_history(sentiment_df, price_change_df)
+
+            if top_10_tickers.empty:
+                self.right_output_area.append("No tickers match the criteria.")
+            else:
+                self.right_output_area.append("Top 10 Tickers with Best Sentiment and Positive Price Change:")
+                self.right_output_area.append(top_10_tickers.to_string(index=False, na_rep='-'))
+                if 'Provisional' in top_10_tickers.columns and top_10_tickers['Provisional'].gt(0).any():
+                    self.right_output_area.append("Provisional: articles scored from their title only, "
+                                                  "until their content sentiment is backfilled.")
+
+        except Exception as e:
+            # In case any other error occurs
+            self.right_output_area.append(f"Error: {e}")
+
+    def toggle_stream(self):
+        """Start polling the news export every STREAM_INTERVAL seconds, or stop it."""
+        waiting = [job for job in self.jobs.waiting if job.name == STREAM_JOB]
+        if STREAM_JOB in self.runners:
+            # The current poll finishes first; no new one is started
+            self.runners[STREAM_JOB].stop_event.set()
+            self.stream_button.setDisabled(True)
+            self.left_output_area.append("Stopping the stream after the current poll...")
+        elif waiting:
+            self.jobs.waiting.remove(waiting[0])
+            self.left_output_area.append("Streaming will not start.")
+            self.refresh_job_status()
+        else:
+            self.submit_job(Job(STREAM_JOB, stream_news, STREAM_RESOURCES))
+
+    def on_stream_stopped(self):
+        self.stream_button.setText("Start Streaming")
+        self.stream_button.setDisabled(False)
+        self.left_output_area.append("Streaming stopped.")
+
+    def on_stream_change(self, phase, changes):
+        """Show the tickers whose sentiment moved and refresh the top 10."""
+        label = "title scores" if phase == "provisional" else "content scores"
+        self.left_output_area.append(f"New articles ({label}):")
+        for change in changes:
+            self.left_output_area.append(f"  {format_change(change)}")
+        self.topten()
+
+    def closeEvent(self, event):
+        """Cancel the jobs and wait for their threads before the window closes."""
+        self.jobs.drop_waiting()
+        for runner in list(self.runners.values()):
+            runner.cancel()
+            runner.wait()
+        if own_progress_folder:
+            shutil.rmtree(own_progress_folder, ignore_errors=True)
+        event.accept()
+
+    def update_output(self, message):
+        """Update the output area with the script message.""" 
+        self.left_output_area.append(message)
+
+    def show_timeline(self, timeline):
+        """Show when each Gather Data stage ran, in a fixed-width font."""
+        self.left_output_area.append(f"<pre>{html.escape(timeline)}</pre>")
+
+    def on_stage_finished(self, script):
+        """Show the provisional rankings while the article bodies are still being scored."""
+        if script == "provisional.py":
+            self.left_output_area.append("Provisional rankings ready; content sentiment is still being fetched.")
+            self.topten()
+
+    def on_scripts_finished(self, cancelled=False):
+        """Handle actions after scripts have finished running.""" 
+        if not cancelled:
+            QMessageBox.information(self, "Done", "All scripts have been executed.")
+        self.topten()
+
+    def run_plotone(self):
+        """Open plotone.py's window; the dashboard stays usable while it is open."""
+        self.submit_job(Job(PLOT_JOB, plot_data, PLOT_RESOURCES))
+
+if __name__ == "__main__":
+    # With --profile, every script started from the dashboard is profiled into the same run folder
+    if profiler.profiling_requested():
+        os.environ[profiler.PROFILE_ENV] = "1"
+        profiler.run_directory()
+    # Scripts started from the dashboard report their progress into this folder
+    if not progress_folder():
+        own_progress_folder = tempfile.mkdtemp(prefix="dashboard_progress_")
+        os.environ[PROGRESS_ENV] = own_progress_folder
+
+    app = QApplication(sys.argv)
+    dashboard = Dashboard()
+    dashboard.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,391 @@
+"""Near-duplicate articles: reuse the scores of a syndicated copy instead of fetching and scoring it again.
+
+Wire stories run on many sites under the same or an almost identical title and
+body. Every article sentiment.py and updatesent.py score is remembered in
+near_duplicates.csv, which is kept between runs:
+
+- Before a download, the title is looked up. If an article with the same
+  title was scored before, in this run or an earlier one, its content score is
+  reused and the article is neither downloaded nor scored. Its own title is
+  still scored, that is cheap.
+- After a download, the body is looked up the same way, which saves scoring it.
+
+Only identical titles skip the download: "Shares rise after earnings" and
+"Shares fall after earnings" have most words in common and opposite scores.
+Titles are compared after lowercasing, dropping punctuation and a publisher
+suffix (" - Reuters"), and must share a ticker and be dated within
+COPY_WINDOW_DAYS, so "X beats estimates" next quarter is a new story.
+
+Titles that are merely alike (at least TITLE_SIMILARITY of their words in
+common, found through MinHash signatures split into bands) do not reuse a
+score. While one of them is being downloaded the others wait; afterwards they
+are downloaded unless the same title was scored, and their bodies decide.
+
+Bodies are compared by a 64-bit SimHash of their three-word shingles, and
+hashes at most CONTENT_DISTANCE bits apart are copies. The hashes are split
+into four 16-bit bands, and each band is indexed. Any hash within three bits of
+another shares at least one band with it, so a lookup compares only a few
+candidates.
+
+    python neardup.py "Some headline" "Another headline"
+
+prints how alike two titles are.
+"""
+import csv
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from schema import DATE_FORMAT
+from scoring import analyze_sentiment, score_contents
+
+# Set SENTIMENT_NEAR_DUPLICATES=0 to fetch and score every article
+NEAR_DUPLICATES_ENV = "SENTIMENT_NEAR_DUPLICATES"
+INDEX_ENV = "NEAR_DUPLICATE_INDEX"
+DEFAULT_INDEX = "near_duplicates.csv"
+# Entries older than this many days (before the newest entry) are dropped when the index is saved
+KEEP_DAYS_ENV = "NEAR_DUPLICATE_DAYS"
+DEFAULT_KEEP_DAYS = 30
+
+# Share of words two titles must have in common for one to wait for the other's download
+TITLE_SIMILARITY = 0.85
+# Shorter titles ("Stocks to watch") are too generic to stand for the same story
+MIN_TITLE_WORDS = 6
+# Copies of a story appear within this many days of each other
+COPY_WINDOW_DAYS = 2
+# MinHash signature: MINHASH_BANDS bands of MINHASH_ROWS values. Titles 85% alike share a band 97% of the time
+MINHASH_BANDS = 5
+MINHASH_ROWS = 4
+
+# Most bits two body hashes may differ in and still count as copies
+CONTENT_DISTANCE = 3
+# Bodies are hashed from their first words; copies differ at the end (bylines, boilerplate), if anywhere
+MAX_CONTENT_WORDS = 1500
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = 64 // SIMHASH_BANDS
+
+FIELDNAMES = ['Date', 'Url', 'Tickers', 'Title_Key', 'Content_Hash', 'Content_Sentiment']
+
+WORD = re.compile(r"[a-z0-9]+")
+# " - Reuters", " | Yahoo Finance": a dash or bar and up to four words at the end of a title
+PUBLISHER_SUFFIX = re.compile(r"\s+[-|\u2013\u2014]\s+(?:\S+\s*){1,4}$")
+
+# Fixed multipliers of the MinHash permutations, so signatures are the same in every run
+_permutations = np.random.default_rng(440).integers(1, 2 ** 63, size=(2, MINHASH_BANDS * MINHASH_ROWS), dtype=np.uint64)
+_permutations[0] |= np.uint64(1)
+
+
+def near_duplicates_enabled():
+    return os.environ.get(NEAR_DUPLICATES_ENV, "1").lower() not in ("0", "false", "no", "off")
+
+
+def index_path():
+    return os.environ.get(INDEX_ENV, DEFAULT_INDEX)
+
+
+def words(text):
+    return WORD.findall(str(text).lower())
+
+
+def stable_hashes(features):
+    """64-bit hashes of strings; blake2b rather than hash(), whose per-process seed changes between runs."""
+    digests = b"".join(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest() for feature in features)
+    return np.frombuffer(digests, dtype=np.uint64)
+
+
+def title_words(title):
+    """The set of words of a title, or None if it is too short to compare."""
+    title_set = frozenset(words(title))
+    return title_set if len(title_set) >= MIN_TITLE_WORDS else None
+
+
+def title_key(title):
+    """The title without publisher suffix, case and punctuation, or None if it is too short to compare."""
+    title = PUBLISHER_SUFFIX.sub("", str(title).strip())
+    if title_words(title) is None:
+        return None
+    return " ".join(words(title))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b)
+
+
+def minhash_bands(word_set):
+    """Band keys of the word set's MinHash signature."""
+    hashes = stable_hashes(sorted(word_set))
+    # Multiply-add permutations; uint64 arithmetic wraps around, which is what we want
+    with np.errstate(over='ignore'):
+        signature = (hashes[:, None] * _permutations[0] + _permutations[1]).min(axis=0)
+    return [(band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS].tobytes()) for band in range(MINHASH_BANDS)]
+
+
+def simhash(features):
+    """64-bit SimHash: bit i is set if most features' hashes have bit i set."""
+    if not features:
+        return None
+    bits = np.unpackbits(stable_hashes(features).view(np.uint8)).reshape(len(features), 64)
+    return int.from_bytes(np.packbits(bits.sum(axis=0) * 2 > len(features)).tobytes(), 'big')
+
+
+def content_hash(content):
+    tokens = words(content)[:MAX_CONTENT_WORDS] if content else []
+    if not tokens:
+        return None
+    return simhash([" ".join(tokens[i:i + 3]) for i in range(max(len(tokens) - 2, 1))])
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+class TitleIndex:
+    """Word sets of titles, found by MinHash bands and checked by their exact Jaccard similarity.
+
+    Only used to hold back downloads of similar titles; scores are reused for identical titles only.
+    """
+
+    def __init__(self):
+        self.bands = {}
+
+    def add(self, word_set, item):
+        for key in minhash_bands(word_set):
+            self.bands.setdefault(key, []).append((word_set, item))
+
+    def discard(self, word_set, item):
+        for key in minhash_bands(word_set):
+            entries = self.bands.get(key)
+            if entries:
+                self.bands[key] = [entry for entry in entries if entry != (word_set, item)]
+
+    def find(self, word_set, accept=None):
+        """The most similar item at least TITLE_SIMILARITY alike for which accept(item) is true, or None."""
+        best, best_similarity = None, TITLE_SIMILARITY
+        for key in minhash_bands(word_set):
+            for candidate, item in self.bands.get(key, ()):
+                similarity = jaccard(word_set, candidate)
+                if similarity >= best_similarity and (accept is None or accept(item)):
+                    best, best_similarity = item, similarity
+        return best
+
+
+class ContentIndex:
+    """Body SimHashes indexed by their four bands, for lookups within three bits."""
+
+    def __init__(self):
+        self.bands = [{} for _ in range(SIMHASH_BANDS)]
+
+    def band_keys(self, value):
+        mask = (1 << SIMHASH_BAND_BITS) - 1
+        return [(value >> (band * SIMHASH_BAND_BITS)) & mask for band in range(SIMHASH_BANDS)]
+
+    def add(self, value, item):
+        for table, key in zip(self.bands, self.band_keys(value)):
+            table.setdefault(key, []).append((value, item))
+
+    def find(self, value):
+        """The item of the closest hash at most CONTENT_DISTANCE bits away, or None."""
+        best, best_distance = None, CONTENT_DISTANCE + 1
+        for table, key in zip(self.bands, self.band_keys(value)):
+            for candidate, item in table.get(key, ()):
+                candidate_distance = distance(value, candidate)
+                if candidate_distance < best_distance:
+                    best, best_distance = item, candidate_distance
+        return best
+
+
+def same_story(tickers, date):
+    """Accept index entries that share a ticker with the article and are dated close to it."""
+    date = parse_date(date)
+
+    def accept(entry):
+        if not tickers & entry['Tickers']:
+            return False
+        entry_date = parse_date(entry['Date'])
+        return date is None or entry_date is None or abs(date - entry_date) <= timedelta(days=COPY_WINDOW_DAYS)
+    return accept
+
+
+class NearDuplicateIndex:
+    """Title words and body hashes of scored articles with their content scores.
+
+    Lookups and additions are safe from the download threads of sentiment.py.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or index_path()
+        self.entries = []
+        # Entries by title_key()
+        self.titles = {}
+        self.contents = ContentIndex()
+        # Titles being downloaded in this run and not scored yet
+        self.in_flight = TitleIndex()
+        self.lock = threading.Lock()
+        self.stats = {"title_copies": 0, "content_copies": 0}
+
+    @classmethod
+    def load(cls, path=None):
+        index = cls(path)
+        try:
+            with open(index.path, 'r', newline='', encoding='utf-8') as index_file:
+                for row in csv.DictReader(index_file):
+                    try:
+                        index.add_entry({
+                            'Date': row['Date'],
+                            'Url': row['Url'],
+                            'Tickers': frozenset(row['Tickers'].split()),
+                            # Files written before Title_Key still load their body hashes
+                            'Title_Key': row.get('Title_Key') or None,
+                            'Content_Hash': int(row['Content_Hash'], 16) if row['Content_Hash'] else None,
+                            'Content_Sentiment': float(row['Content_Sentiment']),
+                        })
+                    except (AttributeError, KeyError, TypeError, ValueError):
+                        continue
+        except FileNotFoundError:
+            pass
+        logging.info(f"Near-duplicate index: {len(index.entries):,} articles from {index.path}")
+        return index
+
+    def add_entry(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+            if entry['Title_Key'] is not None:
+                self.titles.setdefault(entry['Title_Key'], []).append(entry)
+            if entry['Content_Hash'] is not None:
+                self.contents.add(entry['Content_Hash'], entry)
+
+    def add(self, record, tickers, body_hash, content_sentiment):
+        """Remember a scored article so that its copies can reuse its content score.
+
+        Articles with similar titles are no longer held back by it (see finish()).
+        """
+        self.finish(record.get('Title', ''), tickers, record.get('Date'))
+        if content_sentiment is None or body_hash is None:
+            return
+        self.add_entry({'Date': record.get('Date', ''), 'Url': record.get('Url', ''), 'Tickers': frozenset(tickers),
+                        'Title_Key': title_key(record.get('Title', '')), 'Content_Hash': body_hash,
+                        'Content_Sentiment': content_sentiment})
+
+    def match_title(self, title, tickers, date):
+        """The latest scored entry with the same title for the same tickers and days, or None."""
+        key = title_key(title)
+        if key is None:
+            return None
+        accept = same_story(frozenset(tickers), date)
+        with self.lock:
+            entry = next((entry for entry in reversed(self.titles.get(key, ())) if accept(entry)), None)
+            if entry is not None:
+                self.stats["title_copies"] += 1
+        return entry
+
+    def start(self, title, tickers, date):
+        """Note that an article is about to be downloaded; False if one with a similar title already is."""
+        word_set = title_words(title)
+        if word_set is None:
+            return True
+        item = {'Tickers': frozenset(tickers), 'Date': date}
+        with self.lock:
+            if self.in_flight.find(word_set, same_story(item['Tickers'], date)) is not None:
+                return False
+            self.in_flight.add(word_set, item)
+            return True
+
+    def finish(self, title, tickers, date):
+        """Note that an article passed to start() was scored (or given up), so similar titles no longer wait for it."""
+        word_set = title_words(title)
+        if word_set is None:
+            return
+        with self.lock:
+            self.in_flight.discard(word_set, {'Tickers': frozenset(tickers), 'Date': date})
+
+    def score_contents(self, contents, score_fn=analyze_sentiment):
+        """scoring.score_contents(), reusing the score of a copy scored earlier or in the same call.
+
+        Returns (content scores, body hashes); pass the hashes to add().
+        """
+        hashes = [content_hash(content) for content in contents]
+        sources = [None] * len(contents)  # an index entry, or the position of the copy in this call
+        batch = ContentIndex()
+        for position, value in enumerate(hashes):
+            if value is None:
+                continue
+            with self.lock:
+                source = self.contents.find(value)
+            if source is None:
+                source = batch.find(value)
+            if source is None:
+                batch.add(value, position)
+            else:
+                sources[position] = source
+        to_score = [position for position, source in enumerate(sources) if source is None]
+        scored = dict(zip(to_score, score_contents([contents[position] for position in to_score], score_fn)))
+        results = []
+        for position, source in enumerate(sources):
+            if source is None:
+                results.append(scored[position])
+            else:
+                results.append(source['Content_Sentiment'] if isinstance(source, dict) else scored[source])
+        with self.lock:
+            self.stats["content_copies"] += len(contents) - len(to_score)
+        return results, hashes
+
+    def summary(self):
+        titles, contents = self.stats["title_copies"], self.stats["content_copies"]
+        return (f"Near duplicates: {titles} downloads and {titles + contents} body scorings avoided "
+                f"({titles} copies found by title, {contents} by body)")
+
+    def save(self):
+        """Write the index, dropping entries older than NEAR_DUPLICATE_DAYS. The file is replaced with a rename."""
+        keep_days = int(os.environ.get(KEEP_DAYS_ENV, DEFAULT_KEEP_DAYS))
+        with self.lock:
+            entries = list(self.entries)
+        dates = [parse_date(entry['Date']) for entry in entries]
+        newest = max((date for date in dates if date is not None), default=None)
+        if newest is not None:
+            cutoff = newest - timedelta(days=keep_days)
+            entries = [entry for entry, date in zip(entries, dates) if date is None or date >= cutoff]
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', newline='', encoding='utf-8') as index_file:
+            writer = csv.DictWriter(index_file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for entry in entries:
+                writer.writerow({**entry,
+                                 'Tickers': " ".join(sorted(entry['Tickers'])),
+                                 'Title_Key': entry['Title_Key'] or '',
+                                 'Content_Hash': f"{entry['Content_Hash']:016x}"})
+        os.replace(temp_path, self.path)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("usage: python neardup.py TITLE TITLE")
+        return
+    first, second = title_words(sys.argv[1]), title_words(sys.argv[2])
+    if first is None or second is None:
+        print(f"Titles need at least {MIN_TITLE_WORDS} different words to be compared.")
+        return
+    similarity = jaccard(first, second)
+    if title_key(sys.argv[1]) == title_key(sys.argv[2]):
+        verdict = "the same title: copies"
+    elif similarity >= TITLE_SIMILARITY:
+        verdict = "alike: the second waits for the first's download, then the bodies decide"
+    else:
+        verdict = "different stories"
+    print(f"{similarity:.0%} of the words in common ({verdict})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class _StageError:
+    """Carries an exception raised in a background stage over to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _start_producer(iterable, buffer):
+    def produce():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except BaseException as error:
+            buffer.put(_StageError(error))
+        finally:
+            buffer.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+
+def bounded(iterable, maxsize):
+    """Run an iterable in a background thread, buffering at most maxsize items ahead of the consumer."""
+    buffer = queue.Queue(maxsize)
+    _start_producer(iterable, buffer)
+    while True:
+        item = buffer.get()
+        if item is _DONE:
+            return
+        if isinstance(item, _StageError):
+            raise item.error
+        yield item
+
+
+def micro_batches(iterable, max_batch, maxsize):
+    """Like bounded(), but yields lists of whatever items are ready (at least one, at most max_batch).
+
+    Batches grow when the consumer falls behind and shrink to single items when it
+    keeps up, so batching never holds results back waiting for a full batch.
+    """
+    buffer = queue.Queue(maxsize)
+    _start_producer(iterable, buffer)
+    finished = False
+    while not finished:
+        batch = [buffer.get()]
+        while len(batch) < max_batch:
+            try:
+                batch.append(buffer.get_nowait())
+            except queue.Empty:
+                break
+        for position, item in enumerate(batch):
+            if item is _DONE:
+                finished = True
+                batch = batch[:position]
+                break
+            if isinstance(item, _StageError):
+                raise item.error
+        if batch:
+            yield batch
+
+
+def ordered_map(func, iterable, workers, maxsize):
+    """Apply func to every item with a pool of threads, yielding results in input order.
+
+    At most maxsize items are in flight, so a slow consumer pauses the input.
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for item in iterable:
+            in_flight.append(executor.submit(func, item))
+            if len(in_flight) >= maxsize:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class RateLimiter:
+    """Spaces calls from any number of threads at least 1 / rate seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        time.sleep(start - now)
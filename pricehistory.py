@@ -0,0 +1,286 @@
+"""Append-only history of price snapshots, queried by ticker and time.
+
+price.py overwrites export.csv on every run, and update.py replaces the rows
+it refreshes. Both now also append the rows they fetched to this store, each
+stamped with its fetch time, so price moves after an article can be looked up
+later without downloading anything again.
+
+Layout (Parquet, hive-partitioned, rows sorted by Ticker then Date):
+
+    price_history/recent/day=2024-06-28/snapshot-<ms>-<pid>.parquet     one file per snapshot
+    price_history/compacted/month=2024-05/part-0.parquet                 one file per month
+
+Snapshots are never rewritten while they are recent. Days older than
+PRICE_HISTORY_COMPACT_DAYS are merged into their month's file, keeping one row
+per ticker per PRICE_HISTORY_RESOLUTION (the last one), so intraday history
+stays small and a month reads from one file. read_prices() answers ticker and
+time range queries from both parts; prices_asof() joins each article to the
+latest price at or before its time.
+
+    python pricehistory.py info | record | compact
+"""
+import argparse
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import profiler
+from schema import PRICE_NUMERIC, PRICES_PATH, parse_numeric
+
+# Folder of the store; "off" turns recording off
+PRICE_HISTORY_ENV = "PRICE_HISTORY"
+DEFAULT_PRICE_HISTORY = "price_history"
+# Days after which snapshots are compacted, and the spacing of the rows kept then ("" or "0" keeps all)
+COMPACT_DAYS_ENV = "PRICE_HISTORY_COMPACT_DAYS"
+DEFAULT_COMPACT_DAYS = 7
+RESOLUTION_ENV = "PRICE_HISTORY_RESOLUTION"
+DEFAULT_RESOLUTION = "1h"
+# How far back prices_asof() looks for a price by default; covers a long weekend
+ASOF_TOLERANCE = pd.Timedelta(days=4)
+
+RECENT = "recent"
+COMPACTED = "compacted"
+PARTITION_FORMATS = {RECENT: ("day", "%Y-%m-%d"), COMPACTED: ("month", "%Y-%m")}
+# export.csv's numbers, without the row number
+VALUE_COLUMNS = [column for column in PRICE_NUMERIC if column != 'No.']
+KEY = ['Ticker', 'Date']
+
+
+def history_path():
+    return os.environ.get(PRICE_HISTORY_ENV, DEFAULT_PRICE_HISTORY)
+
+
+def history_enabled():
+    if history_path().strip().lower() in ("", "0", "off", "false", "no"):
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compact_days():
+    return float(os.environ.get(COMPACT_DAYS_ENV, DEFAULT_COMPACT_DAYS))
+
+
+def resolution():
+    value = os.environ.get(RESOLUTION_ENV, DEFAULT_RESOLUTION).strip()
+    return None if value in ("", "0") else value
+
+
+def arrow_schema():
+    import pyarrow as pa
+    return pa.schema([('Ticker', pa.string()), ('Date', pa.timestamp('us'))]
+                     + [(column, pa.float64()) for column in VALUE_COLUMNS])
+
+
+def snapshot_rows(frame, times=None, when=None):
+    """Rows of an export.csv frame in the store's columns, each dated by times[ticker] or `when` (epoch seconds)."""
+    when = when or time.time()
+    rows = pd.DataFrame({'Ticker': frame['Ticker'].astype(str).to_numpy()})
+    stamps = rows['Ticker'].map(times or {}).fillna(when)
+    # Local time, like the dashboard's clock and the schedules
+    rows['Date'] = pd.to_datetime([datetime.fromtimestamp(stamp) for stamp in stamps]).astype('datetime64[us]')
+    for column in VALUE_COLUMNS:
+        rows[column] = parse_numeric(frame[column], 'float64').to_numpy() if column in frame.columns else float('nan')
+    rows = rows[rows['Ticker'].ne('')]
+    return rows.sort_values(KEY, kind='stable').reset_index(drop=True)
+
+
+def write_file(rows, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    folder, name = os.path.split(path)
+    os.makedirs(folder, exist_ok=True)
+    table = pa.Table.from_pandas(rows[list(arrow_schema().names)], schema=arrow_schema(), preserve_index=False)
+    # Readers skip names starting with "." until the finished file is renamed into place
+    temp_path = os.path.join(folder, f".{name}.tmp")
+    pq.write_table(table, temp_path)
+    os.replace(temp_path, path)
+
+
+def append_snapshot(frame, times=None, when=None, path=None):
+    """Add export.csv rows as a new snapshot file per day they fall in; returns the rows added."""
+    path = path or history_path()
+    rows = snapshot_rows(frame, times, when)
+    field, date_format = PARTITION_FORMATS[RECENT]
+    name = f"snapshot-{int(time.time() * 1000)}-{os.getpid()}.parquet"
+    for day, day_rows in rows.groupby(rows['Date'].dt.strftime(date_format)):
+        write_file(day_rows, os.path.join(path, RECENT, f"{field}={day}", name))
+    return len(rows)
+
+
+def record_prices(frame, times=None):
+    """append_snapshot() and compact() for the pipeline scripts; never fails them."""
+    if not history_enabled() or frame is None or frame.empty or 'Ticker' not in frame.columns:
+        return
+    try:
+        added = append_snapshot(frame, times)
+        logging.info(f"Recorded {added} prices in {history_path()}")
+        compact()
+    except Exception as e:
+        logging.warning(f"Could not record prices in {history_path()}: {e}")
+
+
+def partitions(path, part):
+    """{partition value: folder} of one part of the store."""
+    field = PARTITION_FORMATS[part][0]
+    folder = os.path.join(path, part)
+    if not os.path.isdir(folder):
+        return {}
+    return {name.split('=', 1)[1]: os.path.join(folder, name)
+            for name in sorted(os.listdir(folder)) if name.startswith(f"{field}=")}
+
+
+def read_part(path, part, tickers=None, start=None, end=None, columns=None):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    folder = os.path.join(path, part)
+    names = [name for name in arrow_schema().names if columns is None or name in columns or name in KEY]
+    if not partitions(path, part):
+        return arrow_schema().empty_table().select(names).to_pandas()
+    field, date_format = PARTITION_FORMATS[part]
+    terms = []
+    if start is not None:
+        terms += [ds.field(field) >= start.strftime(date_format), ds.field('Date') >= start.to_pydatetime()]
+    if end is not None:
+        terms += [ds.field(field) <= end.strftime(date_format), ds.field('Date') <= end.to_pydatetime()]
+    if tickers is not None:
+        terms.append(ds.field('Ticker').isin(list(tickers)))
+    condition = None
+    for term in terms:
+        condition = term if condition is None else condition & term
+    dataset = ds.dataset(folder, format="parquet", schema=arrow_schema().append(pa.field(field, pa.string())),
+                         partitioning=ds.partitioning(pa.schema([(field, pa.string())]), flavor="hive"),
+                         exclude_invalid_files=False)
+    return dataset.to_table(columns=names, filter=condition).to_pandas()
+
+
+def read_prices(tickers=None, start=None, end=None, columns=None, path=None):
+    """Price snapshots of `tickers` between start and end, sorted by Ticker and Date.
+
+    Only the partitions in the range are opened. A date-only `end` covers that
+    whole day. Ticker and Date are always returned.
+    """
+    path = path or history_path()
+    start = pd.Timestamp(start) if start is not None else None
+    if end is not None:
+        end_text = str(end)
+        end = pd.Timestamp(end)
+        if len(end_text) <= 10:
+            end = end + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    parts = [read_part(path, part, tickers, start, end, columns) for part in (COMPACTED, RECENT)]
+    frame = pd.concat([part for part in parts if len(part)] or parts[:1], ignore_index=True)
+    # A day being compacted can be in both parts for a moment
+    frame = frame.drop_duplicates(subset=KEY, keep='last').sort_values(KEY, kind='stable').reset_index(drop=True)
+    frame['Ticker'] = frame['Ticker'].astype('category')
+    return frame
+
+
+def prices_asof(frame, columns=('Price',), on='Date', by='Ticker', tolerance=ASOF_TOLERANCE,
+                direction='backward', path=None):
+    """`frame` with the latest snapshot's `columns` at or before each row's time (pandas merge_asof).
+
+    Only the frame's tickers and the time range it needs are read. Rows without
+    a snapshot within `tolerance` get NaN. direction='forward' takes the first
+    snapshot after the time instead, e.g. the price reaction to an article.
+    """
+    times = pd.to_datetime(frame[on])
+    start, end = times.min() - tolerance, times.max() + tolerance
+    prices = read_prices(tickers=frame[by].dropna().astype(str).unique(), start=start, end=end,
+                         columns=list(columns), path=path)
+    prices = prices.rename(columns={'Date': '_price_time'}).assign(**{by: lambda rows: rows[by].astype(str)})
+
+    left = pd.DataFrame({'_row': range(len(frame)), by: frame[by].astype(str).to_numpy(),
+                         '_time': times.astype('datetime64[us]').to_numpy()})
+    left = left.dropna(subset=['_time']).sort_values('_time', kind='stable')
+    joined = pd.merge_asof(left, prices.sort_values('_price_time', kind='stable'), left_on='_time',
+                           right_on='_price_time', by=by, tolerance=tolerance, direction=direction)
+    joined = joined.set_index('_row').reindex(range(len(frame)))
+    result = frame.copy()
+    for column in columns:
+        result[column] = joined[column].to_numpy()
+    result['Price_Date'] = joined['_price_time'].to_numpy()
+    return result
+
+
+def compact(path=None, older_than=None, spacing="default", now=None):
+    """Merge recent days older than `older_than` days into month files; returns (days, rows before, rows after).
+
+    Of each ticker's snapshots, the last one per `spacing` (a pandas frequency,
+    PRICE_HISTORY_RESOLUTION by default; None keeps all) is kept.
+    """
+    path = path or history_path()
+    older_than = compact_days() if older_than is None else older_than
+    spacing = resolution() if spacing == "default" else spacing
+    cutoff = (pd.Timestamp(now) if now is not None else pd.Timestamp.now()) - pd.Timedelta(days=older_than)
+    days = {day: folder for day, folder in partitions(path, RECENT).items() if pd.Timestamp(day) < cutoff.normalize()}
+    months = {}
+    for day, folder in days.items():
+        months.setdefault(day[:7], []).append(folder)
+
+    before = after = 0
+    field = PARTITION_FORMATS[COMPACTED][0]
+    for month, folders in months.items():
+        target = os.path.join(path, COMPACTED, f"{field}={month}", "part-0.parquet")
+        frames = [pd.read_parquet(target)] if os.path.exists(target) else []
+        frames += [pd.read_parquet(folder) for folder in folders]
+        rows = pd.concat(frames, ignore_index=True)[list(arrow_schema().names)]
+        rows['Ticker'] = rows['Ticker'].astype(str)
+        before += len(rows)
+        rows = rows.sort_values(KEY, kind='stable').drop_duplicates(subset=KEY, keep='last')
+        if spacing:
+            slot = rows['Date'].dt.floor(spacing)
+            rows = rows[~pd.DataFrame({'Ticker': rows['Ticker'], 'slot': slot}).duplicated(keep='last').to_numpy()]
+        after += len(rows)
+        write_file(rows.reset_index(drop=True), target)
+        # The month file holds these days now; readers drop the duplicates until they are gone
+        for folder in folders:
+            shutil.rmtree(folder, ignore_errors=True)
+    return len(days), before, after
+
+
+def folder_size(path):
+    files = [os.path.join(folder, name) for folder, _, names in os.walk(path) for name in names if name.endswith('.parquet')]
+    return len(files), sum(os.path.getsize(file) for file in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only price snapshot history.")
+    parser.add_argument("command", choices=["info", "record", "compact"],
+                        help="info: show the store; record: add the current export.csv; compact: merge old days now")
+    parser.add_argument("--history", default=history_path())
+    parser.add_argument("--input", default=PRICES_PATH, help="export.csv to record")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        from quotes import PRICE_TIMES_PATH, read_price_times
+        frame = pd.read_csv(args.input, dtype=str, keep_default_na=False)
+        times = read_price_times(PRICE_TIMES_PATH)
+        print(f"Recorded {append_snapshot(frame, times, os.path.getmtime(args.input), args.history):,} prices "
+              f"from {args.input} in {args.history}")
+        return
+    if args.command == "compact":
+        days, before, after = compact(args.history)
+        print(f"Compacted {days} days: {before:,} rows -> {after:,}")
+        return
+
+    for part in (RECENT, COMPACTED):
+        files, size = folder_size(os.path.join(args.history, part))
+        names = list(partitions(args.history, part))
+        span = f", {names[0]} .. {names[-1]}" if names else ""
+        print(f"{part:10} {len(names):4} partitions, {files:5} files, {size / 2 ** 20:8.2f} MiB{span}")
+    frame = read_prices(columns=[], path=args.history)
+    if len(frame):
+        print(f"{len(frame):,} snapshots of {frame['Ticker'].nunique():,} tickers "
+              f"from {frame['Date'].min()} to {frame['Date'].max()}")
+
+
+if __name__ == "__main__":
+    profiler.enable_profiling("pricehistory")
+    main()
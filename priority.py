@@ -0,0 +1,167 @@
+"""Order article work by ticker importance and stop at a time or request budget.
+
+sentiment.py normally fetches and scores news.csv from top to bottom. With
+SENTIMENT_PRIORITY=1, or whenever a budget is set, it works through the rows
+by priority instead:
+
+    priority = (1 + ticker importance) * 0.5 ** (article age / PRIORITY_HALF_LIFE hours)
+
+Ticker importance is log10(1 + Volume) + log10(1 + Market Cap) from export.csv.
+Tickers on the watchlist get WATCHLIST_BONUS on top. Age is counted back from
+the newest article in the file. So a run that is cut short has covered the
+most traded, largest and watched names, and their newest news, first.
+
+    python priority.py [news.csv] [--top 20]
+
+prints the order a run would use.
+"""
+import argparse
+import csv
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+from schema import DATE_FORMAT, PRICES_PATH, load_prices
+
+PRIORITY_ENV = "SENTIMENT_PRIORITY"
+# Stop starting downloads after this many seconds / this many article requests
+TIME_BUDGET_ENV = "SENTIMENT_TIME_BUDGET"
+REQUEST_BUDGET_ENV = "SENTIMENT_REQUEST_BUDGET"
+
+# Comma-separated tickers, added to the ones listed in the watchlist file (one per line)
+WATCHLIST_ENV = "WATCHLIST"
+WATCHLIST_FILE_ENV = "WATCHLIST_FILE"
+DEFAULT_WATCHLIST_FILE = "watchlist.txt"
+# Larger than the importance of any listed ticker, so watched tickers come first
+WATCHLIST_BONUS = 25.0
+
+# Hours after which an article's priority has halved
+HALF_LIFE_ENV = "PRIORITY_HALF_LIFE"
+DEFAULT_HALF_LIFE = 24.0
+
+
+def optional_number(name, kind=float):
+    value = os.environ.get(name, "").strip()
+    return kind(value) if value else None
+
+
+def priority_enabled():
+    if os.environ.get(PRIORITY_ENV, "").lower() in ("1", "true", "yes", "on"):
+        return True
+    # A budget only makes sense if the important rows come first
+    return optional_number(TIME_BUDGET_ENV) is not None or optional_number(REQUEST_BUDGET_ENV, int) is not None
+
+
+def read_watchlist():
+    tickers = {ticker.strip().upper() for ticker in os.environ.get(WATCHLIST_ENV, "").split(',') if ticker.strip()}
+    path = os.environ.get(WATCHLIST_FILE_ENV, DEFAULT_WATCHLIST_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as watchlist_file:
+            tickers.update(line.strip().upper() for line in watchlist_file if line.strip() and not line.startswith('#'))
+    except FileNotFoundError:
+        pass
+    return tickers
+
+
+def ticker_importance(prices_path=PRICES_PATH, watchlist=None):
+    """{ticker: importance} from export.csv's Volume and Market Cap plus the watchlist bonus."""
+    watchlist = read_watchlist() if watchlist is None else watchlist
+    importance = {}
+    try:
+        prices = load_prices(prices_path, columns=['Ticker', 'Volume', 'Market Cap'])
+    except (FileNotFoundError, ValueError) as error:
+        logging.warning(f"No market data for priorities ({error}); using recency and the watchlist only")
+        prices = None
+    if prices is not None and 'Ticker' in prices.columns:
+        for column in ('Volume', 'Market Cap'):
+            if column not in prices.columns:
+                continue
+            for ticker, value in zip(prices['Ticker'].astype(str), prices[column]):
+                if value == value and value > 0:  # skips NaN
+                    importance[ticker] = importance.get(ticker, 0.0) + math.log10(1 + value)
+    for ticker in watchlist:
+        importance[ticker] = importance.get(ticker, 0.0) + WATCHLIST_BONUS
+    return importance
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def prioritize(rows, importance, half_life=None):
+    """Sort (row number, record) pairs by priority, highest first; ties keep news.csv order."""
+    half_life = half_life or float(os.environ.get(HALF_LIFE_ENV, DEFAULT_HALF_LIFE))
+    dates = [parse_date(record.get('Date')) for _, record in rows]
+    newest = max((date for date in dates if date is not None), default=None)
+
+    def priority(position):
+        _, record = rows[position]
+        date = dates[position]
+        # Undated articles count as eight half-lives old
+        age = (newest - date).total_seconds() / 3600 if date is not None else half_life * 8
+        return (1 + importance.get(record.get('Ticker', ''), 0.0)) * 0.5 ** (age / half_life)
+
+    order = sorted(range(len(rows)), key=lambda position: -priority(position))
+    return [rows[position] for position in order]
+
+
+class Budget:
+    """Wall-clock and request limits shared by the download threads of one run."""
+
+    def __init__(self, seconds=None, requests=None):
+        self.seconds = seconds
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+        self.requests = requests
+        self.used = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        return cls(optional_number(TIME_BUDGET_ENV), optional_number(REQUEST_BUDGET_ENV, int))
+
+    def limited(self):
+        return self.deadline is not None or self.requests is not None
+
+    def take(self):
+        """Reserve one article request; False once the time or request budget is used up."""
+        with self.lock:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                return False
+            if self.requests is not None and self.used >= self.requests:
+                return False
+            self.used += 1
+            return True
+
+    def describe(self):
+        limits = []
+        if self.deadline is not None:
+            limits.append(f"{self.seconds:g}s")
+        if self.requests is not None:
+            limits.append(f"{self.requests} requests")
+        return " / ".join(limits) or "unlimited"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the order in which sentiment.py would process news.csv.")
+    parser.add_argument("path", nargs="?", default="news.csv")
+    parser.add_argument("--top", type=int, default=20, help="rows to show")
+    args = parser.parse_args()
+
+    with open(args.path, 'r', newline='', encoding='utf-8') as news_file:
+        rows = list(enumerate(csv.DictReader(news_file)))
+    importance = ticker_importance()
+    watchlist = read_watchlist()
+    for index, record in prioritize(rows, importance)[:args.top]:
+        ticker = record.get('Ticker', '')
+        mark = " *" if ticker in watchlist else ""
+        print(f"{index:6} {ticker:6} {importance.get(ticker, 0.0):6.2f}{mark:2} {record.get('Date', ''):19} {record.get('Title', '')[:60]}")
+
+
+if __name__ == "__main__":
+    main()
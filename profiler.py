@@ -0,0 +1,159 @@
+"""Opt-in cProfile hooks shared by the pipeline scripts.
+
+Each script calls enable_profiling(<stage>) when it starts. That does nothing
+unless the script was started with --profile or PIPELINE_PROFILE=1. Then the
+run is profiled and written to a timestamped folder that scripts started from
+it share, so profreport.py can show a whole run stage by stage.
+"""
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+# Profiling is switched on with the --profile flag or PIPELINE_PROFILE=1
+PROFILE_FLAG = "--profile"
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+# Root directory for profiling runs (one timestamped folder per run)
+PROFILE_DIR_ENV = "PIPELINE_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Shared run id so that scripts started by main.py or update.py land in the same folder
+PROFILE_RUN_ENV = "PIPELINE_PROFILE_RUN"
+
+# Optional stack sampling interval in seconds (e.g. 0.01), disabled when unset
+PROFILE_SAMPLE_ENV = "PIPELINE_PROFILE_SAMPLE"
+
+
+def profiling_requested():
+    """Return True if profiling was requested on the command line or in the environment."""
+    if PROFILE_FLAG in sys.argv:
+        return True
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+def run_directory():
+    """Return the timestamped directory for the current profiling run, creating it if needed."""
+    run_id = os.environ.get(PROFILE_RUN_ENV)
+    if not run_id:
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        # Child scripts inherit the run id and write next to this one
+        os.environ[PROFILE_RUN_ENV] = run_id
+    root = os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+    path = os.path.join(root, run_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class StackSampler(threading.Thread):
+    """Background thread that periodically records the call stack of every other thread."""
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = traceback.extract_stack(frame)
+                # Each stack starts with its thread's name, so download workers show up apart from the main thread
+                frames = [names.get(thread_id, str(thread_id))]
+                frames += [f"{os.path.basename(f.filename)}:{f.name}:{f.lineno}" for f in stack]
+                self.samples[";".join(frames)] += 1
+
+    def stop(self):
+        self.stopped.set()
+
+    def write(self, file_path):
+        # Collapsed stack format, usable with flamegraph.pl or speedscope
+        with open(file_path, 'w', encoding='utf-8') as out:
+            for stack, count in self.samples.most_common():
+                out.write(f"{stack} {count}\n")
+
+
+def enable_profiling(stage):
+    """Start profiling this script if requested; results are written when the process exits.
+
+    The stats end up in <profile dir>/<run id>/<stage>.prof, with the sampled
+    stacks (if enabled) in <stage>.stacks.txt next to them. Threads started
+    after this call (pipeline producers, download workers) get a profile of
+    their own, merged into the stage's stats at exit.
+    """
+    if not profiling_requested():
+        return None
+
+    # Strip the flag so the script's own argument handling is unaffected
+    while PROFILE_FLAG in sys.argv:
+        sys.argv.remove(PROFILE_FLAG)
+    # Make sure scripts started from this one are profiled as well
+    os.environ[PROFILE_ENV] = "1"
+
+    output_dir = run_directory()
+    profile = cProfile.Profile()
+
+    sampler = None
+    interval = os.environ.get(PROFILE_SAMPLE_ENV)
+    if interval:
+        try:
+            sampler = StackSampler(float(interval))
+            sampler.start()
+        except ValueError:
+            print(f"Ignoring invalid {PROFILE_SAMPLE_ENV} value: {interval}")
+
+    # cProfile only sees the thread that enabled it, so every new thread enables its own
+    thread_profiles = []
+    lock = threading.Lock()
+
+    def profile_thread(frame, event, arg):
+        thread_profile = cProfile.Profile()
+        try:
+            # Replaces this hook for the rest of the thread
+            thread_profile.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the first profile already
+            sys.setprofile(None)
+            return
+        with lock:
+            thread_profiles.append(thread_profile)
+
+    threading.setprofile(profile_thread)
+
+    started = time.perf_counter()
+
+    def write_results():
+        profile.disable()
+        threading.setprofile(None)
+        elapsed = time.perf_counter() - started
+        # A stage that runs twice in one run (e.g. repeated updates) keeps both profiles
+        name = stage
+        if os.path.exists(os.path.join(output_dir, f"{name}.prof")):
+            name = f"{stage}-{os.getpid()}"
+        stats_path = os.path.join(output_dir, f"{name}.prof")
+        stats = pstats.Stats(profile)
+        with lock:
+            for thread_profile in thread_profiles:
+                try:
+                    stats.add(thread_profile)
+                except TypeError:
+                    # A thread that never finished a call has no stats to add
+                    continue
+        stats.dump_stats(stats_path)
+        if sampler is not None:
+            sampler.stop()
+            sampler.write(os.path.join(output_dir, f"{name}.stacks.txt"))
+        print(f"Profile for {stage} ({elapsed:.1f}s) saved to {stats_path}", file=sys.stderr)
+
+    atexit.register(write_results)
+    profile.enable()
+    return profile
@@ -0,0 +1,119 @@
+import argparse
+import glob
+import os
+import pstats
+
+from profiler import DEFAULT_PROFILE_DIR, PROFILE_DIR_ENV
+
+
+def latest_run(root):
+    """Return the most recent run directory under root, or None if there is none."""
+    runs = sorted(d for d in glob.glob(os.path.join(root, "*")) if os.path.isdir(d))
+    return runs[-1] if runs else None
+
+
+def resolve_run(run, root):
+    """Accept either a run directory path or a bare run id."""
+    if run is None:
+        return latest_run(root)
+    if os.path.isdir(run):
+        return run
+    return os.path.join(root, run)
+
+
+def load_stages(run_dir):
+    """Load every <stage>.prof file in a run directory into a dict of pstats.Stats."""
+    stages = {}
+    for stats_path in sorted(glob.glob(os.path.join(run_dir, "*.prof"))):
+        stage = os.path.splitext(os.path.basename(stats_path))[0]
+        stages[stage] = pstats.Stats(stats_path)
+    return stages
+
+
+def function_label(func):
+    file_name, line, name = func
+    if file_name == "~":
+        return name  # Built-in functions
+    return f"{os.path.basename(file_name)}:{line}({name})"
+
+
+def hot_functions(stats, sort_key="tottime"):
+    """Return (label, calls, tottime, cumtime) tuples ordered by the chosen time column."""
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append((function_label(func), nc, tt, ct))
+    column = 2 if sort_key == "tottime" else 3
+    rows.sort(key=lambda row: row[column], reverse=True)
+    return rows
+
+
+def print_report(run_dir, top, sort_key):
+    stages = load_stages(run_dir)
+    if not stages:
+        print(f"No profiles found in {run_dir}")
+        return
+
+    print(f"Profiling run: {run_dir}")
+    for stage, stats in stages.items():
+        print("=" * 80)
+        print(f"{stage}: total {stats.total_tt:.3f}s")
+        print(f"{'calls':>10} {'tottime':>10} {'cumtime':>10}  function")
+        for label, calls, tottime, cumtime in hot_functions(stats, sort_key)[:top]:
+            print(f"{calls:>10} {tottime:>10.3f} {cumtime:>10.3f}  {label}")
+
+
+def print_comparison(base_dir, other_dir, top, sort_key):
+    base_stages = load_stages(base_dir)
+    other_stages = load_stages(other_dir)
+
+    print(f"Comparing {base_dir} (base) with {other_dir}")
+    for stage in sorted(set(base_stages) | set(other_stages)):
+        print("=" * 80)
+        if stage not in base_stages or stage not in other_stages:
+            missing = base_dir if stage not in base_stages else other_dir
+            print(f"{stage}: not present in {missing}")
+            continue
+
+        base_total = base_stages[stage].total_tt
+        other_total = other_stages[stage].total_tt
+        print(f"{stage}: {base_total:.3f}s -> {other_total:.3f}s ({other_total - base_total:+.3f}s)")
+
+        column = 2 if sort_key == "tottime" else 3
+        base_rows = {row[0]: row for row in hot_functions(base_stages[stage], sort_key)}
+        other_rows = {row[0]: row for row in hot_functions(other_stages[stage], sort_key)}
+
+        # Rank by the largest absolute change in the chosen time column
+        deltas = []
+        for label in set(base_rows) | set(other_rows):
+            before = base_rows[label][column] if label in base_rows else 0.0
+            after = other_rows[label][column] if label in other_rows else 0.0
+            deltas.append((label, before, after, after - before))
+        deltas.sort(key=lambda row: abs(row[3]), reverse=True)
+
+        print(f"{'base':>10} {'other':>10} {'delta':>10}  function")
+        for label, before, after, delta in deltas[:top]:
+            print(f"{before:>10.3f} {after:>10.3f} {delta:>+10.3f}  {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize profiles captured with --profile / PIPELINE_PROFILE=1.")
+    parser.add_argument("run", nargs="?", help="Run directory or run id (defaults to the latest run)")
+    parser.add_argument("--compare", metavar="OTHER", help="Second run to compare against the first")
+    parser.add_argument("--top", type=int, default=15, help="Number of functions to list per stage")
+    parser.add_argument("--sort", choices=["tottime", "cumtime"], default="tottime", help="Time column to rank by")
+    parser.add_argument("--dir", default=os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR), help="Root profile directory")
+    args = parser.parse_args()
+
+    run_dir = resolve_run(args.run, args.dir)
+    if run_dir is None or not os.path.isdir(run_dir):
+        print(f"No profiling run found in {args.dir}")
+        return
+
+    if args.compare:
+        print_comparison(run_dir, resolve_run(args.compare, args.dir), args.top, args.sort)
+    else:
+        print_report(run_dir, args.top, args.sort)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Live progress of pipeline scripts, shown by the dashboard while a job runs.
+
+main.py points PIPELINE_PROGRESS at a folder before it starts any script. Scripts
+report their work with a Progress object, which writes <folder>/<script>.json
+(rows done, rows in total, start and last update time) at most once a second
+and replaces it with a rename. The dashboard reads the folder every second and
+shows each running script's share done and its estimated time left. Without
+PIPELINE_PROGRESS nothing is written, so scripts run as before from the
+command line and from scheduler.py.
+"""
+import json
+import os
+import time
+
+PROGRESS_ENV = "PIPELINE_PROGRESS"
+# Seconds between two writes of a script's progress file
+WRITE_INTERVAL = 1.0
+
+
+def progress_folder():
+    return os.environ.get(PROGRESS_ENV) or None
+
+
+class Progress:
+    """Counts the work of one script; `unit` names what is counted ("rows", "articles", "tickers")."""
+
+    def __init__(self, name, total=None, unit="rows"):
+        self.folder = progress_folder()
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.started = time.time()
+        self.written = 0.0
+        self.write(force=True)
+
+    def set_total(self, total):
+        self.total = total
+        self.write(force=True)
+
+    def advance(self, count=1):
+        self.done += count
+        self.write()
+
+    def finish(self):
+        self.write(force=True, finished=True)
+
+    def write(self, force=False, finished=False):
+        if self.folder is None:
+            return
+        now = time.time()
+        if not force and now - self.written < WRITE_INTERVAL:
+            return
+        self.written = now
+        state = {"name": self.name, "done": self.done, "total": self.total, "unit": self.unit,
+                 "started": self.started, "updated": now, "finished": finished}
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{self.name}.json")
+        try:
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as progress_file:
+                json.dump(state, progress_file)
+            os.replace(f"{path}.tmp", path)
+        except OSError:
+            # Progress is only for show; a locked file (Windows) must not stop the script
+            pass
+
+
+def read_progress(folder=None, since=0.0):
+    """Progress of the scripts that reported since `since` (a time.time() value), oldest first."""
+    folder = folder or progress_folder()
+    states = []
+    if folder is None or not os.path.isdir(folder):
+        return states
+    for name in os.listdir(folder):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(folder, name), 'r', encoding='utf-8') as progress_file:
+                state = json.load(progress_file)
+        except (OSError, ValueError):
+            continue
+        if state.get("started", 0) >= since:
+            states.append(state)
+    return sorted(states, key=lambda state: state["started"])
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_progress(state, now=None):
+    """e.g. 'sentiment.py: 1,204/3,400 rows (35%), 12m 10s left'."""
+    now = now or time.time()
+    elapsed = now - state["started"]
+    done, total, unit = state["done"], state.get("total"), state.get("unit", "rows")
+    if state.get("finished"):
+        return f"{state['name']}: done, {done:,} {unit} in {format_duration(state['updated'] - state['started'])}"
+    if not total:
+        return f"{state['name']}: {done:,} {unit}, running for {format_duration(elapsed)}"
+    text = f"{state['name']}: {done:,}/{total:,} {unit} ({done / total:.0%})"
+    if done:
+        # Rate so far, counted down from the last update
+        rate = done / max(state["updated"] - state["started"], 1e-9)
+        left = max((total - done) / rate - (now - state["updated"]), 0)
+        text += f", {format_duration(left)} left"
+    return text
@@ -0,0 +1,162 @@
+"""Title-only provisional sentiment, published before the article bodies are scored.
+
+Titles are in news.csv as soon as export.py finishes and score in microseconds,
+while every body takes a download and a one-second pause. This script scores the
+titles of the articles that news_with_sentiment.csv does not have yet, saves them
+to provisional_sentiment.csv and runs compilesent.py, so the dashboard ranks the
+new articles right away. Their Combined_Sentiment is the title score, and the
+summary counts them per ticker in its Provisional column.
+
+The provisional rows remember the news_with_sentiment.csv they were scored
+against. Once sentiment.py or updatesent.py has written the content scores,
+that file changes, and the next compile drops the provisional rows.
+"""
+import csv
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+from checkpoint import SENTIMENT_COLUMNS
+from schema import CSV_ENGINE, NEWS_PATH, load_news
+from scoring import analyze_sentiment, score_texts
+from snapshot import file_signature
+
+# Set SENTIMENT_PROVISIONAL=0 to publish only fully scored articles
+PROVISIONAL_ENV = "SENTIMENT_PROVISIONAL"
+PROVISIONAL_PATH = "provisional_sentiment.csv"
+KEY_COLUMNS = ['Date', 'Title', 'Ticker']
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def provisional_enabled():
+    return os.environ.get(PROVISIONAL_ENV, "1").lower() not in ("0", "false", "no", "off")
+
+
+def manifest_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def history_signature(history_path):
+    try:
+        return file_signature(history_path)
+    except FileNotFoundError:
+        return None
+
+
+def known_keys(history_path, keys):
+    """The (Date, Title, Ticker) keys out of `keys` that the history already has."""
+    if not keys or not os.path.exists(history_path):
+        return set()
+    try:
+        history = pd.read_csv(history_path, usecols=KEY_COLUMNS, dtype=str, keep_default_na=False, engine=CSV_ENGINE)
+    except (pd.errors.EmptyDataError, ValueError):
+        return set()
+    return {key for key in zip(history['Date'], history['Title'], history['Ticker']) if key in keys}
+
+
+def write_provisional(articles, history_path=NEWS_PATH, path=PROVISIONAL_PATH, known=None):
+    """Score the titles of articles not yet in the history and save them as provisional rows.
+
+    `known` is the set of history keys if the caller has already read them. Returns the
+    number of rows written. Both files are replaced with a rename.
+    """
+    signature = history_signature(history_path)
+    articles = [article for article in articles if article.get('Title')]
+    keys = [tuple(article.get(column, '') for column in KEY_COLUMNS) for article in articles]
+    if known is None:
+        known = known_keys(history_path, set(keys))
+    articles = [article for article, key in zip(articles, keys) if key not in known]
+
+    # An article tagged with several tickers has one title score for all of them
+    titles = list(dict.fromkeys(article['Title'] for article in articles))
+    scores = dict(zip(titles, score_texts(titles, analyze_sentiment)))
+    title_sentiments = [scores[article['Title']] for article in articles]
+    fieldnames = list(articles[0].keys()) if articles else KEY_COLUMNS
+    fieldnames += [column for column in SENTIMENT_COLUMNS if column not in fieldnames]
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', newline='', encoding='utf-8') as provisional_file:
+        writer = csv.DictWriter(provisional_file, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        for article, title_sentiment in zip(articles, title_sentiments):
+            title_sentiment = title_sentiment if title_sentiment is not None else 0.0
+            # The title stands in for the combined score until the body has been scored
+            writer.writerow({**article, 'Title_Sentiment': title_sentiment, 'Content_Sentiment': '',
+                             'Combined_Sentiment': title_sentiment})
+    os.replace(temp_path, path)
+
+    manifest = {"history": history_path, "signature": signature, "rows": len(articles),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S")}
+    temp_manifest = f"{manifest_path(path)}.tmp"
+    with open(temp_manifest, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(temp_manifest, manifest_path(path))
+    return len(articles)
+
+
+def clear_provisional(path=PROVISIONAL_PATH):
+    for name in (path, manifest_path(path)):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def load_provisional(history_path=NEWS_PATH, columns=None, path=PROVISIONAL_PATH):
+    """The provisional rows still waiting for their content scores, or None.
+
+    Rows scored against an older news_with_sentiment.csv have been backfilled since
+    and are removed.
+    """
+    try:
+        with open(manifest_path(path), 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        logging.warning(f"Ignoring unreadable provisional manifest {manifest_path(path)}: {error}")
+        return None
+    if manifest.get("signature") != history_signature(history_path):
+        clear_provisional(path)
+        return None
+    if not manifest.get("rows"):
+        return None
+    try:
+        return load_news(path, columns=columns)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if not provisional_enabled():
+        print(f"Provisional sentiment is off ({PROVISIONAL_ENV}=0).")
+        return
+    input_path = sys.argv[1] if len(sys.argv) > 1 else "news.csv"
+    try:
+        with open(input_path, 'r', newline='', encoding='utf-8') as news_file:
+            articles = list(csv.DictReader(news_file))
+    except FileNotFoundError:
+        print(f"File not found: {input_path}")
+        return
+
+    started = time.perf_counter()
+    rows = write_provisional(articles)
+    print(f"Scored {rows} new titles from {input_path} in {time.perf_counter() - started:.2f}s.")
+    if rows:
+        # Publish the provisional averages now; compilesent.py runs again once the bodies are scored
+        result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, "compilesent.py")],
+                                capture_output=True, text=True)
+        print(result.stdout.rstrip())
+        if result.returncode != 0:
+            print(f"Error running compilesent.py: {result.stderr.strip()}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
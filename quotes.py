@@ -0,0 +1,140 @@
+import json
+import os
+import time
+from io import StringIO
+
+import pandas as pd
+
+from fetcher import session
+from pricehistory import record_prices
+
+# Finviz URL template with placeholder for the ticker
+URL_TEMPLATE = "https://elite.finviz.com/export.ashx?t={ticker}&auth=ab4e8b66-99af-4c54-b834-10d199e1e3d5"
+
+# When each ticker's row in export.csv was last fetched (epoch seconds), kept next to export.csv
+PRICE_TIMES_PATH = "price_times.json"
+# update.py also refreshes prices older than this many seconds, even without new articles
+PRICE_MAX_AGE_ENV = "PRICE_MAX_AGE"
+DEFAULT_PRICE_MAX_AGE = 12 * 60 * 60
+
+
+# Function to export data from Finviz
+def export_finviz_data(ticker):
+    # Replace placeholder with actual ticker
+    url = URL_TEMPLATE.format(ticker=ticker)
+    print(f"Requesting data for ticker: {ticker} from {url}")
+
+    try:
+        # Make the HTTP request to Finviz
+        response = session.get(url)
+        if response.status_code == 200:
+            # Convert the response content to a DataFrame
+            data = pd.read_csv(StringIO(response.content.decode('utf-8')))
+            data['Ticker'] = ticker  # Add the Ticker column to the DataFrame
+            return data
+        elif response.status_code == 429:  # Too Many Requests - rate limit exceeded
+            print(f"Rate limit exceeded for ticker {ticker}. Waiting 1 second before retrying...")
+            time.sleep(1)  # Sleep for 1 second if rate limit is exceeded
+            return export_finviz_data(ticker)  # Retry fetching the data
+        else:
+            print(f"Failed to fetch data for ticker {ticker}. Status code: {response.status_code}")
+            return None
+    except Exception as e:
+        print(f"Error fetching data for ticker {ticker}: {e}")
+        return None
+
+
+def price_max_age():
+    return float(os.environ.get(PRICE_MAX_AGE_ENV, DEFAULT_PRICE_MAX_AGE))
+
+
+def read_price_times(path=PRICE_TIMES_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as times_file:
+            return json.load(times_file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def write_price_times(times, path=PRICE_TIMES_PATH):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as times_file:
+        json.dump(times, times_file, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def read_export(path):
+    """Read export.csv as text, so rows that are not refreshed are written back unchanged."""
+    try:
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+
+
+def export_time(path):
+    """When export.csv was written; the fetch time of rows without one of their own."""
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return 0
+
+
+def tickers_to_refresh(touched, export_df, times, max_age, default_time=0, now=None):
+    """Tickers with new articles, plus tickers in export.csv whose row is older than max_age seconds."""
+    now = now or time.time()
+    refresh = list(dict.fromkeys(ticker for ticker in touched if ticker))
+    if export_df.empty or 'Ticker' not in export_df.columns:
+        return refresh
+    for ticker in export_df['Ticker']:
+        if ticker not in refresh and now - times.get(ticker, default_time) > max_age:
+            refresh.append(ticker)
+    return refresh
+
+
+def merge_prices(export_df, fresh_df):
+    """Replace the rows of refreshed tickers in place and append tickers export.csv did not have."""
+    fresh_df = fresh_df.drop_duplicates(subset='Ticker', keep='last')
+    if export_df.empty:
+        return fresh_df.reset_index(drop=True)
+    position = {ticker: index for index, ticker in enumerate(export_df['Ticker'])}
+    kept = export_df[~export_df['Ticker'].isin(fresh_df['Ticker'])]
+    merged = pd.concat([kept, fresh_df], ignore_index=True)
+    order = merged['Ticker'].map(position).fillna(len(position)).to_numpy()
+    return merged.iloc[order.argsort(kind='stable')].reset_index(drop=True)
+
+
+def refresh_prices(tickers, export_path="export.csv", times_path=PRICE_TIMES_PATH):
+    """Fetch fresh Finviz rows for `tickers` only and swap the updated export.csv in with one rename.
+
+    Returns the tickers that were refreshed.
+    """
+    fresh_rows, refreshed, fetch_times = [], [], {}
+    for ticker in tickers:
+        finviz_data = export_finviz_data(ticker)
+        if finviz_data is not None and not finviz_data.empty:
+            fresh_rows.append(finviz_data.astype(object).where(finviz_data.notna(), ''))
+            refreshed.append(ticker)
+            fetch_times[str(ticker)] = time.time()
+        # Sleep for 1 second between requests to avoid hitting rate limits
+        time.sleep(1)
+    if not fresh_rows:
+        return refreshed
+
+    export_df = read_export(export_path)
+    times = read_price_times(times_path)
+    if not export_df.empty:
+        # Rewriting export.csv changes its mtime, so give the rows that are kept their age explicitly
+        written = export_time(export_path)
+        times.update({ticker: written for ticker in export_df['Ticker'] if ticker not in times})
+    fresh_df = pd.concat(fresh_rows, ignore_index=True)
+    merged = merge_prices(export_df, fresh_df)
+
+    temp_path = f"{export_path}.tmp"
+    merged.to_csv(temp_path, index=False, header=True)
+    os.replace(temp_path, export_path)
+    now = time.time()
+    times.update({ticker: now for ticker in refreshed})
+    write_price_times(times, times_path)
+    # Only the fetched rows go into the price history; the others are already in it
+    record_prices(fresh_df, fetch_times)
+    return refreshed
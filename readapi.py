@@ -0,0 +1,340 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+import profiler
+from schema import NEWS_PATH, PRICES_PATH, SUMMARY_PATH, load_news, load_prices, load_summary
+
+# Address of the local read API
+HOST_ENV = "READAPI_HOST"
+PORT_ENV = "READAPI_PORT"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8700
+# Seconds between checks of the CSV files for new output
+RELOAD_INTERVAL_ENV = "READAPI_RELOAD_INTERVAL"
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+# Files written by compilesent.py, price.py and sentiment.py/updatesent.py, with their loaders
+SOURCE_FILES = {
+    "sentiment": (SUMMARY_PATH, load_summary),
+    "prices": (PRICES_PATH, load_prices),
+    "articles": (NEWS_PATH, load_news),
+}
+
+# Decimal places kept from float32 columns (about 7 significant digits for scores in [-1, 1])
+FLOAT32_DIGITS = 6
+
+DEFAULT_TOP_K = 10
+MAX_LIMIT = 1000
+
+
+def json_ready(frame):
+    """Widen float32 columns, rounded so 0.54054 is not sent as 0.5405399799346924."""
+    for column in frame.columns:
+        if frame[column].dtype == 'float32':
+            frame[column] = frame[column].astype('float64').round(FLOAT32_DIGITS)
+    return frame
+
+
+def clean_value(value):
+    """Convert a pandas cell to a JSON-friendly value (NaN becomes null)."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, 'item'):
+        return clean_value(value.item())
+    return value
+
+
+class SourceFile:
+    """One CSV file and the last complete copy of it that was read."""
+
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.signature = None
+        self.frame = None
+
+    def stat(self):
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return status.st_mtime_ns, status.st_size
+
+    def refresh(self):
+        """Re-read the file if it changed; return True if new data was loaded.
+
+        A missing file keeps the previous data, since the scripts delete their
+        output before writing the new one. A file that changes while it is read
+        is left for the next check.
+        """
+        signature = self.stat()
+        if signature is None or signature == self.signature:
+            return False
+        try:
+            frame = self.loader(self.path)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, FileNotFoundError) as error:
+            logging.warning(f"Keeping previous data for {self.path}: {error}")
+            return False
+        if self.stat() != signature:
+            return False
+        self.signature = signature
+        self.frame = frame
+        logging.info(f"Loaded {len(frame)} rows from {self.path}")
+        return True
+
+
+class Snapshot:
+    """Read-only view of the compiled data, indexed for the API's queries."""
+
+    def __init__(self, sources):
+        self.version = hashlib.sha1(repr([source.signature for source in sources.values()]).encode()).hexdigest()[:16]
+        self.loaded_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        self.files = {name: source.path for name, source in sources.items() if source.frame is not None}
+
+        self.tickers = {}
+        sentiment = sources["sentiment"].frame
+        if sentiment is not None:
+            sentiment = json_ready(sentiment.copy())
+        if sentiment is not None and {'Ticker', 'Combined_Sentiment'} <= set(sentiment.columns):
+            for ticker, score in zip(sentiment['Ticker'], sentiment['Combined_Sentiment']):
+                self.ticker_entry(ticker)["sentiment"] = clean_value(score)
+            # Articles in the average scored from their title only, until their bodies are backfilled
+            if 'Provisional' in sentiment.columns:
+                for ticker, count in zip(sentiment['Ticker'], sentiment['Provisional']):
+                    self.ticker_entry(ticker)["provisional"] = clean_value(count)
+
+        prices = sources["prices"].frame
+        if prices is not None and 'Ticker' in prices.columns:
+            for record in prices.to_dict('records'):
+                entry = self.ticker_entry(record['Ticker'])
+                entry["price"] = {column: clean_value(value) for column, value in record.items() if column != 'Ticker'}
+                if 'Change' in record:
+                    entry["change"] = clean_value(record['Change'])
+
+        # Articles per ticker, sorted by date so time ranges are two binary searches
+        self.articles = {}
+        news = sources["articles"].frame
+        if news is not None and {'Ticker', 'Date'} <= set(news.columns):
+            news = json_ready(news.dropna(subset=['Date'])).sort_values(['Ticker', 'Date'], kind='stable')
+            columns = [column for column in ('Title', 'Url', 'Source', 'Title_Sentiment', 'Content_Sentiment', 'Combined_Sentiment') if column in news.columns]
+            for ticker, group in news.groupby('Ticker', sort=False, observed=True):
+                dates = group['Date'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist()
+                records = [{column: clean_value(value) for column, value in record.items()} for record in group[columns].to_dict('records')]
+                self.articles[str(ticker)] = (dates, records)
+                entry = self.ticker_entry(ticker)
+                entry["articles"] = len(dates)
+                entry["first_article"] = dates[0]
+                entry["last_article"] = dates[-1]
+
+        # Rankings are sorted once per snapshot; /top only slices them
+        self.rankings = {}
+        for key in ("sentiment", "change"):
+            ranked = [entry for entry in self.tickers.values() if entry.get(key) is not None]
+            self.rankings[key] = sorted(ranked, key=lambda entry: entry[key], reverse=True)
+
+    def ticker_entry(self, ticker):
+        ticker = str(ticker)
+        if ticker not in self.tickers:
+            self.tickers[ticker] = {"ticker": ticker, "sentiment": None, "change": None, "price": None, "articles": 0}
+        return self.tickers[ticker]
+
+    def articles_between(self, ticker, start=None, end=None):
+        """Return the ticker's articles with start <= Date <= end (a date-only end covers the whole day)."""
+        dates, records = self.articles.get(ticker, ([], []))
+        low = bisect_left(dates, pd.Timestamp(start).strftime('%Y-%m-%d %H:%M:%S')) if start else 0
+        if end:
+            end_time = pd.Timestamp(end)
+            if len(end) <= 10:
+                high = bisect_left(dates, (end_time + pd.Timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))
+            else:
+                high = bisect_right(dates, end_time.strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            high = len(dates)
+        return [{"date": date, **record} for date, record in zip(dates[low:high], records[low:high])]
+
+
+class DataStore:
+    """Holds the current snapshot and swaps in a new one when the CSV files change."""
+
+    def __init__(self, data_dir):
+        self.sources = {name: SourceFile(os.path.join(data_dir, file_name), loader)
+                        for name, (file_name, loader) in SOURCE_FILES.items()}
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.refresh()
+
+    def refresh(self):
+        with self.lock:
+            changed = [source.refresh() for source in self.sources.values()]
+            if any(changed) or self.snapshot is None:
+                # Requests keep using the snapshot they started with; new ones see this one
+                self.snapshot = Snapshot(self.sources)
+                logging.info(f"Serving snapshot {self.snapshot.version}")
+
+    def watch(self, interval):
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception:
+                    logging.exception("Reloading the data failed; keeping the previous snapshot")
+
+        threading.Thread(target=poll, daemon=True).start()
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def positive_int(params, name, default, maximum=MAX_LIMIT):
+    value = params.get(name, [str(default)])[0]
+    if not value.isdigit() or int(value) < 1:
+        raise ApiError(400, f"{name} must be a positive integer")
+    return min(int(value), maximum)
+
+
+def handle_health(snapshot, params):
+    return {"version": snapshot.version, "loaded_at": snapshot.loaded_at, "files": snapshot.files, "tickers": len(snapshot.tickers)}
+
+
+def handle_tickers(snapshot, params):
+    return {"tickers": sorted(snapshot.tickers)}
+
+
+def handle_ticker(snapshot, params, ticker):
+    if ticker not in snapshot.tickers:
+        raise ApiError(404, f"Unknown ticker {ticker}")
+    return snapshot.tickers[ticker]
+
+
+def handle_articles(snapshot, params, ticker):
+    if ticker not in snapshot.tickers:
+        raise ApiError(404, f"Unknown ticker {ticker}")
+    start = params.get("start", [None])[0]
+    end = params.get("end", [None])[0]
+    limit = positive_int(params, "limit", MAX_LIMIT)
+    try:
+        articles = snapshot.articles_between(ticker, start, end)
+    except ValueError:
+        raise ApiError(400, "start and end must be dates like 2024-01-31 or 2024-01-31 16:00")
+    scores = [article["Combined_Sentiment"] for article in articles if article.get("Combined_Sentiment") is not None]
+    return {
+        "ticker": ticker,
+        "start": start,
+        "end": end,
+        "count": len(articles),
+        "mean_sentiment": sum(scores) / len(scores) if scores else None,
+        # Newest first, like the dashboard
+        "articles": articles[::-1][:limit],
+    }
+
+
+def handle_top(snapshot, params):
+    """Top tickers by sentiment or price change; positive_change=1 matches the dashboard's top 10."""
+    k = positive_int(params, "k", DEFAULT_TOP_K)
+    by = params.get("by", ["sentiment"])[0]
+    if by not in snapshot.rankings:
+        raise ApiError(400, f"by must be one of {', '.join(snapshot.rankings)}")
+    order = params.get("order", ["desc"])[0]
+    if order not in ("asc", "desc"):
+        raise ApiError(400, "order must be asc or desc")
+    ranked = snapshot.rankings[by] if order == "desc" else reversed(snapshot.rankings[by])
+    if params.get("positive_change", ["0"])[0].lower() in ("1", "true", "yes"):
+        ranked = (entry for entry in ranked if entry["change"] is not None and entry["change"] > 0)
+    top = []
+    for entry in ranked:
+        if len(top) == k:
+            break
+        top.append(entry)
+    return {"by": by, "order": order, "tickers": top}
+
+
+def route(path):
+    """Return (handler, extra arguments) for a request path."""
+    parts = [unquote(part) for part in path.strip('/').split('/') if part]
+    if parts == ["health"]:
+        return handle_health, ()
+    if parts == ["tickers"]:
+        return handle_tickers, ()
+    if parts == ["top"]:
+        return handle_top, ()
+    if len(parts) == 2 and parts[0] == "tickers":
+        return handle_ticker, (parts[1].upper(),)
+    if len(parts) == 3 and parts[0] == "tickers" and parts[2] == "articles":
+        return handle_articles, (parts[1].upper(),)
+    raise ApiError(404, f"Unknown path {path}")
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    store = None
+
+    def do_GET(self):
+        snapshot = self.store.snapshot
+        url = urlsplit(self.path)
+        # A response only depends on the snapshot and the request, so the pair is its ETag
+        etag = '"' + hashlib.sha1(f"{snapshot.version} {self.path}".encode()).hexdigest()[:24] + '"'
+        try:
+            handler, args = route(url.path)
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            body = handler(snapshot, parse_qs(url.query), *args)
+            status = 200
+        except ApiError as error:
+            body, status = {"error": str(error)}, error.status
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 200:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve per-ticker sentiment and price data as JSON from memory.")
+    parser.add_argument("--host", default=os.environ.get(HOST_ENV, DEFAULT_HOST))
+    parser.add_argument("--port", type=int, default=int(os.environ.get(PORT_ENV, DEFAULT_PORT)))
+    parser.add_argument("--data-dir", default=os.getcwd(), help="folder with the CSV files (default: current folder)")
+    parser.add_argument("--reload-interval", type=float,
+                        default=float(os.environ.get(RELOAD_INTERVAL_ENV, DEFAULT_RELOAD_INTERVAL)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    ReadApiHandler.store = DataStore(args.data_dir)
+    ReadApiHandler.store.watch(args.reload_interval)
+
+    server = ThreadingHTTPServer((args.host, args.port), ReadApiHandler)
+    logging.info(f"Read API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Read API stopped")
+
+
+if __name__ == "__main__":
+    profiler.enable_profiling("readapi")
+    main()
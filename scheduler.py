@@ -0,0 +1,336 @@
+import argparse
+import logging
+import os
+import runpy
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import fetcher
+import profiler
+from stages import GATHER_STAGES, topological_order
+
+# Cron-style schedule: "minute hour day-of-month month day-of-week job" entries separated by ';'
+SCHEDULE_ENV = "SCHEDULER_SCHEDULE"
+# Same times as the dashboard: gather at 4 AM, update at 7 AM and 9 AM
+DEFAULT_SCHEDULE = "0 4 * * * gather; 0 7,9 * * * update"
+
+# Lock file that keeps two jobs (or two schedulers) from touching the CSV files at once
+LOCK_FILE = "scheduler.lock"
+# The holder touches the lock file every LOCK_HEARTBEAT seconds, however long its job runs;
+# a lock not touched for this many seconds is assumed to belong to a crashed process
+LOCK_STALE_ENV = "SCHEDULER_LOCK_STALE"
+DEFAULT_LOCK_STALE = 15 * 60
+LOCK_HEARTBEAT = 60
+
+# Longest sleep between schedule checks, so clock changes are noticed
+MAX_SLEEP = 60
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Jobs run in this process share module state, so the gather stages run one at a time in dependency order
+GATHER_SCRIPTS = [stage.script for stage in topological_order(GATHER_STAGES)]
+
+# Allowed range of each cron field
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_field(field, low, high):
+    """Return the set of values matched by one cron field (*, lists, ranges and /steps)."""
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/', 1)
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high  # "5/15" means every 15 starting at 5
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Invalid cron field {field!r} (allowed {low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class Schedule:
+    """One cron entry: when it fires and which job it starts."""
+
+    def __init__(self, entry):
+        fields = entry.split()
+        if len(fields) != 6:
+            raise ValueError(f"Expected 'minute hour day month weekday job', got {entry!r}")
+        self.entry = entry
+        self.job = fields[5]
+        if self.job not in JOBS:
+            raise ValueError(f"Unknown job {self.job!r} in {entry!r} (choose from {', '.join(JOBS)})")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            parse_field(field, low, high) for field, (low, high) in zip(fields[:5], FIELD_RANGES)
+        )
+        # Cron counts Sunday as 0 or 7
+        self.weekdays = {day % 7 for day in weekdays}
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def matches_day(self, day):
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        # Like cron, a restricted day-of-month and day-of-week match if either does
+        if not self.any_day and not self.any_weekday:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_run(self, after):
+        """Return the first time after `after` (to the minute) at which this entry fires."""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for offset in range(366 * 5):
+            day = start.date() + timedelta(days=offset)
+            if not self.matches_day(day):
+                continue
+            for hour in sorted(self.hours):
+                for minute in sorted(self.minutes):
+                    candidate = datetime(day.year, day.month, day.day, hour, minute)
+                    if candidate >= start:
+                        return candidate
+        raise ValueError(f"Schedule {self.entry!r} never fires")
+
+
+def parse_schedule(text):
+    entries = [entry.strip() for entry in text.replace('\n', ';').split(';')]
+    return [Schedule(entry) for entry in entries if entry and not entry.startswith('#')]
+
+
+def lock_stale_after():
+    return int(os.environ.get(LOCK_STALE_ENV, DEFAULT_LOCK_STALE))
+
+
+def read_lock():
+    """(holder, seconds since the last heartbeat) of the lock file, or None if there is none."""
+    try:
+        with open(LOCK_FILE, 'r', encoding='utf-8') as lock_file:
+            holder = lock_file.read().strip()
+        return holder, time.time() - os.path.getmtime(LOCK_FILE)
+    except FileNotFoundError:
+        return None
+
+
+def remove_stale_lock(holder):
+    """Remove the lock file if it still holds `holder`; False if another process got to it first.
+
+    The file is renamed away rather than removed, so that of several processes
+    finding the same stale lock only one takes it, and a fresh lock written in
+    the meantime is put back instead of deleted.
+    """
+    stale_path = f"{LOCK_FILE}.{os.getpid()}.stale"
+    try:
+        os.replace(LOCK_FILE, stale_path)
+    except FileNotFoundError:
+        return False
+    with open(stale_path, 'r', encoding='utf-8') as stale_file:
+        taken = stale_file.read().strip()
+    if taken != holder:
+        # Another process replaced the stale lock with its own
+        try:
+            os.rename(stale_path, LOCK_FILE)
+        except OSError:
+            os.remove(stale_path)
+        return False
+    os.remove(stale_path)
+    return True
+
+
+def heartbeat(stop):
+    """Touch the lock file until `stop` is set, so a long job's lock does not look stale."""
+    while not stop.wait(LOCK_HEARTBEAT):
+        try:
+            os.utime(LOCK_FILE)
+        except FileNotFoundError:
+            logging.warning(f"Lock file {LOCK_FILE} disappeared while the job was running")
+            return
+
+
+@contextmanager
+def job_lock(job):
+    """Hold the lock file while a job runs; yields False if another job holds it."""
+    for _ in range(2):
+        try:
+            lock = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            current = read_lock()
+            if current is None:
+                continue
+            holder, age = current
+            if age < lock_stale_after():
+                logging.warning(f"Another job is running ({holder}), skipping {job}")
+                yield False
+                return
+            logging.warning(f"Removing stale lock file {LOCK_FILE} ({holder}, no heartbeat for {age / 60:.0f} minutes)")
+            if not remove_stale_lock(holder):
+                yield False
+                return
+    else:
+        yield False
+        return
+
+    os.write(lock, f"{job} pid {os.getpid()} since {datetime.now():%Y-%m-%d %H:%M:%S}".encode('utf-8'))
+    os.close(lock)
+    stop = threading.Event()
+    beat = threading.Thread(target=heartbeat, args=(stop,), name="lock-heartbeat", daemon=True)
+    beat.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        beat.join()
+        os.remove(LOCK_FILE)
+
+
+def run_script(script, *args):
+    """Run a pipeline script inside this process.
+
+    Modules the script imports (pandas, finvader, fetcher's HTTP session, the
+    scoring engines) stay loaded between runs, so only the script body is re-run.
+    """
+    path = os.path.join(SCRIPT_DIR, script)
+    saved_argv = sys.argv
+    sys.argv = [path, *args]
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as exit_status:
+        if exit_status.code not in (None, 0):
+            raise RuntimeError(f"{script} exited with status {exit_status.code}")
+    finally:
+        sys.argv = saved_argv
+
+
+def gather():
+    """Fetch all news, prices and sentiment from scratch (the dashboard's Gather Data)."""
+    for script in GATHER_SCRIPTS:
+        logging.info(f"Running {script}...")
+        try:
+            run_script(script)
+        except Exception:
+            logging.exception(f"Error running {script}")
+
+
+def update():
+    """Score only new articles and recompile (the dashboard's Update Data)."""
+    import update as update_script
+    update_script.main(runner=run_script)
+
+
+JOBS = {
+    "gather": gather,
+    "update": update,
+}
+
+
+def warm_up():
+    """Import the heavy modules and load the sentiment lexicon before the first job."""
+    started = time.perf_counter()
+    import pandas  # noqa: F401
+    import scoring
+    if scoring.scoring_engine() == "vector":
+        import vecsent
+        vecsent.get_scorer()
+    else:
+        scoring.analyze_sentiment("warm up")
+    # Jobs run next to the lock heartbeat thread; the chunk scoring processes are forked before it exists
+    scoring.start_chunk_workers()
+    logging.info(f"Warm-up finished in {time.perf_counter() - started:.1f}s")
+
+
+def run_job(job, due=None):
+    with job_lock(job) as acquired:
+        if not acquired:
+            return False
+        if due is not None and datetime.now() - due > timedelta(minutes=1):
+            logging.info(f"Starting {job} late (was due at {due:%H:%M}, the previous job overran)")
+        logging.info(f"Starting {job}")
+        fetcher.reset_stats()
+        started = time.perf_counter()
+        try:
+            JOBS[job]()
+        except Exception:
+            logging.exception(f"Job {job} failed")
+        logging.info(f"Finished {job} in {time.perf_counter() - started:.1f}s")
+        return True
+
+
+def serve(schedules):
+    """Run jobs on their schedules until interrupted.
+
+    Jobs run one at a time. A job that comes due while another one is running
+    starts as soon as that one finishes; missed runs are not repeated.
+    """
+    now = datetime.now()
+    next_runs = [schedule.next_run(now) for schedule in schedules]
+    for schedule, when in zip(schedules, next_runs):
+        logging.info(f"{schedule.job}: next run {when:%Y-%m-%d %H:%M} ({schedule.entry})")
+
+    while True:
+        now = datetime.now()
+        due = sorted((when, index) for index, when in enumerate(next_runs) if when <= now)
+        if not due:
+            wait = (min(next_runs) - now).total_seconds()
+            time.sleep(min(MAX_SLEEP, max(1, wait)))
+            continue
+
+        started_jobs = set()
+        for when, index in due:
+            job = schedules[index].job
+            # Two entries of the same job that came due together run it once
+            if job not in started_jobs:
+                run_job(job, when)
+                started_jobs.add(job)
+            next_runs[index] = schedules[index].next_run(datetime.now())
+            logging.info(f"{job}: next run {next_runs[index]:%Y-%m-%d %H:%M}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the gather and update jobs on a schedule without the dashboard.")
+    parser.add_argument("--run-now", choices=sorted(JOBS), help="run one job immediately and exit")
+    parser.add_argument("--list", action="store_true", help="print the next run time of each schedule entry and exit")
+    parser.add_argument("--schedule", default=os.environ.get(SCHEDULE_ENV, DEFAULT_SCHEDULE),
+                        help=f"cron-style schedule (default from {SCHEDULE_ENV}: {DEFAULT_SCHEDULE!r})")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Every script would start its own profiler inside this process; profile the scripts directly instead
+    if profiler.profiling_requested():
+        logging.warning(f"Profiling is not supported in service mode, ignoring {profiler.PROFILE_ENV}")
+        os.environ.pop(profiler.PROFILE_ENV, None)
+
+    try:
+        schedules = parse_schedule(args.schedule)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.list:
+        now = datetime.now()
+        for schedule in schedules:
+            print(f"{schedule.next_run(now):%Y-%m-%d %H:%M}  {schedule.job}  ({schedule.entry})")
+        return
+
+    warm_up()
+    if args.run_now:
+        run_job(args.run_now)
+        return
+
+    try:
+        serve(schedules)
+    except KeyboardInterrupt:
+        logging.info("Scheduler stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import pandas as pd
+
+# pyarrow's multi-threaded CSV reader is several times faster than the C parser; it is optional
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Default locations of the datasets, relative to the data folder
+NEWS_PATH = "news_with_sentiment.csv"
+PRICES_PATH = "export.csv"
+SUMMARY_PATH = "average_sentiment_per_ticker.csv"
+
+# Finviz writes news dates as "2024-01-31 16:05:00"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# news_with_sentiment.csv: repeated labels become categories, scores fit in float32
+NEWS_DTYPES = {
+    "Title": "str",
+    "Source": "category",
+    "Url": "str",
+    "Category": "category",
+    "Ticker": "category",
+    "Title_Sentiment": "float32",
+    "Content_Sentiment": "float32",
+    "Combined_Sentiment": "float32",
+}
+NEWS_DATES = ["Date"]
+
+# export.csv: one row per ticker from the Finviz export
+PRICE_DTYPES = {
+    "Ticker": "category",
+    "Company": "str",
+    "Sector": "category",
+    "Industry": "category",
+    "Country": "category",
+}
+# Parsed with pd.to_numeric; Finviz uses "-" for missing values and "%" on Change
+PRICE_NUMERIC = {
+    "No.": "float64",
+    "Market Cap": "float64",
+    "P/E": "float64",
+    "Price": "float64",
+    "Change": "float64",
+    "Volume": "float64",
+}
+
+# average_sentiment_per_ticker.csv from compilesent.py
+SUMMARY_DTYPES = {
+    "Ticker": "category",
+    "Combined_Sentiment": "float32",
+    "Provisional": "int32",
+}
+
+
+def parse_dates(series):
+    """Parse Finviz dates, falling back to format inference for anything else."""
+    parsed = pd.to_datetime(series, format=DATE_FORMAT, errors='coerce')
+    if parsed.isna().sum() > series.isna().sum():
+        parsed = pd.to_datetime(series, errors='coerce')
+    return parsed
+
+
+def parse_numeric(series, dtype):
+    """Turn values like '1.25%', '-' or '1,234' into numbers (NaN when unparseable)."""
+    if series.dtype.kind not in 'iuf':
+        series = series.astype('str').str.replace(r'[%,]', '', regex=True)
+    return pd.to_numeric(series, errors='coerce').astype(dtype)
+
+
+def read_typed_csv(path, dtypes, columns=None, dates=(), numeric=None):
+    """Read a CSV with explicit dtypes, keeping only `columns` (all columns if None).
+
+    Requested columns that the file does not have are left out, so callers can keep
+    their own checks for missing columns.
+    """
+    numeric = numeric or {}
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [column for column in header if columns is None or column in columns]
+    parser_dtypes = {column: dtype for column, dtype in dtypes.items() if column in usecols}
+    # Numeric columns are read as text and converted afterwards, since they may hold '%' or '-'
+    parser_dtypes.update({column: 'str' for column in numeric if column in usecols})
+
+    try:
+        frame = pd.read_csv(path, usecols=usecols, dtype=parser_dtypes, engine=CSV_ENGINE)
+    except ValueError:
+        # pyarrow rejects some malformed files the C parser accepts
+        if CSV_ENGINE == "c":
+            raise
+        frame = pd.read_csv(path, usecols=usecols, dtype=parser_dtypes, engine="c")
+    for column in dates:
+        if column in frame.columns:
+            frame[column] = parse_dates(frame[column])
+    for column, dtype in numeric.items():
+        if column in frame.columns:
+            frame[column] = parse_numeric(frame[column], dtype)
+    return frame
+
+
+def load_news(path=NEWS_PATH, columns=None):
+    """Load news_with_sentiment.csv (or news.csv / update.csv) with compact dtypes."""
+    return read_typed_csv(path, NEWS_DTYPES, columns, dates=NEWS_DATES)
+
+
+def load_prices(path=PRICES_PATH, columns=None):
+    """Load export.csv with numeric Change (percent), Price, Volume, P/E and Market Cap."""
+    return read_typed_csv(path, PRICE_DTYPES, columns, numeric=PRICE_NUMERIC)
+
+
+def load_summary(path=SUMMARY_PATH, columns=None):
+    """Load average_sentiment_per_ticker.csv."""
+    return read_typed_csv(path, SUMMARY_DTYPES, columns)
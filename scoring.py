@@ -0,0 +1,208 @@
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from lexicon import analyzer
+
+# Scoring engine: "finvader" scores one text per finvader call, "vector" scores
+# whole batches with the NumPy scorer in vecsent.py
+ENGINE_ENV = "SENTIMENT_ENGINE"
+DEFAULT_ENGINE = "finvader"
+
+# Content scoring mode: "off" scores the whole body in one call (the original behaviour),
+# "sentence" or "paragraph" split the body into chunks first
+CHUNK_MODE_ENV = "SENTIMENT_CHUNK_MODE"
+# Maximum characters per chunk
+CHUNK_CHARS_ENV = "SENTIMENT_CHUNK_CHARS"
+# Maximum characters scored per body; chunks past the budget are dropped
+CHUNK_BUDGET_ENV = "SENTIMENT_CHUNK_BUDGET"
+# Number of worker processes used to score the chunks of one body
+CHUNK_WORKERS_ENV = "SENTIMENT_CHUNK_WORKERS"
+
+DEFAULT_CHUNK_MODE = "off"
+DEFAULT_CHUNK_CHARS = 5000
+DEFAULT_CHUNK_BUDGET = 25000
+DEFAULT_CHUNK_WORKERS = 1
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_BOUNDARY = re.compile(r'\s*\n\s*')
+
+_executor = None
+
+
+# Function to analyze sentiment of text; same compound score as finvader(text, use_sentibignomics=True,
+# use_henry=True, indicator='compound') without rebuilding the lexicon on every call
+def analyze_sentiment(text: str) -> float:
+    return analyzer().polarity_scores(text)['compound']
+
+
+def combine_sentiments(title_sentiment, content_sentiment):
+    """Weight the title at 30% and the body at 70%; None if either score is missing."""
+    if title_sentiment is not None and content_sentiment is not None:
+        return (0.3 * title_sentiment) + (0.7 * content_sentiment)
+    return None
+
+
+def scoring_engine():
+    """Return the scoring engine selected in the environment."""
+    engine = os.environ.get(ENGINE_ENV, DEFAULT_ENGINE).lower()
+    if engine not in ("finvader", "vector"):
+        logging.warning(f"Unknown {ENGINE_ENV} '{engine}', using finvader")
+        engine = "finvader"
+    return engine
+
+
+def chunk_settings():
+    """Read the chunked scoring settings from the environment."""
+    mode = os.environ.get(CHUNK_MODE_ENV, DEFAULT_CHUNK_MODE).lower()
+    if mode not in ("off", "sentence", "paragraph"):
+        logging.warning(f"Unknown {CHUNK_MODE_ENV} '{mode}', scoring whole text")
+        mode = "off"
+    max_chars = int(os.environ.get(CHUNK_CHARS_ENV, DEFAULT_CHUNK_CHARS))
+    budget = int(os.environ.get(CHUNK_BUDGET_ENV, DEFAULT_CHUNK_BUDGET))
+    workers = int(os.environ.get(CHUNK_WORKERS_ENV, DEFAULT_CHUNK_WORKERS))
+    return mode, max_chars, budget, workers
+
+
+def split_units(text, mode):
+    """Split text into sentences or paragraphs, dropping empty pieces."""
+    pattern = PARAGRAPH_BOUNDARY if mode == "paragraph" else SENTENCE_BOUNDARY
+    return [unit.strip() for unit in pattern.split(text) if unit.strip()]
+
+
+def split_into_chunks(text, mode="sentence", max_chars=DEFAULT_CHUNK_CHARS):
+    """Pack consecutive sentences or paragraphs into chunks of at most max_chars characters."""
+    chunks = []
+    current = []
+    current_len = 0
+    for unit in split_units(text, mode):
+        # A single unit longer than the limit is cut at word boundaries
+        while len(unit) > max_chars:
+            cut = unit.rfind(' ', 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                chunks.append(' '.join(current))
+                current, current_len = [], 0
+            chunks.append(unit[:cut])
+            unit = unit[cut:].strip()
+        if not unit:
+            continue
+        if current and current_len + len(unit) + 1 > max_chars:
+            chunks.append(' '.join(current))
+            current, current_len = [], 0
+        current.append(unit)
+        current_len += len(unit) + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+def apply_budget(chunks, budget):
+    """Keep chunks from the start of the article until the character budget is used up."""
+    kept = []
+    used = 0
+    for chunk in chunks:
+        if kept and used + len(chunk) > budget:
+            break
+        kept.append(chunk)
+        used += len(chunk)
+    return kept
+
+
+def get_executor(workers):
+    """Return a shared process pool, or None when parallel scoring is not available."""
+    global _executor
+    if workers <= 1:
+        return None
+    if _executor is None:
+        # The pipeline scripts run their work at import time, so worker processes must be
+        # forked rather than spawned (spawning would re-run the calling script)
+        if "fork" not in multiprocessing.get_all_start_methods():
+            logging.warning("Parallel chunk scoring needs the 'fork' start method, scoring serially")
+            return None
+        # A child forked while other threads run can inherit a lock one of them held
+        # (logging, connection pools) and hang on it; see start_chunk_workers()
+        if threading.active_count() > 1:
+            logging.warning("Chunk scoring processes were not started before other threads, scoring serially")
+            return None
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        # With fork, the first task starts every worker process at once
+        _executor.submit(int).result()
+    return _executor
+
+
+def start_chunk_workers():
+    """Fork the chunk scoring processes now if bodies are scored in parallel chunks.
+
+    Scripts call this before they start download or pipeline threads.
+    """
+    mode, _, _, workers = chunk_settings()
+    if mode == "off" or scoring_engine() == "vector":
+        return None
+    return get_executor(workers)
+
+
+def length_weighted(scores, chunks):
+    """Combine chunk scores into one score, weighting each chunk by its length."""
+    total = sum(len(chunk) for chunk in chunks)
+    return sum(score * len(chunk) for score, chunk in zip(scores, chunks)) / total
+
+
+def score_chunked(text, mode="sentence", max_chars=DEFAULT_CHUNK_CHARS, budget=DEFAULT_CHUNK_BUDGET, workers=1, score_fn=analyze_sentiment):
+    """Score text chunk by chunk and combine the chunk scores weighted by chunk length."""
+    chunks = apply_budget(split_into_chunks(text, mode, max_chars), budget)
+    if not chunks:
+        return 0.0
+    if len(chunks) == 1:
+        return score_fn(chunks[0])
+
+    executor = get_executor(workers)
+    if executor is not None:
+        scores = list(executor.map(score_fn, chunks))
+    else:
+        scores = [score_fn(chunk) for chunk in chunks]
+    return length_weighted(scores, chunks)
+
+
+def score_texts(texts, score_fn=analyze_sentiment):
+    """Score a list of texts with the configured engine; missing or empty texts get None."""
+    present = [isinstance(text, str) and bool(text) for text in texts]
+    if scoring_engine() == "vector":
+        import vecsent
+        batch = iter(vecsent.score_batch([text for text, ok in zip(texts, present) if ok]))
+        return [next(batch) if ok else None for ok in present]
+    return [score_fn(text) if ok else None for text, ok in zip(texts, present)]
+
+
+def score_contents(texts, score_fn=analyze_sentiment):
+    """Score article bodies using the engine and chunking mode configured in the environment."""
+    mode, max_chars, budget, workers = chunk_settings()
+    if mode == "off":
+        return score_texts(texts, score_fn)
+
+    if scoring_engine() != "vector":
+        return [score_chunked(text, mode, max_chars, budget, workers, score_fn) if isinstance(text, str) and text else None
+                for text in texts]
+
+    # With the vector engine the chunks of every body are scored in a single batch
+    doc_chunks = [apply_budget(split_into_chunks(text, mode, max_chars), budget) if isinstance(text, str) and text else None
+                  for text in texts]
+    import vecsent
+    flat_scores = iter(vecsent.score_batch([chunk for chunks in doc_chunks if chunks for chunk in chunks]))
+    results = []
+    for chunks in doc_chunks:
+        if chunks is None:
+            results.append(None)
+        elif not chunks:
+            results.append(0.0)
+        else:
+            results.append(length_weighted([next(flat_scores) for _ in chunks], chunks))
+    return results
+
+
+def score_content(text, score_fn=analyze_sentiment):
+    """Score a single article body using the configured engine and chunking mode."""
+    return score_contents([text], score_fn)[0]
@@ -1,159 +1,276 @@
-import pandas as pd
-import os
-import requests
-from bs4 import BeautifulSoup
-from finvader import finvader
-import time
-import random
-import logging
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-
-# Get the current working directory
-current_dir = os.getcwd()
-
-# Define the input and output directories as the current working directory
-input_dir = current_dir
-output_dir = current_dir
-
-# Create the output directory if it doesn't exist (optional, since current_dir should always exist)
-os.makedirs(output_dir, exist_ok=True)
-
-# List of user agents for rotation
-user_agents = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-]
-
-# Function to analyze sentiment of text
-def analyze_sentiment(text: str) -> float:
-    sentiment_result = finvader(text, use_sentibignomics=True, use_henry=True, indicator='compound')
-    return sentiment_result.get('compound', 0.0) if isinstance(sentiment_result, dict) else (sentiment_result if isinstance(sentiment_result, float) else 0.0)
-
-# Function to fetch article content from a URL with error handling and retry logic
-def fetch_article_content(url: str, retries: int = 3) -> str:
-    headers = {
-        'User-Agent': random.choice(user_agents),
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Connection': 'keep-alive'
-    }
-    
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=30)  # Increased timeout to 30 seconds
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                paragraphs = soup.find_all('p')
-                article_text = ' '.join([para.get_text() for para in paragraphs])
-                return article_text
-            else:
-                logging.warning(f"Failed to fetch article from {url}: {response.status_code}")
-                return ""
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching article from {url}, attempt {attempt + 1}: {e}")
-            time.sleep(2 ** attempt)  # Exponential backoff before retrying
-    logging.error(f"All retries exhausted for URL: {url}")
-    return ""  # Return empty string if all retries fail
-
-# Only process news.csv
-input_file_path = os.path.join(input_dir, 'news.csv')
-output_file_path = os.path.join(output_dir, 'news_with_sentiment.csv')
-
-# Load the input CSV file
-try:
-    news_df = pd.read_csv(input_file_path)
-except pd.errors.EmptyDataError:
-    logging.warning(f"Skipping empty file: {input_file_path}")
-    exit()
-except FileNotFoundError:
-    logging.error(f"File not found: {input_file_path}")
-    exit()
-
-# Check for required columns
-required_columns = ['Url', 'Title']
-missing_columns = [col for col in required_columns if col not in news_df.columns]
-
-if missing_columns:
-    logging.error(f"Missing columns {missing_columns} in news.csv")
-else:
-    title_sentiments = []
-    content_sentiments = []
-    combined_sentiments = []
-    
-    # Dictionary to store processed URLs and their sentiment scores
-    processed_urls = {}
-
-    # First pass to process all URLs
-    for index, row in news_df.iterrows():
-        url = row['Url']
-        title = row['Title']
-        logging.info(f"Processing URL: {url}")
-
-        # Fetch the content and analyze sentiment
-        content = fetch_article_content(url)
-
-        # Analyze sentiment
-        title_sentiment = analyze_sentiment(title) if title else None
-        content_sentiment = analyze_sentiment(content) if content else None
-
-        # Store results
-        combined_sentiment = None
-        if title_sentiment is not None and content_sentiment is not None:
-            combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
-
-        processed_urls[url] = (title_sentiment, content_sentiment, combined_sentiment)
-
-        # Append the sentiments to the lists
-        title_sentiments.append(title_sentiment if title_sentiment is not None else 0.0)
-        content_sentiments.append(content_sentiment if content_sentiment is not None else 0.0)
-        combined_sentiments.append(combined_sentiment if combined_sentiment is not None else 0.0)
-
-        time.sleep(1)  # Optional delay to avoid overwhelming the server
-
-    # Retry for URLs with empty sentiments
-    for index, row in news_df.iterrows():
-        url = row['Url']
-        logging.info(f"Retrying empty sentiment for URL: {url}")
-
-        # Check if the combined sentiment is empty
-        if processed_urls[url][2] is None:
-            # Retry fetching content for empty sentiment
-            content = fetch_article_content(url)
-            content_sentiment = analyze_sentiment(content) if content else 0.0
-
-            # Use existing title sentiment
-            title_sentiment = processed_urls[url][0]
-
-            # Recalculate combined sentiment
-            if title_sentiment is not None and content_sentiment is not None:
-                combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
-            else:
-                combined_sentiment = None
-
-            # Update the processed URLs dictionary
-            processed_urls[url] = (title_sentiment, content_sentiment, combined_sentiment)
-
-            # Append the sentiments to the lists again
-            title_sentiments[index] = title_sentiment if title_sentiment is not None else 0.0
-            content_sentiments[index] = content_sentiment if content_sentiment is not None else 0.0
-            combined_sentiments[index] = combined_sentiment if combined_sentiment is not None else 0.0
-
-            time.sleep(1)  # Optional delay to avoid overwhelming the server
-
-    # Append sentiment results to DataFrame
-    news_df['Title_Sentiment'] = title_sentiments
-    news_df['Content_Sentiment'] = content_sentiments
-    news_df['Combined_Sentiment'] = combined_sentiments
-
-    # Clear the output file before writing new data
-    if os.path.isfile(output_file_path):
-        os.remove(output_file_path)
-        logging.info(f"Existing file cleared: {output_file_path}")
-
-    # Write results to output CSV
-    logging.info(f"Writing new data to: {output_file_path}")
-    news_df.to_csv(output_file_path, index=False)
-
-logging.info("All sentiment analyses have been completed and saved.")
+import csv
+import os
+import time
+import logging
+import profiler
+from archive import refresh_archive
+from articles import consecutive_groups, group_rows
+from checkpoint import (
+    SENTIMENT_COLUMNS,
+    CheckpointWriter,
+    SideFile,
+    checkpoint_path,
+    finalize_checkpoint,
+    load_completed_rows,
+    resume_requested,
+    retry_path,
+    skipped_path,
+)
+from fetcher import fetch_article_content, log_stats
+from neardup import NearDuplicateIndex, content_hash, near_duplicates_enabled
+from pipeline import bounded, micro_batches, ordered_map
+from progress import Progress
+from priority import Budget, prioritize, priority_enabled, ticker_importance
+from provisional import provisional_enabled, write_provisional
+from scoring import (
+    analyze_sentiment,
+    combine_sentiments,
+    score_content,
+    score_contents,
+    score_texts,
+    start_chunk_workers,
+)
+
+# Forked while this process has a single thread, before the profiler and the pipeline start theirs
+start_chunk_workers()
+profiler.enable_profiling("sentiment")
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+
+# Get the current working directory
+current_dir = os.getcwd()
+
+# Define the input and output directories as the current working directory
+input_dir = current_dir
+output_dir = current_dir
+
+# Create the output directory if it doesn't exist (optional, since current_dir should always exist)
+os.makedirs(output_dir, exist_ok=True)
+
+# Only process news.csv
+input_file_path = os.path.join(input_dir, 'news.csv')
+output_file_path = os.path.join(output_dir, 'news_with_sentiment.csv')
+
+# Marks an article whose download was not started because the run's budget was used up
+BUDGET_SPENT = object()
+
+# Stage settings for the streaming pipeline
+fetch_workers = int(os.environ.get("SENTIMENT_FETCH_WORKERS", 1))  # Parallel article downloads
+buffer_size = int(os.environ.get("SENTIMENT_BUFFER", 32))  # Maximum rows waiting between two stages
+score_batch_size = int(os.environ.get("SENTIMENT_SCORE_BATCH", 64))  # Maximum articles scored together
+
+# Read the header of the input CSV file; the rows themselves are streamed
+try:
+    with open(input_file_path, 'r', newline='', encoding='utf-8') as news_file:
+        fieldnames = csv.DictReader(news_file).fieldnames
+except FileNotFoundError:
+    logging.error(f"File not found: {input_file_path}")
+    exit()
+if not fieldnames:
+    logging.warning(f"Skipping empty file: {input_file_path}")
+    exit()
+
+# Check for required columns
+required_columns = ['Url', 'Title']
+missing_columns = [col for col in required_columns if col not in fieldnames]
+
+if missing_columns:
+    logging.error(f"Missing columns {missing_columns} in news.csv")
+else:
+    output_fieldnames = fieldnames + [col for col in SENTIMENT_COLUMNS if col not in fieldnames]
+
+    # Finished rows are appended to a checkpoint file as soon as they are scored,
+    # so a crash only loses unfinished rows
+    checkpoint_file_path = checkpoint_path(output_file_path)
+    completed_rows = set()
+    if resume_requested():
+        completed_rows = load_completed_rows(checkpoint_file_path, output_fieldnames)
+        if completed_rows is None:
+            logging.warning(f"Checkpoint has different columns and cannot be resumed: {checkpoint_file_path}")
+            os.remove(checkpoint_file_path)
+            completed_rows = set()
+        logging.info(f"Resuming from checkpoint: {len(completed_rows)} rows already scored")
+    elif os.path.exists(checkpoint_file_path):
+        logging.info(f"Discarding old checkpoint (use --resume to continue it): {checkpoint_file_path}")
+        os.remove(checkpoint_file_path)
+    checkpoint = CheckpointWriter(checkpoint_file_path, output_fieldnames)
+
+    # Rows to score, for the dashboard's progress line (a quick pass without fetching anything)
+    with open(input_file_path, 'r', newline='', encoding='utf-8') as news_file:
+        row_count = sum(1 for _ in csv.DictReader(news_file))
+    progress = Progress("sentiment.py", row_count - len(completed_rows))
+
+    def output_record(record, sentiments):
+        scores = {col: value if value is not None else 0.0 for col, value in zip(SENTIMENT_COLUMNS, sentiments)}
+        return {**record, **scores}
+
+    # With a priority order (or a budget) the most important tickers and newest articles go first
+    budget = Budget.from_environment()
+    use_priority = priority_enabled()
+    if budget.limited():
+        logging.info(f"Budget for this run: {budget.describe()}")
+    # Rows left over when the budget runs out; they stay out of news_with_sentiment.csv and wait in a side file
+    skipped_articles = SideFile(skipped_path(output_file_path), fieldnames)
+
+    # Copies of articles scored before reuse their content score (see neardup.py)
+    near_duplicates = NearDuplicateIndex.load() if near_duplicates_enabled() else None
+    # Articles whose copy was being downloaded when they were read
+    waiting_articles = []
+
+    def article_identity(group):
+        """Title, tickers and date of an article, as the near-duplicate index compares them."""
+        record = group[0][1]
+        return record['Title'], {row.get('Ticker', '') for _, row in group}, record.get('Date')
+
+    def remember(group, body_hash, content_sentiment):
+        if near_duplicates is not None:
+            near_duplicates.add(group[0][1], article_identity(group)[1], body_hash, content_sentiment)
+
+    def read_articles():
+        """Yield the articles of news.csv that still need scoring as (group, index entry).
+
+        The group lists the (row number, record) of the article's rows; news.csv has
+        one row per ticker of an article and they share one download and one score.
+        The index entry is the scored article with the same title, or None.
+        """
+        with open(input_file_path, 'r', newline='', encoding='utf-8') as news_file:
+            rows = ((index, record) for index, record in enumerate(csv.DictReader(news_file))
+                    if (index, record['Url']) not in completed_rows)
+            if use_priority:
+                # An article goes at the position of its most important ticker
+                groups = group_rows(prioritize(list(rows), ticker_importance()))
+            else:
+                groups = consecutive_groups(rows)
+            for group in groups:
+                if near_duplicates is not None:
+                    entry = near_duplicates.match_title(*article_identity(group))
+                    if entry is not None:
+                        yield group, entry
+                        continue
+                    if not near_duplicates.start(*article_identity(group)):
+                        waiting_articles.append(group)
+                        continue
+                yield group, None
+
+    def fetch_article(article):
+        group, entry = article
+        # A copy found by title is not downloaded; it takes the entry's content score
+        if entry is not None:
+            return group, entry
+        if not budget.take():
+            return group, BUDGET_SPENT
+        url = group[0][1]['Url']
+        logging.info(f"Processing URL: {url}")
+
+        # Fetch the content
+        content = fetch_article_content(url)
+
+        time.sleep(1)  # Optional delay to avoid overwhelming the server
+        return group, content
+
+    def score_articles(batches):
+        """Analyze sentiment of each batch's titles and bodies (SENTIMENT_ENGINE selects the scorer)."""
+        for batch in batches:
+            for group, _ in [article for article in batch if article[1] is BUDGET_SPENT]:
+                yield group, None
+            batch = [article for article in batch if article[1] is not BUDGET_SPENT]
+            if not batch:
+                continue
+            title_results = score_texts([group[0][1]['Title'] for group, _ in batch], analyze_sentiment)
+            # Only downloaded bodies are scored; title copies carry their index entry instead
+            downloaded = [position for position, (_, content) in enumerate(batch) if not isinstance(content, dict)]
+            contents = [batch[position][1] for position in downloaded]
+            if near_duplicates is not None:
+                content_results, body_hashes = near_duplicates.score_contents(contents, analyze_sentiment)
+            else:
+                content_results, body_hashes = score_contents(contents, analyze_sentiment), [None] * len(contents)
+            body_scores = dict(zip(downloaded, zip(content_results, body_hashes)))
+            for position, ((group, content), title_sentiment) in enumerate(zip(batch, title_results)):
+                if isinstance(content, dict):
+                    content_sentiment = content['Content_Sentiment']
+                else:
+                    content_sentiment, body_hash = body_scores[position]
+                    remember(group, body_hash, content_sentiment)
+                yield group, (title_sentiment, content_sentiment, combine_sentiments(title_sentiment, content_sentiment))
+
+    def write_group(group, sentiments):
+        for index, record in group:
+            checkpoint.write(index, output_record(record, sentiments))
+        progress.advance(len(group))
+
+    def skip_group(group):
+        skipped_articles.add(group)
+        progress.advance(len(group))
+        if near_duplicates is not None:
+            near_duplicates.finish(*article_identity(group))
+
+    # Articles without a body are retried once the first pass is done; they wait in a side file
+    retry_articles = SideFile(retry_path(output_file_path), fieldnames)
+
+    def collect(scored):
+        for group, sentiments in scored:
+            if sentiments is None:
+                skip_group(group)
+            elif sentiments[2] is None:
+                retry_articles.add(group, sentiments[0])
+                # Similar titles need not wait for the retry pass
+                if near_duplicates is not None:
+                    near_duplicates.finish(*article_identity(group))
+            else:
+                write_group(group, sentiments)
+
+    # read -> fetch -> score -> write, with at most buffer_size articles queued between stages
+    articles = bounded(read_articles(), buffer_size)
+    fetched = ordered_map(fetch_article, articles, fetch_workers, buffer_size)
+    collect(score_articles(micro_batches(fetched, score_batch_size, buffer_size)))
+
+    # Articles that waited for a copy take its scores now, or are downloaded after all
+    if waiting_articles:
+        waited = ((group, near_duplicates.match_title(*article_identity(group))) for group in waiting_articles)
+        fetched = ordered_map(fetch_article, waited, fetch_workers, buffer_size)
+        collect(score_articles(micro_batches(fetched, score_batch_size, buffer_size)))
+
+    # Retry for URLs with empty sentiments
+    for group, title_sentiment in retry_articles.groups():
+        if not budget.take():
+            skip_group(group)
+            continue
+        url = group[0][1]['Url']
+        logging.info(f"Retrying empty sentiment for URL: {url}")
+
+        # Retry fetching content for empty sentiment
+        content = fetch_article_content(url)
+        content_sentiment = score_content(content, analyze_sentiment) if content else 0.0
+
+        # Use existing title sentiment and recalculate combined sentiment
+        sentiments = (title_sentiment, content_sentiment, combine_sentiments(title_sentiment, content_sentiment))
+        write_group(group, sentiments)
+        remember(group, content_hash(content), content_sentiment if content else None)
+
+        time.sleep(1)  # Optional delay to avoid overwhelming the server
+
+    checkpoint.close()
+
+    # Publish the results, replacing the old output file in a single rename
+    logging.info(f"Writing new data to: {output_file_path}")
+    finalize_checkpoint(checkpoint_file_path, output_file_path, sort_rows=use_priority)
+    refresh_archive(output_file_path)
+    progress.finish()
+
+    if near_duplicates is not None:
+        near_duplicates.save()
+        logging.info(near_duplicates.summary())
+
+    if skipped_articles.rows:
+        # The next update.py run scores them; until then they count with their title score
+        logging.info(f"Budget used up: {skipped_articles.rows} rows left for the next update")
+    if skipped_articles.rows and provisional_enabled():
+        # Read back once the pipeline is done, in news.csv order (priority and retries set them aside out of order)
+        skipped_rows = sorted((row for group, _ in skipped_articles.groups() for row in group), key=lambda row: row[0])
+        write_provisional([record for _, record in skipped_rows], output_file_path)
+    else:
+        skipped_articles.remove()
+
+log_stats()
+logging.info("All sentiment analyses have been completed and saved.")
@@ -0,0 +1,186 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from schema import PRICES_PATH, SUMMARY_PATH, load_prices, load_summary
+
+# pyarrow is optional; without it readers keep parsing the CSVs
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Folder holding the published versions and the CURRENT pointer
+SNAPSHOT_ENV = "DASHBOARD_SNAPSHOT"
+DEFAULT_SNAPSHOT = "snapshot"
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+# Older versions are kept for readers that still have them mapped
+KEEP_VERSIONS = 3
+
+# Tables in a snapshot: name -> (source CSV, schema loader)
+TABLES = {
+    "summary": (SUMMARY_PATH, load_summary),
+    "prices": (PRICES_PATH, load_prices),
+}
+
+
+def snapshot_path():
+    return os.environ.get(SNAPSHOT_ENV, DEFAULT_SNAPSHOT)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as pointer:
+            return pointer.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_table(frame, path):
+    # Uncompressed IPC file format, so readers can map the buffers directly
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return table.num_rows
+
+
+def publish_snapshot(root=None):
+    """Parse the dashboard CSVs once and publish them as a new immutable Arrow version.
+
+    The version is built in its own folder, then the CURRENT pointer is replaced in one
+    rename, so readers see either the old or the new version, never a mix.
+    """
+    if pa is None:
+        return None
+    root = root or snapshot_path()
+    version = f"v{time.time_ns()}"
+    building = os.path.join(root, f"{version}.building")
+    os.makedirs(building)
+
+    manifest = {"version": version, "tables": {}}
+    for name, (source, loader) in TABLES.items():
+        try:
+            # Taken before reading, so a CSV rewritten meanwhile is seen as newer than the snapshot
+            signature = file_signature(source)
+            frame = loader(source)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            continue
+        rows = write_table(frame, os.path.join(building, f"{name}.arrow"))
+        manifest["tables"][name] = {"source": source, "signature": signature, "rows": rows}
+    with open(os.path.join(building, MANIFEST_FILE), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    os.rename(building, os.path.join(root, version))
+    pointer = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(pointer, 'w', encoding='utf-8') as pointer_file:
+        pointer_file.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    prune_versions(root, version)
+    logging.info(f"Published snapshot {version} ({', '.join(manifest['tables']) or 'no tables'})")
+    return version
+
+
+def prune_versions(root, current):
+    versions = sorted(name for name in os.listdir(root) if name.startswith('v') and not name.endswith('.building'))
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != current:
+            # Fails on Windows while a reader still maps the files; it is retried on the next publish
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class SnapshotReader:
+    """Memory-maps the current snapshot and remaps it when a newer version is published.
+
+    Processes mapping the same version share its pages, and nothing is parsed again
+    until the version changes. A table whose CSV changed after publishing (or that
+    the snapshot lacks) is loaded from the CSV instead.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or snapshot_path()
+        self.version = None
+        self.manifest = {"tables": {}}
+        self.tables = {}
+
+    def refresh(self):
+        """Map the published version if it changed; returns True when a new one was mapped."""
+        if pa is None:
+            return False
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+        folder = os.path.join(self.root, version)
+        try:
+            with open(os.path.join(folder, MANIFEST_FILE), 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+            tables = {name: pa.ipc.open_file(pa.memory_map(os.path.join(folder, f"{name}.arrow"))).read_all()
+                      for name in manifest["tables"]}
+        except FileNotFoundError:
+            # Pruned after a newer version was published; the next refresh maps that one
+            return False
+        self.version, self.manifest, self.tables = version, manifest, tables
+        return True
+
+    def table(self, name):
+        """The mapped Arrow table, or None if it is missing or older than its CSV."""
+        self.refresh()
+        entry = self.manifest["tables"].get(name)
+        if entry is None:
+            return None
+        try:
+            if file_signature(entry["source"]) != entry["signature"]:
+                return None
+        except FileNotFoundError:
+            return None
+        return self.tables[name]
+
+    def frame(self, name, columns=None):
+        """Same result as the table's schema loader, taken from the snapshot when it is current."""
+        table = self.table(name)
+        if table is None:
+            source, loader = TABLES[name]
+            return loader(source, columns=columns)
+        if columns is not None:
+            table = table.select([column for column in table.column_names if column in columns])
+        # split_blocks keeps numeric columns as views on the mapped buffers instead of consolidating them
+        return table.to_pandas(split_blocks=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arrow snapshot of the dashboard data shared by main.py and plotone.py.")
+    parser.add_argument("command", choices=["publish", "info"])
+    parser.add_argument("--snapshot", default=snapshot_path())
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if pa is None:
+        print("pyarrow is not installed; the dashboard reads the CSVs directly.")
+        return
+    if args.command == "publish":
+        publish_snapshot(args.snapshot)
+        return
+
+    reader = SnapshotReader(args.snapshot)
+    if not reader.refresh():
+        print(f"No snapshot in {args.snapshot}; publish one with: python snapshot.py publish")
+        return
+    print(f"{args.snapshot}: version {reader.version}")
+    for name, entry in reader.manifest["tables"].items():
+        state = "current" if reader.table(name) is not None else f"stale, {entry['source']} changed"
+        print(f"  {name}: {entry['rows']} rows from {entry['source']} ({state})")
+
+
+if __name__ == "__main__":
+    main()
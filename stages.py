@@ -0,0 +1,189 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Most stages running at the same time
+WORKERS_ENV = "GATHER_WORKERS"
+DEFAULT_WORKERS = 2
+
+
+class Stage:
+    """A pipeline script, the stages it has to wait for and the shared resources it uses."""
+
+    def __init__(self, script, after=(), resources=()):
+        self.script = script
+        self.after = tuple(after)
+        self.resources = tuple(resources)
+
+
+# Gather Data: price.py and sentiment.py only read export.py's news.csv, so they run side by side.
+# provisional.py publishes title-only scores with the new prices while sentiment.py is still fetching bodies.
+# compilesent.py also publishes export.csv in the dashboard snapshot, so it waits for all of them.
+GATHER_STAGES = [
+    Stage("export.py", resources=["finviz"]),
+    Stage("price.py", after=["export.py"], resources=["finviz"]),
+    Stage("provisional.py", after=["export.py", "price.py"]),
+    Stage("sentiment.py", after=["export.py"]),
+    Stage("compilesent.py", after=["price.py", "provisional.py", "sentiment.py"]),
+]
+
+# How many running stages may use each resource at once; the Finviz export token is rate limited
+RESOURCE_LIMITS = {"finviz": 1}
+
+
+class StageResult:
+    def __init__(self, script, status, started, finished, output=""):
+        self.script = script
+        self.status = status  # "ok", "failed" or "skipped"
+        self.started = started  # seconds since the run started
+        self.finished = finished
+        self.output = output
+
+
+def topological_order(stages):
+    """Order stages so that each comes after the stages it waits for (ValueError on unknown names or cycles)."""
+    by_script = {stage.script: stage for stage in stages}
+    for stage in stages:
+        unknown = [name for name in stage.after if name not in by_script]
+        if unknown:
+            raise ValueError(f"{stage.script} waits for unknown stages {unknown}")
+
+    order, state = [], {}
+
+    def visit(stage):
+        if state.get(stage.script) == "done":
+            return
+        if state.get(stage.script) == "visiting":
+            raise ValueError(f"Stage graph has a cycle through {stage.script}")
+        state[stage.script] = "visiting"
+        for name in stage.after:
+            visit(by_script[name])
+        state[stage.script] = "done"
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+def run_script(script):
+    """Run a pipeline script in a new Python process and return its output."""
+    result = subprocess.run([sys.executable, os.path.join(SCRIPT_DIR, script)], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{script} exited with status {result.returncode}: {result.stderr.strip()}")
+    return result.stdout
+
+
+def run_stages(stages, run=run_script, workers=None, limits=RESOURCE_LIMITS, on_event=None, on_result=None):
+    """Run every stage once its dependencies have succeeded, up to `workers` at a time.
+
+    Stages whose dependencies failed are skipped. on_event(message) is called from the
+    calling thread as stages start and finish, and on_result(result) with the
+    StageResult of each stage that ran. Returns a StageResult per stage, in
+    dependency order.
+    """
+    order = topological_order(stages)
+    workers = workers or int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS))
+    pending = list(order)
+    running = {}
+    results = {}
+    in_use = {}
+    origin = time.perf_counter()
+
+    def notify(message):
+        if on_event:
+            on_event(message)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if len(running) >= workers:
+                    break
+                if any(name not in results for name in stage.after):
+                    continue
+                failed = [name for name in stage.after if results[name].status != "ok"]
+                if failed:
+                    now = time.perf_counter() - origin
+                    results[stage.script] = StageResult(stage.script, "skipped", now, now)
+                    pending.remove(stage)
+                    notify(f"Skipping {stage.script}: {', '.join(failed)} did not finish")
+                    continue
+                if any(in_use.get(resource, 0) >= limits.get(resource, workers) for resource in stage.resources):
+                    continue
+                for resource in stage.resources:
+                    in_use[resource] = in_use.get(resource, 0) + 1
+                pending.remove(stage)
+                notify(f"Running {stage.script}...")
+                running[executor.submit(run, stage.script)] = (stage, time.perf_counter() - origin)
+
+            if not running:
+                if pending and all(name in results for stage in pending for name in stage.after):
+                    raise ValueError(f"Resource limits leave no room for {pending[0].script}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, started = running.pop(future)
+                finished = time.perf_counter() - origin
+                for resource in stage.resources:
+                    in_use[resource] -= 1
+                try:
+                    output = future.result() or ""
+                    status = "ok"
+                except Exception as error:
+                    output = str(error)
+                    status = "failed"
+                results[stage.script] = StageResult(stage.script, status, started, finished, output)
+                notify(f"{'Finished' if status == 'ok' else 'Failed'} {stage.script} in {finished - started:.1f}s")
+                if output.strip():
+                    notify(output.rstrip())
+                if on_result:
+                    on_result(results[stage.script])
+
+    return [results[stage.script] for stage in order]
+
+
+def format_timeline(results, width=40):
+    """Text chart of when each stage ran, followed by the wall time and the summed stage time."""
+    total = max((result.finished for result in results), default=0) or 1e-9
+    name_width = max((len(result.script) for result in results), default=0)
+    lines = []
+    for result in results:
+        bar = ""
+        if result.status != "skipped":
+            start = min(int(result.started / total * width), width - 1)
+            end = max(round(result.finished / total * width), start + 1)
+            bar = " " * start + "#" * (end - start)
+        lines.append(f"{result.script:{name_width}} |{bar:<{width}}| "
+                     f"{result.started:7.1f}s {result.finished:7.1f}s  {result.status}")
+    busy = sum(result.finished - result.started for result in results)
+    lines.append(f"Finished in {total:.1f}s; the stages took {busy:.1f}s together")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Gather Data stages, independent ones in parallel.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)),
+                        help="most stages running at once")
+    parser.add_argument("--list", action="store_true", help="show the stages and what each waits for")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in topological_order(GATHER_STAGES):
+            print(f"{stage.script:15} after: {', '.join(stage.after) or '-':40} resources: {', '.join(stage.resources) or '-'}")
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    results = run_stages(GATHER_STAGES, workers=args.workers, on_event=logging.info)
+    print(format_timeline(results))
+    if any(result.status != "ok" for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Streaming update mode: poll the Finviz news export and score only what is new.
+
+update.py re-reads the whole of news_with_sentiment.csv every time it runs. This
+mode reads it once, keeps the (Date, Title, Ticker) keys in memory and diffs every
+poll of the export against them. Each batch of new articles goes through the
+same steps as Update Data (price refresh, provisional title scores, body
+scores, compile), and after every compile the per-ticker changes in
+average_sentiment_per_ticker.csv are reported to a callback. main.py forwards
+them to the dashboard with Qt signals. Run without the dashboard, they are
+printed:
+
+    python stream.py [--interval 60]
+
+Each poll holds scheduler.py's lock file, so it never overlaps a scheduled job.
+"""
+import argparse
+import csv
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+import profiler
+import scheduler
+from jobs import JobCancelled
+from provisional import history_signature
+from schema import NEWS_PATH, SUMMARY_PATH
+from update import (
+    fetch_all_news,
+    filter_new_entries,
+    process_new_entries,
+    read_existing_news,
+    run_script,
+    split_articles_by_ticker,
+    update_news_csv,
+)
+
+# Seconds between two polls of the news export
+INTERVAL_ENV = "STREAM_INTERVAL"
+DEFAULT_INTERVAL = 60
+
+
+def stream_interval():
+    return max(1, int(os.environ.get(INTERVAL_ENV, DEFAULT_INTERVAL)))
+
+
+def read_summary(path=SUMMARY_PATH):
+    """{ticker: (average sentiment, provisional articles)} from the compiled summary."""
+    summary = {}
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as summary_file:
+            for row in csv.DictReader(summary_file):
+                try:
+                    sentiment = float(row['Combined_Sentiment'])
+                except (KeyError, TypeError, ValueError):
+                    sentiment = None
+                summary[row['Ticker']] = (sentiment, int(row.get('Provisional') or 0))
+    except FileNotFoundError:
+        pass
+    return summary
+
+
+def summary_changes(before, after, new_articles):
+    """Per-ticker changes between two summaries, for the tickers with new articles or a new average."""
+    changes = []
+    for ticker in sorted(set(new_articles) | {ticker for ticker in after if after[ticker] != before.get(ticker)}):
+        sentiment, provisional = after.get(ticker, (None, 0))
+        changes.append({
+            "ticker": ticker,
+            "sentiment": sentiment,
+            "previous": before.get(ticker, (None, 0))[0],
+            "provisional": provisional,
+            "new_articles": new_articles.get(ticker, 0),
+        })
+    return changes
+
+
+def format_change(change):
+    """One line per ticker, e.g. 'AAPL 0.5405 -> 0.0501 (+1 article, 1 provisional)'."""
+    def score(value):
+        return "-" if value is None else f"{value:.4f}"
+
+    notes = []
+    if change["new_articles"]:
+        notes.append(f"+{change['new_articles']} article{'s' if change['new_articles'] != 1 else ''}")
+    if change["provisional"]:
+        notes.append(f"{change['provisional']} provisional")
+    suffix = f" ({', '.join(notes)})" if notes else ""
+    return f"{change['ticker']} {score(change['previous'])} -> {score(change['sentiment'])}{suffix}"
+
+
+class NewsStream:
+    """Polls the news export and scores the articles that have not been seen before.
+
+    on_change(phase, changes) is called after the provisional and after the scored
+    compile of every batch, with summary_changes() for that step.
+    """
+
+    def __init__(self, on_change=None, runner=run_script, history_path=NEWS_PATH, update_path="update.csv"):
+        self.on_change = on_change
+        self.runner = runner
+        self.history_path = history_path
+        self.update_path = update_path
+        self.seen = None
+        # Signature of the history the keys were read from; a Gather Data run in between replaces it
+        self.signature = None
+
+    def poll(self):
+        """Fetch the export once and process its new articles; returns how many there were."""
+        if self.seen is None or history_signature(self.history_path) != self.signature:
+            started = time.perf_counter()
+            self.signature = history_signature(self.history_path)
+            self.seen = read_existing_news(self.history_path)
+            logging.info(f"Loaded {len(self.seen):,} known articles in {time.perf_counter() - started:.1f}s")
+
+        all_news = fetch_all_news()
+        if not all_news:
+            return 0
+        new_entries = filter_new_entries(split_articles_by_ticker(all_news), self.seen)
+        if not new_entries:
+            return 0
+
+        logging.info(f"{len(new_entries)} new articles in the export")
+        new_articles = Counter(article['Ticker'] for article in new_entries)
+        summary = read_summary()
+
+        def publish(phase):
+            nonlocal summary
+            after = read_summary()
+            changes = summary_changes(summary, after, new_articles)
+            summary = after
+            if self.on_change:
+                self.on_change(phase, changes)
+
+        update_news_csv(self.update_path, new_entries)
+        process_new_entries(new_entries, self.seen, self.runner, on_publish=publish,
+                            news_file_path=self.history_path, update_file_path=self.update_path)
+        signature = history_signature(self.history_path)
+        if signature != self.signature:
+            # updatesent.py appended the batch; if it failed, the history is unchanged and the batch is retried
+            self.seen.update((article['Date'], article['Title'], article['Ticker']) for article in new_entries)
+            self.signature = signature
+        return len(new_entries)
+
+    def run(self, interval=None, stop=None):
+        """Poll every `interval` seconds until `stop` (a threading.Event) is set."""
+        interval = interval or stream_interval()
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            started = time.monotonic()
+            with scheduler.job_lock("stream") as acquired:
+                if acquired:
+                    try:
+                        self.poll()
+                    except JobCancelled:
+                        # The runner's scripts were stopped; the unscored batch is retried by the next stream
+                        return
+                    except Exception:
+                        logging.exception("Stream poll failed")
+            stop.wait(max(0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the Finviz news export and score new articles as they appear.")
+    parser.add_argument("--interval", type=int, default=stream_interval(), help="seconds between polls")
+    parser.add_argument("--once", action="store_true", help="poll once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # Every script would start its own profiler inside this process, as in scheduler.py
+    if profiler.profiling_requested():
+        logging.warning(f"Profiling is not supported in streaming mode, ignoring {profiler.PROFILE_ENV}")
+        os.environ.pop(profiler.PROFILE_ENV, None)
+
+    def print_changes(phase, changes):
+        for change in changes:
+            logging.info(f"[{phase}] {format_change(change)}")
+
+    # Scripts run inside this process like in scheduler.py, so each batch starts without import costs
+    scheduler.warm_up()
+    stream = NewsStream(on_change=print_changes, runner=scheduler.run_script)
+    if args.once:
+        with scheduler.job_lock("stream") as acquired:
+            if acquired:
+                stream.poll()
+        return
+    logging.info(f"Polling the news export every {args.interval}s")
+    try:
+        stream.run(args.interval)
+    except KeyboardInterrupt:
+        logging.info("Stream stopped")
+
+
+if __name__ == "__main__":
+    main()
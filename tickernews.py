@@ -1,41 +1,91 @@
-import sys
-from finvizfinance.quote import finvizfinance
-import os
-import pandas as pd
-
-def fetch_news_for_ticker(ticker):
-    output_dir = os.getcwd()
-    os.makedirs(output_dir, exist_ok=True)
-
-    print(f"Fetching news for ticker: {ticker}")
-
-    # Fetch news for the specific stock ticker using Finviz
-    stock = finvizfinance(ticker)
-    news_df = stock.ticker_news()
-
-    # Convert 'Date' column to datetime format
-    news_df['Date'] = pd.to_datetime(news_df['Date'], format='%m/%d/%Y %I:%M:%S %p')
-
-    # Filter articles from today's date
-    today = pd.Timestamp('today').normalize()
-    today_news_df = news_df[news_df['Date'].dt.normalize() == today]
-
-    # Sort DataFrame by 'Date' in descending order
-    today_news_df = today_news_df.sort_values(by='Date', ascending=False)
-
-    # Define the output file path
-    output_file_path = os.path.join(output_dir, f"{ticker}_today_news.csv")
-
-    # Write today's news articles to the CSV file
-    today_news_df.to_csv(output_file_path, mode='w', header=True, index=False)
-
-    print(f"Today's news articles for {ticker} have been saved to {output_file_path}")
-
-if __name__ == "__main__":
-    # Check if a ticker argument is provided
-    if len(sys.argv) < 2:
-        print("Please provide a ticker symbol as an argument.")
-        sys.exit(1)
-
-    ticker = sys.argv[1]  # Get the ticker symbol from the command-line argument
-    fetch_news_for_ticker(ticker)
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from finvizfinance.quote import finvizfinance
+import os
+import pandas as pd
+from pipeline import RateLimiter
+from priority import read_watchlist
+
+# Tickers whose news is fetched at the same time, and Finviz quote page requests per second across all of them
+workers = int(os.environ.get("TICKERNEWS_WORKERS", 4))
+request_rate = float(os.environ.get("TICKERNEWS_RATE", 1.0))
+
+def today_news(ticker):
+    """Today's Finviz news for one ticker, newest first."""
+    # Fetch news for the specific stock ticker using Finviz
+    stock = finvizfinance(ticker)
+    news_df = stock.ticker_news()
+
+    # Convert 'Date' column to datetime format
+    news_df['Date'] = pd.to_datetime(news_df['Date'], format='%m/%d/%Y %I:%M:%S %p')
+
+    # Filter articles from today's date
+    today = pd.Timestamp('today').normalize()
+    today_news_df = news_df[news_df['Date'].dt.normalize() == today]
+
+    # Sort DataFrame by 'Date' in descending order
+    return today_news_df.sort_values(by='Date', ascending=False)
+
+def fetch_news_for_ticker(ticker):
+    output_dir = os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Fetching news for ticker: {ticker}")
+    today_news_df = today_news(ticker)
+
+    # Define the output file path
+    output_file_path = os.path.join(output_dir, f"{ticker}_today_news.csv")
+
+    # Write today's news articles to the CSV file
+    today_news_df.to_csv(output_file_path, mode='w', header=True, index=False)
+
+    print(f"Today's news articles for {ticker} have been saved to {output_file_path}")
+    return output_file_path
+
+def fetch_news_for_tickers(tickers, workers=workers, rate=request_rate):
+    """Fetch several tickers' news at once, at most `rate` Finviz requests per second.
+
+    Returns {ticker: output file} for the tickers that were fetched; a failed
+    ticker is reported and does not stop the others.
+    """
+    limiter = RateLimiter(rate)
+
+    def fetch(ticker):
+        limiter.wait()
+        try:
+            return ticker, fetch_news_for_ticker(ticker)
+        except Exception as e:
+            print(f"Error fetching news for {ticker}: {e}")
+            return ticker, None
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        results = list(executor.map(fetch, dict.fromkeys(tickers)))
+    return {ticker: path for ticker, path in results if path is not None}
+
+def requested_tickers(args):
+    """Tickers from the command line, plus the watchlist with --watchlist, in order and without repeats."""
+    tickers = list(args.tickers)
+    if args.watchlist:
+        tickers += sorted(read_watchlist())
+    return list(dict.fromkeys(tickers))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch today's Finviz news for one or more tickers.")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols")
+    parser.add_argument("--watchlist", action="store_true", help="Also fetch the tickers in WATCHLIST / watchlist.txt")
+    args = parser.parse_args()
+
+    tickers = requested_tickers(args)
+    # Check if a ticker argument is provided
+    if not tickers:
+        print("Please provide a ticker symbol as an argument.")
+        sys.exit(1)
+
+    if len(tickers) == 1:
+        fetch_news_for_ticker(tickers[0])
+    else:
+        fetched = fetch_news_for_tickers(tickers)
+        print(f"Fetched news for {len(fetched)} of {len(tickers)} tickers.")
+        if not fetched:
+            sys.exit(1)
@@ -1,117 +1,173 @@
-import requests
-import os
-import csv
-import subprocess
-
-# Define the URL for fetching the news data
-URL = "https://elite.finviz.com/news_export.ashx?v=3&auth=ab4e8b66-99af-4c54-b834-10d199e1e3d5"
-
-# Define any required headers
-headers = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-}
-
-def fetch_all_news():
-    """Fetch all news articles from FinViz."""
-    try:
-        response = requests.get(URL, headers=headers)
-        response.raise_for_status()
-        lines = response.content.decode('utf-8').splitlines()
-        return list(csv.DictReader(lines))
-    except requests.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
-    except Exception as err:
-        print(f"An error occurred: {err}")
-    return []
-
-def read_existing_news(file_path):
-    """Read existing news articles from a CSV file and return a set of unique entries based on 'Date' and 'Title'."""
-    existing_news = set()
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file)
-            for row in reader:
-                existing_news.add((row['Date'], row['Title'], row['Ticker']))  # Unique identifier for each article
-    return existing_news
-
-def split_articles_by_ticker(news_data):
-    """Split articles with multiple tickers into separate entries."""
-    separated_articles = []
-    for article in news_data:
-        tickers = article['Ticker'].split(',')
-        for ticker in tickers:
-            new_article = article.copy()
-            new_article['Ticker'] = ticker.strip()
-            separated_articles.append(new_article)
-    return separated_articles
-
-def filter_new_entries(update_news, existing_news):
-    """Filter out entries in update_news that already exist in existing_news."""
-    return [article for article in update_news if (article['Date'], article['Title'], article['Ticker']) not in existing_news]
-
-def update_news_csv(file_path, news_data):
-    """Update the specified CSV file with the provided news data."""
-    if news_data:  # Check if there is any new data to write
-        with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
-            fieldnames = news_data[0].keys()  # Use the field names from the news data
-            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-            writer.writeheader()
-            for article in news_data:
-                writer.writerow(article)
-        print(f"Updated {file_path} with {len(news_data)} new articles. File saved at: {file_path}")
-    else:
-        print(f"No new articles to update in {file_path}.")
-
-def run_sentiment_analysis(input_file):
-    """Run sentiment.py on the update.csv file and append the results to news_with_sentiment.csv."""
-    try:
-        result = subprocess.run(['python', 'updatesent.py', input_file], check=True, capture_output=True, text=True)
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running sentiment analysis: {e.stderr}")
-
-def run_compile():
-    """Run compile.py to finalize the data processing."""
-    try:
-        result = subprocess.run(['python', 'compilesent.py'], check=True, capture_output=True, text=True)
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print(f"Error running compile.py: {e.stderr}")
-
-def main():
-    news_file_path = "news_with_sentiment.csv"
-    update_file_path = "update.csv"
-
-    # Clear update.csv before running the script
-    open(update_file_path, 'w').close()
-
-    # Fetch all news articles
-    all_news = fetch_all_news()
-    if not all_news:
-        print("No news available.")
-        return
-
-    # Read existing news articles from news_with_sentiment.csv
-    existing_news = read_existing_news(news_file_path)
-
-    # Split articles by ticker and filter out articles already in news_with_sentiment.csv
-    separated_news = split_articles_by_ticker(all_news)
-    new_entries = filter_new_entries(separated_news, existing_news)
-
-    # Update update.csv with only the new articles
-    print(f"Saving {len(new_entries)} new articles to update.csv...")
-    update_news_csv(update_file_path, new_entries)
-
-    # Run sentiment analysis and append results to news_with_sentiment.csv if there are new entries
-    if new_entries:
-        print("Running sentiment analysis on new articles...")
-        run_sentiment_analysis(update_file_path)
-
-        # Run compile.py after sentiment analysis is complete
-        print("Running compile.py...")
-        run_compile()
-    else:
-        print("No new articles to analyze.")
-
-if __name__ == "__main__":
-    main()
+import requests
+import os
+import csv
+import subprocess
+import profiler
+from fetcher import session
+from jobs import JobCancelled
+from provisional import provisional_enabled, write_provisional
+from quotes import export_time, price_max_age, read_export, read_price_times, refresh_prices, tickers_to_refresh
+from snapshot import publish_snapshot
+
+# Define the URL for fetching the news data
+URL = "https://elite.finviz.com/news_export.ashx?v=3&auth=ab4e8b66-99af-4c54-b834-10d199e1e3d5"
+
+# Define any required headers
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+}
+
+def fetch_all_news():
+    """Fetch all news articles from FinViz."""
+    try:
+        response = session.get(URL, headers=headers)
+        response.raise_for_status()
+        lines = response.content.decode('utf-8').splitlines()
+        return list(csv.DictReader(lines))
+    except requests.HTTPError as http_err:
+        print(f"HTTP error occurred: {http_err}")
+    except Exception as err:
+        print(f"An error occurred: {err}")
+    return []
+
+def read_existing_news(file_path):
+    """Read existing news articles from a CSV file and return a set of unique entries based on 'Date' and 'Title'."""
+    existing_news = set()
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as csv_file:
+            reader = csv.DictReader(csv_file)
+            for row in reader:
+                existing_news.add((row['Date'], row['Title'], row['Ticker']))  # Unique identifier for each article
+    return existing_news
+
+def split_articles_by_ticker(news_data):
+    """Split articles with multiple tickers into separate entries."""
+    separated_articles = []
+    for article in news_data:
+        tickers = article['Ticker'].split(',')
+        for ticker in tickers:
+            new_article = article.copy()
+            new_article['Ticker'] = ticker.strip()
+            separated_articles.append(new_article)
+    return separated_articles
+
+def filter_new_entries(update_news, existing_news):
+    """Filter out entries in update_news that already exist in existing_news."""
+    return [article for article in update_news if (article['Date'], article['Title'], article['Ticker']) not in existing_news]
+
+def update_news_csv(file_path, news_data):
+    """Update the specified CSV file with the provided news data."""
+    if news_data:  # Check if there is any new data to write
+        with open(file_path, 'w', newline='', encoding='utf-8') as csv_file:
+            fieldnames = news_data[0].keys()  # Use the field names from the news data
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
+            writer.writeheader()
+            for article in news_data:
+                writer.writerow(article)
+        print(f"Updated {file_path} with {len(news_data)} new articles. File saved at: {file_path}")
+    else:
+        print(f"No new articles to update in {file_path}.")
+
+def run_script(script, *args):
+    """Run a pipeline script in a new Python process and print its output."""
+    result = subprocess.run(['python', script, *args], check=True, capture_output=True, text=True)
+    print(result.stdout)
+
+def run_sentiment_analysis(input_file, runner=run_script):
+    """Run sentiment.py on the update.csv file and append the results to news_with_sentiment.csv."""
+    try:
+        runner('updatesent.py', input_file)
+    except JobCancelled:
+        # The dashboard stopped the job; nothing after this step may run
+        raise
+    except subprocess.CalledProcessError as e:
+        print(f"Error running sentiment analysis: {e.stderr}")
+    except Exception as e:
+        print(f"Error running sentiment analysis: {e}")
+
+def run_compile(runner=run_script):
+    """Run compile.py to finalize the data processing."""
+    try:
+        runner('compilesent.py')
+    except JobCancelled:
+        raise
+    except subprocess.CalledProcessError as e:
+        print(f"Error running compile.py: {e.stderr}")
+    except Exception as e:
+        print(f"Error running compile.py: {e}")
+
+def refresh_stale_prices(new_entries, export_path="export.csv"):
+    """Refresh export.csv only for tickers with new articles and tickers whose prices are older than PRICE_MAX_AGE."""
+    export_df = read_export(export_path)
+    tickers = tickers_to_refresh([article['Ticker'] for article in new_entries], export_df,
+                                 read_price_times(), price_max_age(), export_time(export_path))
+    if not tickers:
+        print("Prices are up to date.")
+        return []
+    print(f"Refreshing prices for {len(tickers)} tickers ({len(export_df)} in {export_path})...")
+    refreshed = refresh_prices(tickers, export_path)
+    print(f"Refreshed prices for {len(refreshed)} tickers.")
+    return refreshed
+
+def process_new_entries(new_entries, existing_news, runner=run_script, on_publish=None,
+                        news_file_path="news_with_sentiment.csv", update_file_path="update.csv"):
+    """Score the articles saved to update.csv and recompile, publishing title-only sentiment first.
+
+    on_publish(phase) is called after each compile, with "provisional" and then "scored".
+    """
+    # Refresh prices before compiling, so the published snapshot pairs new sentiment with current prices
+    refresh_stale_prices(new_entries)
+
+    # Publish title-only sentiment first; the content scores replace it below
+    if provisional_enabled() and write_provisional(new_entries, news_file_path, known=existing_news):
+        print("Publishing provisional title-only sentiment...")
+        run_compile(runner)
+        if on_publish:
+            on_publish("provisional")
+
+    print("Running sentiment analysis on new articles...")
+    run_sentiment_analysis(update_file_path, runner)
+
+    # Run compile.py after sentiment analysis is complete
+    print("Running compile.py...")
+    run_compile(runner)
+    if on_publish:
+        on_publish("scored")
+
+def main(runner=run_script):
+    """Fetch new articles, score them and recompile; runner starts the scripts (scheduler.py runs them in-process)."""
+    news_file_path = "news_with_sentiment.csv"
+    update_file_path = "update.csv"
+
+    # Clear update.csv before running the script
+    open(update_file_path, 'w').close()
+
+    # Fetch all news articles
+    all_news = fetch_all_news()
+    if not all_news:
+        print("No news available.")
+        return
+
+    # Read existing news articles from news_with_sentiment.csv
+    existing_news = read_existing_news(news_file_path)
+
+    # Split articles by ticker and filter out articles already in news_with_sentiment.csv
+    separated_news = split_articles_by_ticker(all_news)
+    new_entries = filter_new_entries(separated_news, existing_news)
+
+    # Update update.csv with only the new articles
+    print(f"Saving {len(new_entries)} new articles to update.csv...")
+    update_news_csv(update_file_path, new_entries)
+
+    # Run sentiment analysis and append results to news_with_sentiment.csv if there are new entries
+    if new_entries:
+        process_new_entries(new_entries, existing_news, runner, news_file_path=news_file_path,
+                            update_file_path=update_file_path)
+    else:
+        print("No new articles to analyze.")
+        if refresh_stale_prices(new_entries):
+            publish_snapshot()
+
+if __name__ == "__main__":
+    profiler.enable_profiling("update")
+    main()
@@ -1,164 +1,187 @@
-import pandas as pd
-import os
-import requests
-from bs4 import BeautifulSoup
-from finvader import finvader
-import time
-import random
-import logging
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-
-# Get the current working directory
-current_dir = os.getcwd()
-
-# Define the input and output directories as the current working directory
-input_dir = current_dir
-output_dir = current_dir
-
-# Create the output directory if it doesn't exist (optional, since current_dir should always exist)
-os.makedirs(output_dir, exist_ok=True)
-
-# List of user agents for rotation
-user_agents = [
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-]
-
-# Function to analyze sentiment of text
-def analyze_sentiment(text: str) -> float:
-    sentiment_result = finvader(text, use_sentibignomics=True, use_henry=True, indicator='compound')
-    return sentiment_result.get('compound', 0.0) if isinstance(sentiment_result, dict) else (sentiment_result if isinstance(sentiment_result, float) else 0.0)
-
-# Function to fetch article content from a URL with error handling and retry logic
-def fetch_article_content(url: str, retries: int = 3) -> str:
-    headers = {
-        'User-Agent': random.choice(user_agents),
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Connection': 'keep-alive'
-    }
-    
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=30)  # Increased timeout to 30 seconds
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                paragraphs = soup.find_all('p')
-                article_text = ' '.join([para.get_text() for para in paragraphs])
-                return article_text
-            else:
-                logging.warning(f"Failed to fetch article from {url}: {response.status_code}")
-                return ""
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching article from {url}, attempt {attempt + 1}: {e}")
-            time.sleep(2 ** attempt)  # Exponential backoff before retrying
-    logging.error(f"All retries exhausted for URL: {url}")
-    return ""  # Return empty string if all retries fail
-
-# Only process news.csv
-input_file_path = os.path.join(input_dir, 'update.csv')
-output_file_path = os.path.join(output_dir, 'news_with_sentiment.csv')
-
-# Load the input CSV file
-try:
-    news_df = pd.read_csv(input_file_path)
-except pd.errors.EmptyDataError:
-    print(f"Skipping empty file: {input_file_path}")
-    exit()
-except FileNotFoundError:
-    print(f"File not found: {input_file_path}")
-    exit()
-
-# Check for required columns
-required_columns = ['Url', 'Title']
-missing_columns = [col for col in required_columns if col not in news_df.columns]
-
-if missing_columns:
-    print(f"Missing columns {missing_columns} in news.csv")
-else:
-    title_sentiments = []
-    content_sentiments = []
-    combined_sentiments = []
-    
-    # Dictionary to store processed URLs and their sentiment scores
-    processed_urls = {}
-
-    # First pass to process all URLs
-    for index, row in news_df.iterrows():
-        url = row['Url']
-        title = row['Title']
-        print(f"Processing URL: {url}")
-
-        # Fetch the content and analyze sentiment
-        content = fetch_article_content(url)
-
-        # Analyze sentiment
-        title_sentiment = analyze_sentiment(title) if title else None
-        content_sentiment = analyze_sentiment(content) if content else None
-
-        # Store results
-        combined_sentiment = None
-        if title_sentiment is not None and content_sentiment is not None:
-            combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
-
-        processed_urls[url] = (title_sentiment, content_sentiment, combined_sentiment)
-
-        # Append the sentiments to the lists
-        title_sentiments.append(title_sentiment if title_sentiment is not None else 0.0)
-        content_sentiments.append(content_sentiment if content_sentiment is not None else 0.0)
-        combined_sentiments.append(combined_sentiment if combined_sentiment is not None else 0.0)
-
-        time.sleep(1)  # Optional delay to avoid overwhelming the server
-
-    # Retry for URLs with empty sentiments
-    for index, row in news_df.iterrows():
-        url = row['Url']
-        print(f"Retrying empty sentiment for URL: {url}")
-
-        # Check if the combined sentiment is empty
-        if processed_urls[url][2] is None:
-            # Retry fetching content for empty sentiment
-            content = fetch_article_content(url)
-            content_sentiment = analyze_sentiment(content) if content else 0.0
-
-            # Use existing title sentiment
-            title_sentiment = processed_urls[url][0]
-
-            # Recalculate combined sentiment
-            if title_sentiment is not None and content_sentiment is not None:
-                combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
-            else:
-                combined_sentiment = None
-
-            # Update the processed URLs dictionary
-            processed_urls[url] = (title_sentiment, content_sentiment, combined_sentiment)
-
-            # Append the sentiments to the lists again
-            title_sentiments[index] = title_sentiment if title_sentiment is not None else 0.0
-            content_sentiments[index] = content_sentiment if content_sentiment is not None else 0.0
-            combined_sentiments[index] = combined_sentiment if combined_sentiment is not None else 0.0
-
-            time.sleep(1)  # Optional delay to avoid overwhelming the server
-
-    # Append sentiment results to DataFrame
-    news_df['Title_Sentiment'] = title_sentiments
-    news_df['Content_Sentiment'] = content_sentiments
-    news_df['Combined_Sentiment'] = combined_sentiments
-
-    # Write results to output CSV
-    if os.path.isfile(output_file_path):
-        if os.stat(output_file_path).st_size == 0:
-            print(f"File is empty, writing new data: {output_file_path}")
-            news_df.to_csv(output_file_path, index=False)
-        else:
-            print(f"Appending to existing file: {output_file_path}")
-            existing_df = pd.read_csv(output_file_path)
-            combined_df = pd.concat([existing_df, news_df], ignore_index=True)
-            combined_df.to_csv(output_file_path, index=False)
-    else:
-        print(f"Creating new file: {output_file_path}")
-        news_df.to_csv(output_file_path, index=False)
-
-print("All sentiment analyses have been completed and saved.")
+import pandas as pd
+import os
+import time
+import logging
+import profiler
+from archive import append_to_archive, archive_enabled, archive_path
+from articles import ARTICLE_COLUMNS
+from fetcher import fetch_article_content, log_stats
+from neardup import NearDuplicateIndex, content_hash, near_duplicates_enabled
+from progress import Progress
+from scoring import analyze_sentiment, score_content, score_contents, score_texts, start_chunk_workers
+
+start_chunk_workers()
+profiler.enable_profiling("updatesent")
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+
+# Get the current working directory
+current_dir = os.getcwd()
+
+# Define the input and output directories as the current working directory
+input_dir = current_dir
+output_dir = current_dir
+
+# Create the output directory if it doesn't exist (optional, since current_dir should always exist)
+os.makedirs(output_dir, exist_ok=True)
+
+# Only process news.csv
+input_file_path = os.path.join(input_dir, 'update.csv')
+output_file_path = os.path.join(output_dir, 'news_with_sentiment.csv')
+
+# Load the input CSV file
+try:
+    news_df = pd.read_csv(input_file_path)
+except pd.errors.EmptyDataError:
+    print(f"Skipping empty file: {input_file_path}")
+    exit()
+except FileNotFoundError:
+    print(f"File not found: {input_file_path}")
+    exit()
+
+# Check for required columns
+required_columns = ['Url', 'Title']
+missing_columns = [col for col in required_columns if col not in news_df.columns]
+
+if missing_columns:
+    print(f"Missing columns {missing_columns} in news.csv")
+else:
+    # update.csv has one row per ticker; each article is fetched and scored once for all of them
+    key_columns = [col for col in ARTICLE_COLUMNS if col in news_df.columns]
+    row_keys = list(news_df[key_columns].astype(str).itertuples(index=False, name=None))
+    articles_df = news_df[~news_df[key_columns].astype(str).duplicated()]
+    article_keys = list(articles_df[key_columns].astype(str).itertuples(index=False, name=None))
+
+    # Dictionary to store processed articles and their sentiment scores
+    processed_articles = {}
+
+    # Copies of articles scored before reuse their content score (see neardup.py)
+    near_duplicates = NearDuplicateIndex.load() if near_duplicates_enabled() else None
+    article_tickers = {key: set() for key in article_keys}
+    for key, ticker in zip(row_keys, news_df['Ticker'] if 'Ticker' in news_df.columns else [''] * len(news_df)):
+        article_tickers[key].add(str(ticker))
+    article_dates = articles_df['Date'].astype(str).tolist() if 'Date' in articles_df.columns else [None] * len(articles_df)
+    articles = list(zip(article_keys, articles_df['Title'], article_dates, articles_df['Url']))
+    # Index entries of the copies found by title, and articles whose copy is downloaded earlier in this run
+    copies = {}
+    waiting = []
+
+    # First pass to fetch all article bodies
+    contents = []
+    progress = Progress("updatesent.py", len(articles), unit="articles")
+    for position, (key, title, date, url) in enumerate(articles):
+        progress.advance()
+        if near_duplicates is not None:
+            entry = near_duplicates.match_title(title, article_tickers[key], date)
+            if entry is not None or not near_duplicates.start(title, article_tickers[key], date):
+                if entry is not None:
+                    copies[key] = entry
+                else:
+                    waiting.append(position)
+                contents.append(None)
+                continue
+        print(f"Processing URL: {url}")
+
+        # Fetch the content
+        contents.append(fetch_article_content(url))
+
+        time.sleep(1)  # Optional delay to avoid overwhelming the server
+
+    # Analyze sentiment of all titles and bodies in batches (SENTIMENT_ENGINE selects the scorer)
+    title_results = score_texts(articles_df['Title'].tolist(), analyze_sentiment)
+    if near_duplicates is not None:
+        content_results, body_hashes = near_duplicates.score_contents(contents, analyze_sentiment)
+    else:
+        content_results, body_hashes = score_contents(contents, analyze_sentiment), [None] * len(contents)
+
+    if near_duplicates is not None:
+        # Copies and waiting articles have no body hash and are not added
+        for (key, title, date, url), content_sentiment, body_hash in zip(articles, content_results, body_hashes):
+            near_duplicates.add({'Title': title, 'Date': date, 'Url': url}, article_tickers[key], body_hash, content_sentiment)
+
+    # Articles that waited for a copy take its scores now, or are fetched after all
+    for position in waiting:
+        key, title, date, url = articles[position]
+        entry = near_duplicates.match_title(title, article_tickers[key], date)
+        if entry is not None:
+            copies[key] = entry
+            continue
+        print(f"Processing URL: {url}")
+        content = fetch_article_content(url)
+        # The body decides: a copy of a scored body reuses its score
+        (content_results[position],), (body_hash,) = near_duplicates.score_contents([content], analyze_sentiment)
+        near_duplicates.add({'Title': title, 'Date': date, 'Url': url}, article_tickers[key],
+                            body_hash, content_results[position])
+        time.sleep(1)  # Optional delay to avoid overwhelming the server
+
+    for (key, title, date, url), title_sentiment, content_sentiment in zip(articles, title_results, content_results):
+        if key in copies:
+            content_sentiment = copies[key]['Content_Sentiment']
+
+        # Store results
+        combined_sentiment = None
+        if title_sentiment is not None and content_sentiment is not None:
+            combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
+
+        processed_articles[key] = (title_sentiment, content_sentiment, combined_sentiment)
+
+    # Retry for URLs with empty sentiments
+    for key, title, date, url in articles:
+        print(f"Retrying empty sentiment for URL: {url}")
+
+        # Check if the combined sentiment is empty
+        if processed_articles[key][2] is None:
+            # Retry fetching content for empty sentiment
+            content = fetch_article_content(url)
+            content_sentiment = score_content(content, analyze_sentiment) if content else 0.0
+
+            # Use existing title sentiment
+            title_sentiment = processed_articles[key][0]
+
+            # Recalculate combined sentiment
+            if title_sentiment is not None and content_sentiment is not None:
+                combined_sentiment = (0.3 * title_sentiment) + (0.7 * content_sentiment)
+            else:
+                combined_sentiment = None
+
+            # Update the processed articles dictionary
+            processed_articles[key] = (title_sentiment, content_sentiment, combined_sentiment)
+            if near_duplicates is not None and content:
+                near_duplicates.add({'Title': title, 'Date': date, 'Url': url}, article_tickers[key],
+                                    content_hash(content), content_sentiment)
+
+            time.sleep(1)  # Optional delay to avoid overwhelming the server
+
+    # Append sentiment results to DataFrame, copying each article's scores to all of its rows
+    row_sentiments = [processed_articles[key] for key in row_keys]
+    news_df['Title_Sentiment'] = [scores[0] if scores[0] is not None else 0.0 for scores in row_sentiments]
+    news_df['Content_Sentiment'] = [scores[1] if scores[1] is not None else 0.0 for scores in row_sentiments]
+    news_df['Combined_Sentiment'] = [scores[2] if scores[2] is not None else 0.0 for scores in row_sentiments]
+
+    # Write results to output CSV
+    if os.path.isfile(output_file_path):
+        if os.stat(output_file_path).st_size == 0:
+            print(f"File is empty, writing new data: {output_file_path}")
+            news_df.to_csv(output_file_path, index=False)
+        else:
+            print(f"Appending to existing file: {output_file_path}")
+            existing_df = pd.read_csv(output_file_path)
+            combined_df = pd.concat([existing_df, news_df], ignore_index=True)
+            combined_df.to_csv(output_file_path, index=False)
+    else:
+        print(f"Creating new file: {output_file_path}")
+        news_df.to_csv(output_file_path, index=False)
+
+    if near_duplicates is not None:
+        near_duplicates.save()
+        print(near_duplicates.summary())
+
+    # Keep the Parquet archive in step with the CSV, rewriting only the partitions of the new articles
+    if archive_enabled():
+        append_to_archive(news_df)
+        print(f"Added {len(news_df)} articles to the archive in {archive_path()}")
+    progress.finish()
+
+log_stats()
+print("All sentiment analyses have been completed and saved.")
@@ -0,0 +1,218 @@
+"""Vectorized batch version of the finvader compound score.
+
+finvader builds a VADER analyzer with the SentiBignomics and Henry lexicons on
+every call and scores one string at a time in pure Python. score_batch()
+tokenizes a whole batch of documents, maps the tokens to integer ids once per
+unique token and applies the VADER rules (booster words, ALL CAPS emphasis,
+negation, "but", punctuation emphasis) with NumPy array operations.
+
+Accuracy: the VADER special-case idioms ("kiss of death", "cut the mustard",
+...) are not applied, which is the known source of differences. The reference
+corpus used by benchmarks/vecsent.py matches finvader exactly. So did 12,000
+random word sequences dense in negations, boosters, "but", "never so" and ALL
+CAPS words.
+"""
+import string
+
+import numpy as np
+import pandas as pd
+
+from lexicon import load_lexicon
+
+# Maximum absolute difference from finvader's compound score on the reference corpus
+TOLERANCE = 0.05
+
+# VADER constants (nltk.sentiment.vader.VaderConstants)
+B_INCR = 0.293
+B_DECR = -0.293
+C_INCR = 0.733
+N_SCALAR = -0.74
+ALPHA = 15
+
+PUNC_LIST = [".", "!", "?", ",", ";", ":", "-", "'", '"', "!!", "!!!", "??", "???", "?!?", "!?!", "?!?!", "!?!?"]
+PUNCTUATION = set(string.punctuation)
+
+_scorer = None
+
+
+def vader_constants():
+    from nltk.sentiment.vader import VaderConstants
+    return VaderConstants.BOOSTER_DICT, VaderConstants.NEGATE
+
+
+def strip_punctuation(token):
+    """Mimic VADER's removal of one leading or trailing punctuation mark from a word."""
+    for punc in PUNC_LIST:
+        if token.startswith(punc):
+            word = token[len(punc):]
+        elif token.endswith(punc):
+            word = token[:-len(punc)]
+        else:
+            continue
+        if len(word) > 1 and not any(ch in PUNCTUATION for ch in word):
+            return word
+    return token
+
+
+class BatchScorer:
+    """Scores batches of documents against a lexicon held in integer-id arrays."""
+
+    def __init__(self, lexicon=None, boosters=None, negations=None):
+        if lexicon is None:
+            lexicon = load_lexicon()
+        if boosters is None or negations is None:
+            boosters, negations = vader_constants()
+
+        # Id 0 is reserved for words outside the lexicon
+        words = sorted(lexicon)
+        self.vocab = {word: index + 1 for index, word in enumerate(words)}
+        self.valences = np.zeros(len(words) + 1)
+        self.valences[1:] = [lexicon[word] for word in words]
+        self.boosters = dict(boosters)
+        self.negations = set(negations)
+        self.phrase_boosters = [word for word in self.boosters if " " in word]
+
+    def token_features(self, uniques):
+        """Per unique raw token: lexicon id, booster scalar and flag, negation/caps flags,
+        the token with punctuation stripped, its lowercase form and a code identifying it."""
+        stripped = [strip_punctuation(token) for token in uniques]
+        lowered = [token.lower() for token in stripped]
+        ids = np.array([self.vocab.get(token, 0) for token in lowered], dtype=np.int64)
+        booster = np.array([self.boosters.get(token, 0.0) for token in lowered])
+        is_booster = np.array([token in self.boosters for token in lowered])
+        negated = np.array([token in self.negations or "n't" in token for token in lowered])
+        upper = np.array([token.isupper() for token in stripped])
+        mapped, _ = pd.factorize(np.array(stripped, dtype=object))
+        return ids, booster, is_booster, negated, upper, stripped, lowered, mapped
+
+    def score_batch(self, texts):
+        """Return the finvader compound score for every text in the batch."""
+        texts = ["" if not isinstance(text, str) else text for text in texts]
+        n_docs = len(texts)
+        if n_docs == 0:
+            return []
+
+        # Tokenize: whitespace split, dropping single characters like VADER does
+        doc_tokens = [[token for token in text.split() if len(token) > 1] for text in texts]
+        lengths = np.array([len(tokens) for tokens in doc_tokens], dtype=np.int64)
+        flat = [token for tokens in doc_tokens for token in tokens]
+        if not flat:
+            return [0.0] * n_docs
+
+        # Features are computed once per unique token and broadcast back with the codes
+        codes, uniques = pd.factorize(np.array(flat, dtype=object))
+        u_ids, u_booster, u_is_booster, u_negated, u_upper, u_stripped, u_lowered, u_mapped = \
+            self.token_features(list(uniques))
+        lowered = np.array(u_lowered, dtype=object)
+        stripped = np.array(u_stripped, dtype=object)
+
+        n_tokens = len(flat)
+        doc = np.repeat(np.arange(n_docs), lengths)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        position = np.arange(n_tokens) - starts[doc]
+
+        ids = u_ids[codes]
+        in_lexicon = ids > 0
+        booster = u_booster[codes]
+        is_booster = u_is_booster[codes]
+        negated = u_negated[codes]
+        upper = u_upper[codes]
+        words = lowered[codes]
+        # VADER matches "never so/this" and "sort of"-style dampeners case-sensitively
+        cased = stripped[codes]
+
+        # Some but not all words of the document in ALL CAPS
+        caps_per_doc = np.bincount(doc, weights=upper, minlength=n_docs)
+        cap_diff_doc = (caps_per_doc > 0) & (caps_per_doc < lengths)
+        cap_diff = cap_diff_doc[doc]
+
+        valence = self.valences[ids].copy()
+        caps_boost = in_lexicon & upper & cap_diff
+        valence[caps_boost] += np.where(valence[caps_boost] > 0, C_INCR, -C_INCR)
+
+        def shifted(values, k, fill):
+            """values[i - k] within the same document, fill where i - k falls before the document start."""
+            out = np.full(n_tokens, fill, dtype=values.dtype)
+            out[k:] = values[:-k]
+            out[position < k] = fill
+            return out
+
+        for start_i, damp in ((0, 1.0), (1, 0.95), (2, 0.9)):
+            k = start_i + 1
+            prev_in_lexicon = shifted(in_lexicon, k, True)
+            active = in_lexicon & ~prev_in_lexicon
+
+            # Booster / dampener words before the sentiment word
+            scalar = shifted(booster, k, 0.0)
+            scalar = np.where(valence < 0, -scalar, scalar)
+            prev_caps = shifted(upper, k, False) & cap_diff & shifted(is_booster, k, False)
+            scalar = scalar + np.where(prev_caps, np.where(valence > 0, C_INCR, -C_INCR), 0.0)
+            valence = np.where(active, valence + scalar * damp, valence)
+
+            # Negation and "never so/this" emphasis
+            prev_negated = shifted(negated, k, False)
+            if start_i == 0:
+                factor = np.where(prev_negated, N_SCALAR, 1.0)
+            elif start_i == 1:
+                never_so = (shifted(cased, 2, "") == "never") & np.isin(shifted(cased, 1, ""), ["so", "this"])
+                factor = np.where(never_so, 1.5, np.where(prev_negated, N_SCALAR, 1.0))
+            else:
+                never_so = ((shifted(cased, 3, "") == "never") & np.isin(shifted(cased, 2, ""), ["so", "this"])) \
+                    | np.isin(shifted(cased, 1, ""), ["so", "this"])
+                factor = np.where(never_so, 1.25, np.where(prev_negated, N_SCALAR, 1.0))
+            valence = np.where(active, valence * factor, valence)
+
+            if start_i == 2:
+                # Two-word dampeners such as "kind of" or "sort of" just before the word
+                twoone = shifted(cased, 2, "") + " " + shifted(cased, 1, "")
+                threetwo = shifted(cased, 3, "") + " " + shifted(cased, 2, "")
+                dampened = np.isin(twoone, self.phrase_boosters) | np.isin(threetwo, self.phrase_boosters)
+                valence = np.where(active & dampened, valence + B_DECR, valence)
+
+        # Booster words and "kind of" carry no sentiment of their own
+        next_words = np.full(n_tokens, "", dtype=object)
+        next_words[:-1] = words[1:]
+        next_words[position == lengths[doc] - 1] = ""
+        kind_of = (words == "kind") & (next_words == "of")
+        valence[is_booster | kind_of | ~in_lexicon] = 0.0
+
+        # VADER looks up each word's context at its first occurrence in the document,
+        # so repeated words all take the valence computed for the first one
+        key = doc * len(uniques) + u_mapped[codes]
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        valence = valence[first[inverse]]
+
+        # Words before the first "but" are halved, words after it weighted by 1.5
+        is_but = words == "but"
+        first_but = np.full(n_docs, np.iinfo(np.int64).max)
+        np.minimum.at(first_but, doc[is_but], position[is_but])
+        but_pos = first_but[doc]
+        valence = np.where(position < but_pos, valence * np.where(but_pos < np.iinfo(np.int64).max, 0.5, 1.0),
+                           np.where(position > but_pos, valence * 1.5, valence))
+
+        sums = np.bincount(doc, weights=valence, minlength=n_docs)
+
+        # Emphasis from exclamation points (up to 4) and question marks (2 or more)
+        series = pd.Series(texts)
+        exclamations = np.minimum(series.str.count("!").to_numpy(), 4) * 0.292
+        questions = series.str.count(r"\?").to_numpy()
+        question_amp = np.where(questions > 3, 0.96, np.where(questions > 1, questions * 0.18, 0.0))
+        amplifier = exclamations + question_amp
+        sums = np.where(sums > 0, sums + amplifier, np.where(sums < 0, sums - amplifier, sums))
+
+        compound = sums / np.sqrt(sums * sums + ALPHA)
+        compound[lengths == 0] = 0.0
+        return [round(float(score), 4) for score in compound]
+
+
+def get_scorer():
+    """Return the process-wide BatchScorer, building it on first use."""
+    global _scorer
+    if _scorer is None:
+        _scorer = BatchScorer()
+    return _scorer
+
+
+def score_batch(texts):
+    """Score a batch of texts with the shared BatchScorer."""
+    return get_scorer().score_batch(texts)
@@ -0,0 +1,259 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+
+import profiler
+from archive import refresh_archive
+from checkpoint import SENTIMENT_COLUMNS, CheckpointWriter, checkpoint_path, finalize_checkpoint
+from fetcher import fetch_article_content, log_stats
+from scoring import analyze_sentiment, combine_sentiments, score_content, score_contents, score_texts
+
+# Queue database shared by the coordinator and all workers (must be on storage every worker can reach)
+QUEUE_ENV = "SENTIMENT_QUEUE"
+DEFAULT_QUEUE = "sentiment_queue.db"
+# Rows per batch handed to a worker
+BATCH_SIZE_ENV = "SENTIMENT_QUEUE_BATCH"
+DEFAULT_BATCH_SIZE = 20
+# Seconds a worker may hold a batch without renewing its lease before others reclaim it
+LEASE_ENV = "SENTIMENT_QUEUE_LEASE"
+DEFAULT_LEASE = 300
+# Seconds an idle worker waits before looking for reclaimable batches again
+POLL_INTERVAL = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, batch INTEGER NOT NULL, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (row INTEGER PRIMARY KEY, record TEXT NOT NULL);
+"""
+
+
+def connect(path):
+    # Plain rollback journal: WAL does not work on network file systems
+    connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(connection, input_path, batch_size):
+    """Load news.csv into the queue as batches of batch_size rows, replacing any earlier queue."""
+    with open(input_path, 'r', newline='', encoding='utf-8') as news_file:
+        reader = csv.DictReader(news_file)
+        fieldnames = reader.fieldnames or []
+        missing_columns = [col for col in ['Url', 'Title'] if col not in fieldnames]
+        if missing_columns:
+            raise ValueError(f"Missing columns {missing_columns} in {input_path}")
+
+        connection.execute("BEGIN IMMEDIATE")
+        for table in ("meta", "rows", "batches", "results"):
+            connection.execute(f"DELETE FROM {table}")
+        output_fieldnames = fieldnames + [col for col in SENTIMENT_COLUMNS if col not in fieldnames]
+        connection.execute("INSERT INTO meta VALUES ('fieldnames', ?)", (json.dumps(output_fieldnames),))
+        count = 0
+        for index, record in enumerate(reader):
+            batch = index // batch_size
+            if index % batch_size == 0:
+                connection.execute("INSERT INTO batches (id) VALUES (?)", (batch,))
+            connection.execute("INSERT INTO rows VALUES (?, ?, ?)", (index, batch, json.dumps(record)))
+            count += 1
+        connection.execute("COMMIT")
+    return count
+
+
+def claim_batch(connection, owner, lease):
+    """Lease the next pending batch, or one whose worker stopped renewing its lease."""
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        found = connection.execute(
+            "SELECT id, state FROM batches WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+            "ORDER BY id LIMIT 1", (now,)).fetchone()
+        if found is None:
+            return None
+        batch, state = found
+        if state == 'leased':
+            logging.warning(f"Reclaiming batch {batch} from a worker whose lease expired")
+        connection.execute("UPDATE batches SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 "
+                           "WHERE id = ?", (owner, now + lease, batch))
+        return batch
+    finally:
+        connection.execute("COMMIT")
+
+
+def renew_lease(connection, batch, owner, lease):
+    """Extend our lease; returns False if the batch was reclaimed by another worker."""
+    cursor = connection.execute("UPDATE batches SET lease_until = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                                (time.time() + lease, batch, owner))
+    return cursor.rowcount == 1
+
+
+def complete_batch(connection, batch, owner, results):
+    """Store a batch's results and mark it done, unless our lease was lost in the meantime."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        still_ours = connection.execute("SELECT 1 FROM batches WHERE id = ? AND owner = ? AND state = 'leased'",
+                                        (batch, owner)).fetchone()
+        if still_ours:
+            connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                                   [(row, json.dumps(record)) for row, record in results])
+            connection.execute("UPDATE batches SET state = 'done', lease_until = NULL WHERE id = ?", (batch,))
+        return bool(still_ours)
+    finally:
+        connection.execute("COMMIT")
+
+
+def output_record(record, sentiments):
+    scores = {col: value if value is not None else 0.0 for col, value in zip(SENTIMENT_COLUMNS, sentiments)}
+    return {**record, **scores}
+
+
+def score_batch_rows(rows, keep_lease):
+    """Fetch and score one batch the way sentiment.py does; keep_lease() is called after every download."""
+    contents = []
+    for _, record in rows:
+        logging.info(f"Processing URL: {record['Url']}")
+        contents.append(fetch_article_content(record['Url']))
+        if not keep_lease():
+            return None
+        time.sleep(1)  # Optional delay to avoid overwhelming the server
+
+    title_results = score_texts([record['Title'] for _, record in rows], analyze_sentiment)
+    content_results = score_contents(contents, analyze_sentiment)
+
+    results = []
+    for (row, record), title_sentiment, content_sentiment in zip(rows, title_results, content_results):
+        combined_sentiment = combine_sentiments(title_sentiment, content_sentiment)
+        if combined_sentiment is None:
+            # Retry fetching content for empty sentiment
+            logging.info(f"Retrying empty sentiment for URL: {record['Url']}")
+            content = fetch_article_content(record['Url'])
+            content_sentiment = score_content(content, analyze_sentiment) if content else 0.0
+            combined_sentiment = combine_sentiments(title_sentiment, content_sentiment)
+            if not keep_lease():
+                return None
+            time.sleep(1)  # Optional delay to avoid overwhelming the server
+        results.append((row, output_record(record, (title_sentiment, content_sentiment, combined_sentiment))))
+    return results
+
+
+def work(connection, lease, wait):
+    """Claim and process batches until none are left; with wait, also wait for leased batches to finish or expire."""
+    owner = worker_name()
+    done = 0
+    while True:
+        batch = claim_batch(connection, owner, lease)
+        if batch is None:
+            unfinished = connection.execute("SELECT COUNT(*) FROM batches WHERE state != 'done'").fetchone()[0]
+            if wait and unfinished:
+                # Other workers hold the remaining batches; take over any whose lease runs out
+                time.sleep(POLL_INTERVAL)
+                continue
+            break
+
+        rows = [(row, json.loads(record)) for row, record in
+                connection.execute("SELECT row, record FROM rows WHERE batch = ? ORDER BY row", (batch,))]
+        logging.info(f"{owner} working on batch {batch} ({len(rows)} rows)")
+        results = score_batch_rows(rows, lambda: renew_lease(connection, batch, owner, lease))
+        if results is None or not complete_batch(connection, batch, owner, results):
+            logging.warning(f"Lost the lease on batch {batch}; another worker will finish it")
+            continue
+        done += 1
+    logging.info(f"{owner} finished {done} batches")
+    log_stats()
+
+
+def merge(connection, output_path):
+    """Write all results to output_path in news.csv order, replacing the file in one rename."""
+    unfinished = connection.execute("SELECT COUNT(*) FROM batches WHERE state != 'done'").fetchone()[0]
+    if unfinished:
+        raise RuntimeError(f"{unfinished} batches are not finished yet")
+    fieldnames = json.loads(connection.execute("SELECT value FROM meta WHERE key = 'fieldnames'").fetchone()[0])
+
+    merge_path = checkpoint_path(output_path)
+    if os.path.exists(merge_path):
+        os.remove(merge_path)
+    writer = CheckpointWriter(merge_path, fieldnames)
+    count = 0
+    for row, record in connection.execute("SELECT row, record FROM results ORDER BY row"):
+        writer.write(row, json.loads(record))
+        count += 1
+    writer.close()
+    finalize_checkpoint(merge_path, output_path)
+    refresh_archive(output_path)
+    return count
+
+
+def status(connection):
+    counts = dict(connection.execute("SELECT state, COUNT(*) FROM batches GROUP BY state").fetchall())
+    expired = connection.execute("SELECT COUNT(*) FROM batches WHERE state = 'leased' AND lease_until < ?",
+                                 (time.time(),)).fetchone()[0]
+    rows = connection.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+    scored = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    return (f"{rows} rows, {scored} scored; batches: {counts.get('pending', 0)} pending, "
+            f"{counts.get('leased', 0)} leased ({expired} expired), {counts.get('done', 0)} done")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score news.csv with any number of workers sharing a SQLite queue.")
+    parser.add_argument("command", choices=["enqueue", "work", "merge", "status", "run"],
+                        help="enqueue news.csv, work on batches, merge the results, show progress, "
+                             "or run = enqueue + local workers + merge")
+    parser.add_argument("--queue", default=os.environ.get(QUEUE_ENV, DEFAULT_QUEUE))
+    parser.add_argument("--input", default="news.csv")
+    parser.add_argument("--output", default="news_with_sentiment.csv")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get(BATCH_SIZE_ENV, DEFAULT_BATCH_SIZE)))
+    parser.add_argument("--lease", type=float, default=float(os.environ.get(LEASE_ENV, DEFAULT_LEASE)))
+    parser.add_argument("--workers", type=int, default=4, help="local worker processes for run")
+    parser.add_argument("--wait", action="store_true",
+                        help="keep a worker running until every batch is done, reclaiming expired leases")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    connection = connect(args.queue)
+    try:
+        run_command(args, connection)
+    except (RuntimeError, ValueError) as error:
+        logging.error(error)
+        sys.exit(1)
+
+
+def run_command(args, connection):
+    if args.command in ("enqueue", "run"):
+        count = enqueue(connection, args.input, args.batch_size)
+        logging.info(f"Queued {count} rows from {args.input} in batches of {args.batch_size}")
+
+    if args.command == "work":
+        work(connection, args.lease, args.wait)
+    elif args.command == "run":
+        command = [sys.executable, os.path.abspath(__file__), "work", "--queue", args.queue, "--lease", str(args.lease), "--wait"]
+        workers = [subprocess.Popen(command) for _ in range(args.workers)]
+        for worker in workers:
+            worker.wait()
+
+    if args.command in ("merge", "run"):
+        count = merge(connection, args.output)
+        logging.info(f"Wrote {count} rows to {args.output}")
+    elif args.command == "status":
+        print(status(connection))
+
+
+if __name__ == "__main__":
+    profiler.enable_profiling("workqueue")
+    main()